@@ -0,0 +1,73 @@
+import sys
+import time
+import argparse
+import subprocess
+import pathwayParameterAdvising as ppa
+
+"""
+Created: 10/18/2026
+
+Description: This benchmark times starting a new Python interpreter and importing the modules
+used to rank pathways, compared with starting an interpreter which imports nothing. It also
+checks that ranking does not import the libraries only used to download reference pathways.
+With --budget it exits with an error if the import overhead is over budget, so it can guard
+the start up time of ranking jobs.
+
+Usage: python benchImportTime.py --budget=0.5
+"""
+
+#Modules timed, imported as each command line entry point would import them
+DEFAULT_MODULES = ["pathwayParameterAdvising", "pathwayParameterAdvising.ppa", "pathwayParameterAdvising.rankingClient",
+                   "pathwayParameterAdvising.mergeShards"]
+
+#Libraries which must not be imported by ranking
+FORBIDDEN_MODULES = ["requests", "networkx"]
+
+#Modules which must not import the forbidden libraries
+RANKING_MODULES = ["pathwayParameterAdvising", "pathwayParameterAdvising.ppa", "pathwayParameterAdvising.graphletUtils",
+                   "pathwayParameterAdvising.rankingClient", "pathwayParameterAdvising.rankingServer", "pathwayParameterAdvising.mergeShards",
+                   "pathwayParameterAdvising.rerank"]
+
+"""
+Gets the median wall time in seconds of running code in a new interpreter repeats times
+"""
+def timeInterpreter(code, repeats):
+    times = []
+    for i in range(repeats):
+        start = time.perf_counter()
+        subprocess.check_call([sys.executable, "-c", code])
+        times.append(time.perf_counter()-start)
+    return sorted(times)[len(times)//2]
+
+"""
+Gets the forbidden libraries imported along with module, checked in a new interpreter
+"""
+def forbiddenImports(module):
+    code = "import sys, %s; print(' '.join(name for name in %r if name in sys.modules))" %(module, FORBIDDEN_MODULES)
+    return subprocess.check_output([sys.executable, "-c", code]).decode().split()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmarks the time to import the modules used to rank pathways in a new interpreter. Version %s, released under the MIT license."%(ppa.__version__))
+    parser.add_argument("--modules", default=DEFAULT_MODULES, nargs="+", help="Modules to time importing.")
+    parser.add_argument("--repeats", default=11, type=int, help="Number of interpreters started for each module. The median time is reported.")
+    parser.add_argument("--budget", default=0.0, type=float, help="If set, exits with an error if importing any module takes longer than this many seconds over an empty interpreter.")
+    args = parser.parse_args()
+
+    failed = False
+    for module in RANKING_MODULES:
+        imported = forbiddenImports(module)
+        if len(imported) > 0:
+            print("Error: importing %s imports %s." %(module, ", ".join(imported)))
+            failed = True
+
+    baseTime = timeInterpreter("pass", args.repeats)
+    print("%-42s %10s %10s" %("module", "seconds", "overhead"))
+    print("%-42s %10.4f %10s" %("(empty interpreter)", baseTime, ""))
+    for module in args.modules:
+        seconds = timeInterpreter("import %s" %(module), args.repeats)
+        overBudget = args.budget > 0 and seconds-baseTime > args.budget
+        print("%-42s %10.4f %10.4f%s" %(module, seconds, seconds-baseTime, "  OVER BUDGET" if overBudget else ""))
+        failed = failed or overBudget
+    if failed:
+        sys.exit(1)
@@ -0,0 +1,74 @@
+import os
+import time
+import shutil
+import argparse
+import tempfile
+import numpy as np
+from pathwayParameterAdvising.graphletUtils import loadGraphlets, loadGFDMatrix, graphletMatrix, graphletVocabulary
+import pathwayParameterAdvising as ppa
+
+"""
+Created: 10/18/2026
+
+Description: This benchmark compares parsing graphlet output files with loadGraphlets, which
+reads them line by line with loadSingleGFD, and with the bulk parser loadGFDMatrix using
+different worker pools. The IL2 graphlet files are copied repeatedly to reach the requested
+number of files.
+
+Usage: python benchParseGraphlets.py --numFiles=100000
+"""
+
+"""
+Copies the graphlet files in graphletDir into outDir until there are numFiles of them,
+and writes their names to a list file which is returned.
+"""
+def makeGraphletFiles(graphletDir, outDir, numFiles):
+    gOutFs = sorted(os.path.join(graphletDir, gOutF) for gOutF in os.listdir(graphletDir) if gOutF.endswith(".gOut"))
+    contents = [open(gOutF).read() for gOutF in gOutFs]
+    listF = os.path.join(outDir, "graphletNames.txt")
+    outList = open(listF, "w")
+    for i in range(numFiles):
+        gOutF = os.path.join(outDir, "run%d.gOut" %(i))
+        out = open(gOutF, "w")
+        out.write(contents[i%len(contents)])
+        out.close()
+        outList.write(gOutF+"\n")
+    outList.close()
+    return listF
+
+"""
+Times a function call, returning its result and the elapsed wall time in seconds
+"""
+def timeCall(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter()-start
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmarks parsing graphlet output files with loadGraphlets and loadGFDMatrix. Version %s, released under the MIT license."%(ppa.__version__))
+    parser.add_argument("--graphletDirectory", default=os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "data", "IL2", "graphlets"), help="Directory of graphlet output files to copy. Default is the IL2 graphlet files.")
+    parser.add_argument("--numFiles", default=100000, type=int, help="Number of graphlet files to parse.")
+    parser.add_argument("--workers", default=[1, 2, 4, os.cpu_count()], type=int, nargs="+", help="Worker pool sizes to benchmark.")
+    parser.add_argument("--tempDir", default=None, help="Directory to write graphlet files in. Default is the system temporary directory.")
+    args = parser.parse_args()
+
+    outDir = tempfile.mkdtemp(dir=args.tempDir)
+    try:
+        listF = makeGraphletFiles(args.graphletDirectory, outDir, args.numFiles)
+        names = [line.strip() for line in open(listF)]
+        allGDists, baseTime = timeCall(loadGraphlets, listF, 0, False, False)
+        expected = graphletMatrix(allGDists, graphletVocabulary(allGDists))
+        print("%-30s %10.3f s %12.0f files/s" %("loadGraphlets", baseTime, args.numFiles/baseTime))
+
+        for workers in sorted(set(args.workers)):
+            for threads in [False, True]:
+                if workers == 1 and threads:
+                    continue
+                gMatrix, bulkTime = timeCall(loadGFDMatrix, names, 0, False, workers, threads)
+                if not (gMatrix.names == expected.names and gMatrix.graphlets == expected.graphlets and np.array_equal(gMatrix.freqs, expected.freqs)):
+                    print("Error: loadGFDMatrix results differ from loadGraphlets")
+                label = "loadGFDMatrix %d %s" %(workers, "threads" if threads else "processes")
+                print("%-30s %10.3f s %12.0f files/s %6.1fx" %(label, bulkTime, args.numFiles/bulkTime, baseTime/bulkTime))
+    finally:
+        shutil.rmtree(outDir)
@@ -0,0 +1,88 @@
+import os
+import argparse
+import numpy as np
+from pathwayParameterAdvising.graphletCounts import GRAPHLET_NAMES
+from pathwayParameterAdvising.graphletUtils import loadGraphlets
+import pathwayParameterAdvising as ppa
+
+"""
+Created: 10/18/2026
+
+Description: This file generates synthetic graphlet output files and reference sets for the
+benchmarks, with a configurable number of generated pathways, reference pathways and graphlets.
+Files are written in the format of PGD output files, with a |V| line followed by a block of
+graphlet counts between lines of *, so they are read by graphletUtils like real PGD output.
+
+Usage: python generateData.py outputDirectory --numGenerated=1000 --numReference=1000
+"""
+
+"""
+Gets the names of numGraphlets graphlets. The first are the PGD graphlet names, followed by
+made up names if more graphlets are needed.
+"""
+def syntheticGraphlets(numGraphlets):
+    extra = ["total_5_synthetic%d" %(i) for i in range(max(0, numGraphlets-len(GRAPHLET_NAMES)))]
+    return (GRAPHLET_NAMES+extra)[:numGraphlets]
+
+"""
+Writes a graphlet output file with the given size and graphlet counts
+"""
+def writeGFDFile(fileName, size, graphlets, counts):
+    out = open(fileName, "w")
+    out.write("|V|: %d\n" %(size))
+    out.write("|E|: %d\n" %(counts[0]))
+    out.write("*"*60+"\n")
+    for g,count in zip(graphlets, counts):
+        out.write("%s = %d\n" %(g, count))
+    out.write("*"*60+"\n")
+    out.close()
+    return
+
+"""
+Writes numFiles graphlet output files named prefixN.gOut in outDir, and a file listing them.
+Sizes are drawn from 4 to 200 nodes, and counts are drawn from a lognormal distribution with
+about one in ten counts set to zero, which graphletUtils replaces with 1. Returns the list file.
+"""
+def generateGFDFiles(outDir, prefix, numFiles, graphlets, rng):
+    os.makedirs(outDir, 0o755, exist_ok=True)
+    sizes = rng.integers(4, 201, numFiles)
+    counts = np.rint(rng.lognormal(5, 3, (numFiles, len(graphlets)))).astype(np.int64)
+    counts[rng.random(counts.shape) < 0.1] = 0
+    names = []
+    for i in range(numFiles):
+        fileName = os.path.join(outDir, "%s%d.gOut" %(prefix, i))
+        writeGFDFile(fileName, sizes[i], graphlets, counts[i])
+        names.append(fileName)
+    listF = outDir+".txt"
+    out = open(listF, "w")
+    for name in names:
+        out.write(name+"\n")
+    out.close()
+    return listF
+
+"""
+Generates a synthetic dataset in outDir: numGenerated generated pathway files listed in
+generated.txt, and numReference reference pathway files listed in reference.txt and pickled
+as reference.pkl. The same arguments always generate the same files.
+"""
+def generateDataset(outDir, numGenerated, numReference, numGraphlets, seed=0):
+    rng = np.random.default_rng(seed)
+    graphlets = syntheticGraphlets(numGraphlets)
+    genF = generateGFDFiles(os.path.join(outDir, "generated"), "run", numGenerated, graphlets, rng)
+    refF = generateGFDFiles(os.path.join(outDir, "reference"), "ref", numReference, graphlets, rng)
+    #Saves reference.pkl next to reference.txt
+    loadGraphlets(refF, 0, True, False)
+    return {"generated":genF, "reference":refF, "referencePickle":os.path.splitext(refF)[0]+".pkl"}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generates synthetic graphlet files and reference sets for benchmarking pathway parameter advising. Version %s, released under the MIT license."%(ppa.__version__))
+    parser.add_argument("outputDirectory", help="Directory to write the dataset in.")
+    parser.add_argument("--numGenerated", default=1000, type=int, help="Number of generated pathways.")
+    parser.add_argument("--numReference", default=1000, type=int, help="Number of reference pathways.")
+    parser.add_argument("--numGraphlets", default=len(GRAPHLET_NAMES), type=int, help="Number of graphlets in each distribution.")
+    parser.add_argument("--seed", default=0, type=int, help="Random seed.")
+    args = parser.parse_args()
+    files = generateDataset(args.outputDirectory, args.numGenerated, args.numReference, args.numGraphlets, args.seed)
+    for name in sorted(files):
+        print("%s: %s" %(name, files[name]))
@@ -0,0 +1,181 @@
+import os
+import sys
+import json
+import time
+import shutil
+import platform
+import argparse
+import tempfile
+import statistics
+import numpy as np
+from pathwayParameterAdvising.graphletUtils import (loadGraphlets, loadSingleGFD, loadGraphletMatrix, graphletMatrix,
+                                                    graphletVocabulary, changeNames, saveRankingOutput, convertToReferenceStore)
+from pathwayParameterAdvising.ppa import rankParameters, calcGraphletDistance, calcDistanceMatrix, scoreGraphlets
+from generateData import generateDataset
+import pathwayParameterAdvising as ppa
+
+"""
+Created: 10/18/2026
+
+Description: This is the benchmark suite for the ranking pipeline. Each stage is timed separately
+on a synthetic dataset of configurable size (see generateData.py) and on real data, ranking the
+IL2 runs in data/IL2 against referencePathways/reactomeGraphlets.pkl.
+
+Results are saved as JSON. If a baseline results file is given, each stage is compared with it
+and the script exits with status 1 if any stage is slower than the baseline by more than the
+regression threshold.
+
+Usage: python runBenchmarks.py --outFile=results.json --baseline=baseline.json
+"""
+
+BASE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+
+#Stage differences below this many seconds are never reported as regressions
+MIN_REGRESSION_SECONDS = 0.005
+
+"""
+Runs func repeats times, returning the wall and CPU time of each run in seconds
+"""
+def timeStage(func, repeats):
+    wall = []
+    cpu = []
+    for i in range(repeats):
+        startWall = time.perf_counter()
+        startCPU = time.process_time()
+        func()
+        cpu.append(time.process_time()-startCPU)
+        wall.append(time.perf_counter()-startWall)
+    return {"seconds":statistics.median(wall), "min":min(wall), "cpuSeconds":statistics.median(cpu), "repeats":wall}
+
+"""
+Times each stage of ranking the generated pathways in genF, a list of graphlet files, against
+the references in refPickle, a pickled dictionary of graphlet distributions. Distances
+are calculated with calcGraphletDistance for at most distanceSample generated pathways.
+"""
+def benchmarkCase(genF, refPickle, minSize, repeats, distanceSample, workDir):
+    genNames = [line.strip() for line in open(genF)]
+    genG = loadGraphlets(genF, 0, False, False)
+    refG = loadGraphlets(refPickle, minSize, False, False)
+    refList = list(refG.values())
+    graphlets = graphletVocabulary(refG, genG)
+    genMatrix = graphletMatrix(genG, graphlets)
+    refMatrix = graphletMatrix(refG, graphlets)
+    storeDir = os.path.join(workDir, "referenceStore")
+    convertToReferenceStore(refPickle, storeDir, False)
+    sample = list(genG.items())[:distanceSample]
+    distances = {name:score for name,score in zip(*scoreGraphlets(genMatrix, refMatrix, 0.2))}
+    outF = os.path.join(workDir, "ranking.txt")
+
+    stages = dict()
+    stages["loadSingleGFD"] = timeStage(lambda: [loadSingleGFD(name, 0, False) for name in genNames], repeats)
+    stages["loadGraphlets_text"] = timeStage(lambda: loadGraphlets(genF, 0, False, False), repeats)
+    stages["loadGraphlets_pickle"] = timeStage(lambda: loadGraphlets(refPickle, minSize, False, False), repeats)
+    stages["loadGraphletMatrix_text"] = timeStage(lambda: loadGraphletMatrix(genF, 0, False, False), repeats)
+    stages["loadGraphletMatrix_store"] = timeStage(lambda: loadGraphletMatrix(storeDir, minSize, False, False), repeats)
+    stages["calcGraphletDistance"] = timeStage(lambda: [calcGraphletDistance(gDist, refList) for name,gDist in sample], repeats)
+    stages["calcDistanceMatrix"] = timeStage(lambda: calcDistanceMatrix(genMatrix.freqs, refMatrix.freqs), repeats)
+    stages["scoreGraphlets"] = timeStage(lambda: scoreGraphlets(genMatrix, refMatrix, 0.2), repeats)
+    stages["changeNames"] = timeStage(lambda: changeNames(distances, "stripped"), repeats)
+    stages["saveRankingOutput"] = timeStage(lambda: saveRankingOutput(changeNames(distances, "stripped"), outF, False, True, False), repeats)
+    stages["rankParameters"] = timeStage(lambda: rankParameters(genF, storeDir, outF, minSize, False, True, False, "stripped", False), repeats)
+
+    config = {"generated":len(genG), "reference":len(refG), "graphlets":len(graphlets), "minSize":minSize,
+              "distanceSample":len(sample), "repeats":repeats}
+    return {"config":config, "stages":stages}
+
+"""
+Benchmarks a synthetic dataset generated in workDir
+"""
+def benchmarkSynthetic(numGenerated, numReference, numGraphlets, seed, repeats, distanceSample, workDir):
+    files = generateDataset(os.path.join(workDir, "data"), numGenerated, numReference, numGraphlets, seed)
+    return benchmarkCase(files["generated"], files["referencePickle"], 0, repeats, distanceSample, workDir)
+
+"""
+Benchmarks ranking the IL2 runs against the Reactome reference pathways, as in runNetBoxIL2.sh
+"""
+def benchmarkIL2(repeats, distanceSample, workDir):
+    graphletDir = os.path.join(BASE_DIR, "data", "IL2", "graphlets")
+    genF = os.path.join(workDir, "il2Graphlets.txt")
+    out = open(genF, "w")
+    for gOutF in sorted(os.listdir(graphletDir)):
+        if gOutF.endswith(".gOut"):
+            out.write(os.path.join(graphletDir, gOutF)+"\n")
+    out.close()
+    refPickle = os.path.join(BASE_DIR, "referencePathways", "reactomeGraphlets.pkl")
+    return benchmarkCase(genF, refPickle, 15, repeats, distanceSample, workDir)
+
+"""
+Compares results with baseline results, returning a list of (case, stage, ratio) for stages
+slower than the baseline by more than threshold, as a fraction of the baseline time.
+"""
+def compareResults(results, baseline, threshold):
+    regressions = []
+    for case in results["cases"]:
+        if case not in baseline.get("cases", dict()):
+            continue
+        baseCase = baseline["cases"][case]
+        if baseCase["config"] != results["cases"][case]["config"]:
+            print("Warning: %s was run with a different configuration than the baseline." %(case))
+        print("\n%s\n%-26s %10s %10s %8s" %(case, "stage", "seconds", "baseline", "ratio"))
+        for stage, timing in results["cases"][case]["stages"].items():
+            if stage not in baseCase["stages"]:
+                continue
+            baseSeconds = baseCase["stages"][stage]["seconds"]
+            ratio = timing["seconds"]/max(baseSeconds, 1e-12)
+            regressed = ratio > 1+threshold and timing["seconds"]-baseSeconds > MIN_REGRESSION_SECONDS
+            print("%-26s %10.4f %10.4f %7.2fx%s" %(stage, timing["seconds"], baseSeconds, ratio, "  REGRESSION" if regressed else ""))
+            if regressed:
+                regressions.append((case, stage, ratio))
+    return regressions
+
+"""
+Prints the stage timings of each case
+"""
+def printResults(results):
+    for case in results["cases"]:
+        print("\n%s %s\n%-26s %10s %10s" %(case, json.dumps(results["cases"][case]["config"]), "stage", "seconds", "cpu"))
+        for stage, timing in results["cases"][case]["stages"].items():
+            print("%-26s %10.4f %10.4f" %(stage, timing["seconds"], timing["cpuSeconds"]))
+    return
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmarks each stage of pathway parameter advising on synthetic and real data. Version %s, released under the MIT license."%(ppa.__version__))
+    parser.add_argument("--outFile", default="benchmarkResults.json", help="File to save results in as JSON.")
+    parser.add_argument("--baseline", default="", help="Results file from an earlier run to compare with.")
+    parser.add_argument("--threshold", default=0.25, type=float, help="Fraction by which a stage may be slower than the baseline before it is reported as a regression.")
+    parser.add_argument("--numGenerated", default=1000, type=int, help="Number of synthetic generated pathways.")
+    parser.add_argument("--numReference", default=1000, type=int, help="Number of synthetic reference pathways.")
+    parser.add_argument("--numGraphlets", default=17, type=int, help="Number of graphlets in synthetic distributions.")
+    parser.add_argument("--seed", default=0, type=int, help="Random seed for synthetic data.")
+    parser.add_argument("--distanceSample", default=100, type=int, help="Number of generated pathways timed with calcGraphletDistance, which is much slower than the other stages.")
+    parser.add_argument("--repeats", default=3, type=int, help="Number of times each stage is run. The median time is reported.")
+    parser.add_argument("--cases", default=["synthetic", "il2"], nargs="+", choices=["synthetic", "il2"], help="Benchmark cases to run.")
+    args = parser.parse_args()
+
+    results = {"version":ppa.__version__,
+               "environment":{"python":platform.python_version(), "numpy":np.__version__, "platform":platform.platform(), "cpus":os.cpu_count()},
+               "cases":dict()}
+    workDir = tempfile.mkdtemp()
+    try:
+        if "synthetic" in args.cases:
+            results["cases"]["synthetic"] = benchmarkSynthetic(args.numGenerated, args.numReference, args.numGraphlets, args.seed,
+                                                               args.repeats, args.distanceSample, os.path.join(workDir, "synthetic"))
+        if "il2" in args.cases:
+            os.makedirs(os.path.join(workDir, "il2"))
+            results["cases"]["il2"] = benchmarkIL2(args.repeats, args.distanceSample, os.path.join(workDir, "il2"))
+    finally:
+        shutil.rmtree(workDir)
+
+    out = open(args.outFile, "w")
+    json.dump(results, out, indent=1)
+    out.close()
+    printResults(results)
+
+    if args.baseline != "":
+        baseline = json.load(open(args.baseline))
+        regressions = compareResults(results, baseline, args.threshold)
+        if len(regressions) > 0:
+            print("\n%d stages are more than %d%% slower than the baseline." %(len(regressions), 100*args.threshold))
+            sys.exit(1)
+        print("\nNo stages are more than %d%% slower than the baseline." %(100*args.threshold))
@@ -28,27 +28,6 @@ if [ -z "$3" ]
 fi
 delim=$4;
 
-#Convert networks for PGD
-for net in `ls ${dataDir}/pathways/*`;
-do
-    #Convert the file if it doesn't already exist in the graphlets directory
-    if [ ! -f "${dataDir}/graphlets/${net##*/}" ];
-    then
-        python ../pathwayParameterAdvising/makePGDNet.py $net --delim=${delim};
-    fi;
-done;
-
-#Run PGD
-for pgdNet in `ls ${dataDir}/graphlets/* | grep -v '\.gOut$'`;
-do
-    echo $pgdNet;
-    ${pgdDir}/pgd -f $pgdNet >> ${pgdNet%.*}.gOut;
-done;
-
-#Collect graphletNames into a text file
-rm -f ${dataDir}/graphletNames.txt;
-ls ${dataDir}/graphlets/*.gOut >> ${dataDir}/graphletNames.txt;
-
-#Run PPA
-python ../pathwayParameterAdvising/ppa.py --genPathwayGraphlets=${dataDir}/graphletNames.txt --refPathwayGraphlets=../referencePathways/reactomeGraphlets.pkl --outFile=${outFile} --minSize=15 --outputScore --verbose;
-
+#Convert networks, run PGD, and rank them in parallel. Up to date converted networks and
+#graphlet files from earlier runs are reused.
+python ../pathwayParameterAdvising/pipeline.py ${dataDir} --pgdExecutable=${pgdDir}/pgd --delim=${delim} --refPathwayGraphlets=../referencePathways/reactomeStore --outFile=${outFile} --minSize=15 --outputScore --verbose;
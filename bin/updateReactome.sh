@@ -46,3 +46,6 @@ ls ${reactDir}/graphlets/*.gOut >> ${reactDir}/reactomeGraphlets.txt;
 
 #Create new pickled dictionary to save time and space later
 python ../pathwayParameterAdvising/graphletUtils.py --graphletsFile=${reactDir}/reactomeGraphlets.txt --minSize=15;
+
+#Create new memory mapped reference store used by the ranking scripts
+python ../pathwayParameterAdvising/graphletUtils.py --graphletsFile=${reactDir}/reactomeGraphlets.txt --referenceStore=${reactDir}/reactomeStore;
@@ -1,4 +1,49 @@
-from .ppa import *
-from .getReactomePaths import *
+import sys
+import importlib
 
 __version__ = '0.2.0'
+
+#Modules whose public names are exported by the package. They are imported when one of their
+#names is first used, so ranking does not import the requests and networkx libraries used by
+#getReactomePaths. Names are looked up in order, and no name is defined differently by both.
+EXPORTED_MODULES = ["ppa", "getReactomePaths"]
+
+#Submodules imported by name, such as "from pathwayParameterAdvising import profiling"
+SUBMODULES = ["convertNetworks", "getReactomePaths", "gfdCache", "graphletCounts", "graphletSampling", "graphletSweep", "graphletUtils",
+              "makePGDNet", "mergeShards", "pipeline", "ppa", "profiling", "rankingClient", "rankingServer", "referenceIndex", "rerank"]
+
+"""
+Gets the public names of a module, the names a star import of it would define, other than its
+command line entry point main
+"""
+def publicNames(module):
+    return [name for name in vars(module) if not name.startswith("_") and name != "main"]
+
+if sys.version_info >= (3, 7):
+    """
+    Imports the submodule or exported name of the package named name when it is first used
+    """
+    def __getattr__(name):
+        if name in SUBMODULES:
+            return importlib.import_module("."+name, __name__)
+        if name == "__all__":
+            return sorted(set(name for module in EXPORTED_MODULES for name in publicNames(importlib.import_module("."+module, __name__))))
+        if name.startswith("__"):
+            raise AttributeError("module %r has no attribute %r" %(__name__, name))
+        for module in EXPORTED_MODULES:
+            module = importlib.import_module("."+module, __name__)
+            if name in publicNames(module):
+                globals()[name] = getattr(module, name)
+                return globals()[name]
+        raise AttributeError("module %r has no attribute %r" %(__name__, name))
+
+    """
+    Lists the names of the package, including those not imported yet
+    """
+    def __dir__():
+        return sorted(set(globals()) | set(SUBMODULES))
+else:
+    #Module __getattr__ needs Python 3.7, so names are imported eagerly
+    from .ppa import *
+    from .getReactomePaths import *
+    del main
@@ -0,0 +1,236 @@
+import os
+import argparse
+import multiprocessing
+import numpy as np
+from pathwayParameterAdvising.graphletCounts import readEdgeList
+import pathwayParameterAdvising as ppa
+
+"""
+Created: 10/18/2026
+
+Description: This file converts many networks at once into the numbered edgelists used by PGD,
+giving the same files as makePGDNet without building networkx graphs. Networks can be the files
+of a directory or the networks of one concatenated file.
+
+Node names are interned to integers in the order they first appear, and undirected edges are
+deduplicated and ordered with NumPy, in the order networkx writes them. Networks with fewer
+than 4 nodes are skipped, and networks are converted and written by a pool of worker processes.
+
+Converted networks can also be saved in a binary edge archive, a NumPy .npz file holding the
+edges of every network and a vocabulary of node names shared by all of them. Graphlets can be
+counted from an archive without parsing any text, see iterNetworks.
+"""
+
+#Start of a zip file, which .npz archives are
+ARCHIVE_MAGIC = b"PK\x03\x04"
+
+"""
+Gets the undirected edges of a network with numNodes nodes, as written by makePGDNet, from an
+edge array with node ids numbered in the order nodes first appear. Duplicate edges are removed,
+and edges are ordered by their smallest node and then by their first appearance, with the
+smallest node first. Self loops are kept.
+"""
+def pgdEdges(edges, numNodes):
+    lo = np.minimum(edges[:,0], edges[:,1])
+    hi = np.maximum(edges[:,0], edges[:,1])
+    keys, first = np.unique(lo*numNodes+hi, return_index=True)
+    first = first[np.lexsort((first, lo[first]))]
+    return np.column_stack([lo[first], hi[first]])
+
+"""
+Writes edges from pgdEdges to outF as a tab delimited edgelist with nodes numbered from 1,
+through a temporary file
+"""
+def writePGDNetwork(edges, outF):
+    tmpF = outF+".tmp"
+    out = open(tmpF, "w")
+    out.write("".join("%d\t%d\n" %(u, v) for u,v in (edges+1).tolist()))
+    out.close()
+    os.replace(tmpF, outF)
+    return
+
+"""
+Gets the default directory to store converted networks in, a directory named graphlets next to
+a directory of networks, as used by makePGDNet, or next to a concatenated network file
+"""
+def defaultOutputDirectory(inputPath):
+    return os.path.join(os.path.dirname(os.path.normpath(inputPath)), "graphlets")
+
+"""
+Reads a concatenated network file, where each line is a network name followed by the two nodes
+of an edge, split on delim or whitespace if delim is empty. Text after a # is ignored. Returns
+a list of (network name, (edge array, node names)) in the order networks first appear, like
+graphletCounts.readEdgeList.
+"""
+def readConcatenatedNetworks(networksF, delim=""):
+    networks = dict()
+    for line in open(networksF):
+        line = line.split("#")[0].strip()
+        if delim == "":
+            lineList = line.split()
+        else:
+            lineList = line.split(delim)
+        if len(lineList) < 3:
+            continue
+        nodeIDs, edges = networks.setdefault(lineList[0], (dict(), []))
+        for node in lineList[1:3]:
+            if node not in nodeIDs:
+                nodeIDs[node] = len(nodeIDs)
+        edges.append((nodeIDs[lineList[1]], nodeIDs[lineList[2]]))
+    return [(name, (np.array(edges, dtype=np.int64).reshape(-1,2), list(nodeIDs))) for name,(nodeIDs,edges) in networks.items()]
+
+"""
+Converts one network, reading it from its file if it was not read already. Returns the network
+name, its converted edges and its node names if keep is set, or None if the network is too small.
+"""
+def convertTask(task):
+    name, network, outF, delim, keep = task
+    if network is None:
+        network = readEdgeList(name, delim)
+    edges, nodes = network
+    if len(nodes) < 4:
+        print(name, "too short at ",len(nodes),". Network must contain at least 4 nodes.")
+        return None
+    edges = pgdEdges(edges, len(nodes))
+    if outF != "":
+        writePGDNetwork(edges, outF)
+    if not keep:
+        return name, None, None
+    return name, edges.astype(np.int32), nodes
+
+"""
+Converts networks, given as a list of (network name, network) where the network is None to
+read it from the file named by its name, or an (edge array, node names) pair. Converted networks
+are written to outDir under the base name of each network unless outDir is empty, and saved in
+an edge archive if archiveF is given. Networks are converted by a pool of worker processes, by
+default one per core. Returns the number of networks converted.
+"""
+def convertNetworks(networks,outDir,delim="",archiveF="",workers=0,verbose=False):
+    if outDir != "":
+        os.makedirs(outDir, 0o755, exist_ok=True)
+    tasks = [(name, network, os.path.join(outDir, os.path.basename(name)) if outDir != "" else "", delim, archiveF != "")
+             for name, network in networks]
+    if workers <= 0:
+        workers = multiprocessing.cpu_count()
+    if workers == 1:
+        results = [convertTask(task) for task in tasks]
+    else:
+        pool = multiprocessing.Pool(workers)
+        try:
+            results = pool.map(convertTask, tasks, chunksize=max(1, len(tasks)//(4*workers)))
+        finally:
+            pool.close()
+            pool.join()
+    results = [result for result in results if result is not None]
+    if verbose:
+        print("Converted %d of %d networks." %(len(results), len(tasks)))
+    if archiveF != "":
+        saveEdgeArchive(results, archiveF)
+        if verbose:
+            print("Saved edge archive "+archiveF)
+    return len(results)
+
+"""
+Saves converted networks, a list of (network name, edge array, node names), in an edge archive.
+Node names are interned in a vocabulary shared by all networks, and each network stores the
+vocabulary ids of its nodes. The archive is written to a temporary file first.
+"""
+def saveEdgeArchive(networks, archiveF):
+    vocab = dict()
+    nodeIDs = [np.array([vocab.setdefault(node, len(vocab)) for node in nodes], dtype=np.int32) for name,edges,nodes in networks]
+    edgeOffsets = np.cumsum([0]+[len(edges) for name,edges,nodes in networks])
+    nodeOffsets = np.cumsum([0]+[len(nodes) for name,edges,nodes in networks])
+    arrays = dict()
+    arrays["networks"] = np.array([name for name,edges,nodes in networks], dtype=str)
+    arrays["edges"] = np.concatenate([np.zeros((0,2), dtype=np.int32)]+[edges for name,edges,nodes in networks])
+    arrays["edgeOffsets"] = edgeOffsets.astype(np.int64)
+    arrays["nodes"] = np.concatenate([np.zeros(0, dtype=np.int32)]+nodeIDs)
+    arrays["nodeOffsets"] = nodeOffsets.astype(np.int64)
+    arrays["vocabulary"] = np.array(list(vocab), dtype=str)
+    tmpF = archiveF+".tmp"
+    out = open(tmpF, "wb")
+    np.savez(out, **arrays)
+    out.close()
+    os.replace(tmpF, archiveF)
+    return
+
+"""
+Checks if a file is an edge archive rather than a text file
+"""
+def isEdgeArchive(name):
+    inF = open(name, "rb")
+    start = inF.read(len(ARCHIVE_MAGIC))
+    inF.close()
+    return start == ARCHIVE_MAGIC
+
+"""
+Reads the networks of an edge archive, yielding (network name, edge array, node ids) for each,
+where edges are numbered from 0 as in the converted network file and node ids index the
+archive's vocabulary of node names.
+"""
+def readEdgeArchive(archiveF):
+    archive = np.load(archiveF)
+    edges = archive["edges"].astype(np.int64)
+    edgeOffsets = archive["edgeOffsets"]
+    nodes = archive["nodes"]
+    nodeOffsets = archive["nodeOffsets"]
+    for i,name in enumerate(archive["networks"].tolist()):
+        yield name, edges[edgeOffsets[i]:edgeOffsets[i+1]], nodes[nodeOffsets[i]:nodeOffsets[i+1]].tolist()
+    return
+
+"""
+Reads the networks of an edge archive, or of a file where each line is a sif or edgelist network
+file, yielding (network name, edge array, node names or ids) like graphletCounts.readEdgeList.
+Networks with fewer than 4 nodes are skipped, as they are by makePGDNet.
+"""
+def iterNetworks(allNetsF,delim):
+    if isEdgeArchive(allNetsF):
+        for network in readEdgeArchive(allNetsF):
+            yield network
+        return
+    for line in open(allNetsF):
+        netF = line.strip()
+        if len(netF)==0:
+            continue
+        edges, nodes = readEdgeList(netF, delim)
+        if len(nodes) < 4:
+            print(netF, "too short at ",len(nodes),". Network must contain at least 4 nodes.")
+            continue
+        yield netF, edges, nodes
+    return
+
+
+"""
+Converts the networks given by the command line arguments in argv, by default sys.argv[1:].
+"""
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="This script converts a directory of sif or edgelist network files, or a file of concatenated networks, into the format used by the pgd library, giving the same files as makePGDNet.py. Networks are converted to be undirected and have sequential integer node names. Version %s, released under the MIT license." %(ppa.__version__))
+    parser.add_argument("networks", help="Directory of sif or edgelist network files, or a file where each line is a network name followed by the two nodes of an edge.")
+    parser.add_argument("--delim", help="Node delimiter in network files. Default is none, which splits lines on whitespace.", default="")
+    parser.add_argument("--outputDirectory", help="Directory to store converted networks in, named after each network. Default is a directory named graphlets next to NETWORKS.", default="")
+    parser.add_argument("--archive", help="If set, also saves the converted networks to this binary edge archive, which can be given to ppa.py --genPathwayNetworks. Default is no archive.", default="")
+    parser.add_argument("--noText", action="store_true", help="If set, only saves the edge archive and does not write converted network files. Requires --archive.")
+    parser.add_argument("--workers", default=0, type=int, help="Number of worker processes converting networks. Default is one per core.")
+    parser.add_argument("--verbose", action="store_true", help="If set, will print intermediate status updates.")
+    args = parser.parse_args(argv)
+    if args.noText and args.archive == "":
+        parser.error("--noText requires --archive.")
+
+    if os.path.isdir(args.networks):
+        networks = [(os.path.join(args.networks, netF), None) for netF in sorted(os.listdir(args.networks))
+                    if os.path.isfile(os.path.join(args.networks, netF))]
+    elif os.path.isfile(args.networks):
+        networks = readConcatenatedNetworks(args.networks, args.delim)
+    else:
+        print("Error: %s is not a directory or file." %(args.networks))
+        return
+    outDir = args.outputDirectory
+    if args.noText:
+        outDir = ""
+    elif outDir == "":
+        outDir = defaultOutputDirectory(args.networks)
+    numConverted = convertNetworks(networks, outDir, args.delim, args.archive, args.workers, args.verbose)
+    print("Converted %d networks from %s" %(numConverted, args.networks))
+
+if __name__ == "__main__":
+    main()
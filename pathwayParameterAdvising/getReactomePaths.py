@@ -15,21 +15,65 @@ Graphlets will hold the reactome pathways with integer edge names for graphlet d
 import sys
 import requests
 import time
+import threading
+import concurrent.futures
 import json
 import os
+import hashlib
 import argparse
+import functools
 import networkx as nx
+from pathwayParameterAdvising.graphletCounts import countGraphlets, readEdgeList, writeGraphletCounts
+from pathwayParameterAdvising.graphletUtils import loadSingleGFD, isReferenceStore, updateReferenceStore, convertToReferenceStore
+from pathwayParameterAdvising.referenceIndex import hasReferenceIndex, buildReferenceIndex
 import pathwayParameterAdvising as ppa
 
+#Pathway Commons web API, and defaults for downloading from it
+PC_BASE_URL = "http://www.pathwaycommons.org/pc2"
+DEFAULT_WORKERS = 4
+DEFAULT_RATE = 5.0
+DEFAULT_RETRIES = 5
+DEFAULT_BACKOFF = 1.0
+CHECKPOINT_FILE = "downloads.jsonl"
+
+#Files kept in the output directory by refreshReactome
+MANIFEST_FILE = "manifest.json"
+GRAPHLETS_LIST = "reactomeGraphlets.txt"
+REFERENCE_STORE = "reactomeStore"
+
+#Pathways downloaded or converted at once for each download thread and conversion process
+IN_FLIGHT_PER_WORKER = 2
+
+#HTTP statuses worth retrying, such as rate limiting and server errors
+RETRY_STATUS = {429, 500, 502, 503, 504}
+
 """
 Method to call which downloads all pathways from source database (default is reactome)
-in Pathway Commons and saves them in outDir.
+in Pathway Commons and saves them in outDir. Each pathway is saved and converted as soon as it
+is downloaded (see streamPathways). Finished pathways are checkpointed in outDir, so an
+interrupted run can be restarted without downloading them again.
 """
-def updateReactome(outDir,source="reactome"):
-    names = getAllPathwayNames(source)
+def updateReactome(outDir,source="reactome",baseURL=PC_BASE_URL,workers=DEFAULT_WORKERS,rate=DEFAULT_RATE,retries=DEFAULT_RETRIES,convertWorkers=0):
+    makeOutputDirectories(outDir)
+    session = makeSession(workers)
+    bucket = TokenBucket(rate)
+    names = getAllPathwayNames(source,baseURL,session,bucket,retries)
     print("Found %d pathways from %s in Pathway Commons." %(len(names),source))
-    allPaths, delList = getPathwayFiles(names,source)
-    saveReactomeOutput(allPaths, outDir, delList)
+    checkpointF = os.path.join(outDir,CHECKPOINT_FILE)
+    streamPathways(names,outDir,baseURL,session,bucket,workers,retries,convertWorkers,checkpointF)
+    #Everything is saved, so a new run should download pathways again
+    os.remove(checkpointF)
+
+"""
+Attempts to create the directories outDir, outDir/pathways, and outDir/graphlets
+"""
+def makeOutputDirectories(outDir):
+    for subDir in ["", "pathways", "graphlets"]:
+        try:
+            os.mkdir(os.path.join(outDir, subDir),0o755)
+        except FileExistsError:
+            pass
+    return
 
 """
 Saves pathways in allPaths in 2 formats, raw and as simple integer name
@@ -37,38 +81,21 @@ edge lists for use with PGD. Also attempts to create the directories
 outDir, outDir/pathways, and outDir/graphlets
 """
 def saveReactomeOutput(allPaths, outDir, delList):
-    #Make subdirectories
-    try:
-        os.mkdir(outDir,0o755)
-    except FileExistsError:
-        pass
-    try:
-        os.mkdir(os.path.join(outDir, "pathways"),0o755)
-    except FileExistsError:
-        pass
-    try:
-        os.mkdir(os.path.join(outDir, "graphlets"),0o755)
-    except FileExistsError:
-        pass
+    makeOutputDirectories(outDir)
+    delList = set(delList)
 
     for path in allPaths:
         if path in delList:
             continue
 
-        #Save pathways in format ready for graphlet analysis
         pathLines = allPaths[path].split("\n")
         if len(pathLines)<2:
             print("Skipping %s as it is 1 edge or less." %(path))
             continue
 
-        eList = []
-        for line in pathLines:
-            lineList=line.strip().split()
-            eList.append(" ".join([lineList[0],lineList[2]]))
+        #Save pathways in format ready for graphlet analysis
         pathID = path.split("/")[-1]
-        net = nx.parse_edgelist(eList)
-        net = nx.convert_node_labels_to_integers(net, first_label=1)
-        nx.write_edgelist(net, os.path.join(outDir,"graphlets",pathID+".sif"), delimiter="\t", data=False)
+        writeGraphletNetwork(pathLines, os.path.join(outDir,"graphlets",pathID+".sif"))
 
         #Save pathways with node names for use in any other analyses
         pathF = open(os.path.join(outDir,"pathways",pathID+".sif"),"w")
@@ -76,14 +103,112 @@ def saveReactomeOutput(allPaths, outDir, delList):
         pathF.close()
     return
 
+"""
+Writes the lines of a pathway sif as an edge list with integer node names for PGD
+"""
+def writeGraphletNetwork(pathLines, outF):
+    eList = []
+    for line in pathLines:
+        lineList=line.strip().split()
+        eList.append(" ".join([lineList[0],lineList[2]]))
+    net = nx.parse_edgelist(eList)
+    net = nx.convert_node_labels_to_integers(net, first_label=1)
+    tmpF = outF+".tmp"
+    nx.write_edgelist(net, tmpF, delimiter="\t", data=False)
+    os.replace(tmpF, outF)
+    return
+
+"""
+Converts a saved pathway sif in outDir/pathways to an integer edge list in outDir/graphlets.
+Run in worker processes by streamPathways.
+"""
+def convertPathway(pathID, outDir):
+    pathF = open(os.path.join(outDir,"pathways",pathID+".sif"))
+    pathLines = pathF.read().split("\n")
+    pathF.close()
+    writeGraphletNetwork(pathLines, os.path.join(outDir,"graphlets",pathID+".sif"))
+    return pathID
+
+"""
+Limits the rate of requests shared by several threads. Up to capacity requests can be made
+at once, after which requests are spaced to rate per second.
+"""
+class TokenBucket:
+    def __init__(self, rate, capacity=1):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.last = time.monotonic()
+        self.lock = threading.Lock()
+
+    """
+    Waits until a request can be made. Each caller reserves a token while holding the
+    lock, then sleeps outside of it until the token would be available.
+    """
+    def acquire(self):
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens+(now-self.last)*self.rate)
+            self.last = now
+            self.tokens -= 1
+            wait = -self.tokens/self.rate
+        if wait > 0:
+            time.sleep(wait)
+        return
+
+"""
+Makes an HTTP session which keeps up to workers connections open for reuse
+"""
+def makeSession(workers=DEFAULT_WORKERS):
+    session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=max(workers,1))
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+"""
+Makes a POST request, waiting for the rate limiter before each attempt. Failed requests and
+responses with a status in RETRY_STATUS are retried up to retries times with exponential
+backoff, and other error statuses are not retried. Raises the last exception if all attempts fail.
+headers are sent with each request, such as If-None-Match for conditional requests.
+"""
+def postWithRetry(session, url, params, bucket, retries=DEFAULT_RETRIES, backoff=DEFAULT_BACKOFF, headers=None):
+    for attempt in range(retries+1):
+        bucket.acquire()
+        delay = backoff*2**attempt
+        try:
+            #Pathway commons recommends using post, download can be slow so wait up to 10 minutes
+            r = session.post(url,params=params,headers=headers,timeout=600.00)
+            if r.status_code not in RETRY_STATUS:
+                r.raise_for_status()
+                return r
+            error = requests.exceptions.HTTPError("%d Error for url: %s" %(r.status_code, r.url), response=r)
+            retryAfter = r.headers.get("Retry-After", "")
+            if retryAfter.isdigit():
+                delay = max(delay, int(retryAfter))
+        except requests.exceptions.HTTPError:
+            raise
+        except requests.exceptions.RequestException as e:
+            error = e
+        if attempt < retries:
+            time.sleep(delay)
+    raise error
+
 """
 Gets the identifiers for all pathways from Pathway Commons (default is reactome).
+Each page is retried up to retries times, and an exception is raised if a page still fails
+so an incomplete list of pathways is never returned.
 """
-def getAllPathwayNames(source="reactome"):
+def getAllPathwayNames(source="reactome",baseURL=PC_BASE_URL,session=None,bucket=None,retries=DEFAULT_RETRIES):
+    if session is None:
+        session = makeSession(1)
+    if bucket is None:
+        bucket = TokenBucket(DEFAULT_RATE)
+
     #Get all reactome (or other source) pathways from pathwaycommons via web API
     allPathNames = []
 
-    reqTxt = "http://www.pathwaycommons.org/pc2/search.json"
+    reqTxt = baseURL+"/search.json"
     pagesLeft = True
     currentPage = 0
     reqParams= {"type":"pathway","datasource":source,"q":"*"}
@@ -91,13 +216,11 @@ def getAllPathwayNames(source="reactome"):
     while pagesLeft:
         reqParams["page"]=str(currentPage)
         try:
-            #Pathway commons recommends using post, download can be slow so wait up to 10 minutes
-            r = requests.post(reqTxt,params=reqParams,timeout=600.00)
+            r = postWithRetry(session,reqTxt,reqParams,bucket,retries)
         except requests.exceptions.RequestException as e:
             print("Got exception ",e)
-            print("\n Skipping page "+str(currentPage)+" and continuing")
-            time.sleep(0.4)
-            continue
+            print("Could not get page %d of pathways after %d retries" %(currentPage,retries))
+            raise
         currentPage += 1
         jsonOutput = json.loads(r.text)
         numHits = int(jsonOutput["numHits"])
@@ -113,49 +236,418 @@ def getAllPathwayNames(source="reactome"):
             allPathNames.append(name)
     return allPathNames
 
-def getPathwayFiles(reactomeNames,source="reactome"):
+"""
+Reads the pathways finished by an earlier run from a checkpoint file. A partly written last line
+from an interrupted run is ignored.
+"""
+def readCheckpoint(checkpointF):
+    done = set()
+    if checkpointF is None or not os.path.isfile(checkpointF):
+        return done
+    for line in open(checkpointF):
+        try:
+            entry = json.loads(line)
+        except ValueError:
+            continue
+        done.add(entry["uri"])
+    return done
+
+"""
+Downloads one pathway SIF, returning its URI and text
+"""
+def getPathwayFile(session, baseURL, path, bucket, retries):
+    reqParams= {"uri":path,"format":"SIF"}
+    r = postWithRetry(session,baseURL+"/get",reqParams,bucket,retries)
+    return path, r.text
+
+"""
+Saves the text of a pathway sif in outDir/pathways
+"""
+def writePathwayFile(text, pathID, outDir):
+    pathF = os.path.join(outDir,"pathways",pathID+".sif")
+    out = open(pathF+".tmp","w")
+    out.write(text)
+    out.close()
+    os.replace(pathF+".tmp", pathF)
+    return
+
+"""
+Downloads one pathway SIF and saves it in outDir/pathways, unless it is 1 edge or less.
+Returns the number of lines in the pathway, and the arguments to convert it if it was saved.
+"""
+def savePathwayFile(session, baseURL, bucket, retries, outDir, path):
+    path, text = getPathwayFile(session, baseURL, path, bucket, retries)
+    numLines = len(text.split("\n"))
+    if numLines<2:
+        return numLines, None
+    pathID = path.split("/")[-1]
+    writePathwayFile(text, pathID, outDir)
+    return numLines, (pathID, outDir)
+
+"""
+Downloads pathway SIFs from Pathway Commons using workers threads sharing one HTTP session.
+Requests are limited by a shared TokenBucket, since Pathway Commons warns against many
+requests per second.
+
+Returns a dictionary from pathway URIs to SIF text, and a list of pathways that failed.
+"""
+def getPathwayFiles(reactomeNames,source="reactome",baseURL=PC_BASE_URL,session=None,bucket=None,workers=DEFAULT_WORKERS,retries=DEFAULT_RETRIES):
+    if session is None:
+        session = makeSession(workers)
+    if bucket is None:
+        bucket = TokenBucket(DEFAULT_RATE)
     allPaths=dict()
 
     #Initialize dictionary
     for name in reactomeNames:
         allPaths[name] = ""
+    delList = [] #List of errors to skip
 
     #Get pathways from pathwaycommons via web API
-    reqTxt = "http://www.pathwaycommons.org/pc2/get"
-    reqParams= {"uri":"","format":"SIF"}
+    i=0
+    print("Getting files", end="", flush=True)
+    pool = concurrent.futures.ThreadPoolExecutor(max(workers,1))
+    try:
+        futures = {pool.submit(getPathwayFile,session,baseURL,path,bucket,retries):path for path in allPaths}
+        for future in concurrent.futures.as_completed(futures):
+            i+=1
+            printProgress(i)
+            path = futures[future]
+            try:
+                path, text = future.result()
+            except requests.exceptions.RequestException as e:
+                print("Got exception ",e)
+                print("\n Removing pathway "+path+" from analysis and continuing")
+                delList.append(path)
+                continue
+            allPaths[path] = text
+    finally:
+        pool.shutdown(wait=False)
+    print()
+    return allPaths, delList
+
+"""
+Prints a dot for each finished pathway, and the count every 50 pathways
+"""
+def printProgress(i):
+    if i%50==0:
+        print(str(i), end="", flush=True)
+    else:
+        print(".", end="", flush=True)
+    return
+
+"""
+Runs fetch on each item in a pool of workers threads, and runs convert in a pool of
+convertWorkers processes on the items that need it, so downloads and conversions overlap.
+fetch(item) returns a value and a tuple of arguments for convert, or None if the item does not
+need converting. At most IN_FLIGHT_PER_WORKER items per thread and process are being fetched or
+converted at once, so memory use does not grow with the number of items.
+
+Yields each item when it is finished, with the value from fetch, or the exception if fetch
+failed with a RequestException, and the result of convert or None.
+"""
+def streamTasks(items, fetch, convert, workers=DEFAULT_WORKERS, convertWorkers=0):
+    if convertWorkers <= 0:
+        convertWorkers = os.cpu_count() or 1
+    workers = max(workers,1)
+    maxInFlight = IN_FLIGHT_PER_WORKER*(workers+convertWorkers)
+
+    fetchPool = concurrent.futures.ThreadPoolExecutor(workers)
+    convertPool = concurrent.futures.ProcessPoolExecutor(convertWorkers)
+    pending = dict()
+    items = iter(items)
+    try:
+        while True:
+            #Start fetching until the in flight limit is reached
+            while len(pending) < maxInFlight:
+                item = next(items, None)
+                if item is None:
+                    break
+                pending[fetchPool.submit(fetch,item)] = (item, "fetch", None)
+            if len(pending) == 0:
+                break
+
+            finished, _ = concurrent.futures.wait(pending, return_when=concurrent.futures.FIRST_COMPLETED)
+            for future in finished:
+                item, stage, value = pending.pop(future)
+                if stage == "convert":
+                    yield item, value, future.result()
+                    continue
+                try:
+                    value, convertArgs = future.result()
+                except requests.exceptions.RequestException as e:
+                    yield item, e, None
+                    continue
+                if convertArgs is None:
+                    yield item, value, None
+                else:
+                    pending[convertPool.submit(convert,*convertArgs)] = (item, "convert", value)
+    finally:
+        fetchPool.shutdown(wait=False)
+        convertPool.shutdown()
+    return
+
+"""
+Downloads pathways and saves them in outDir as they arrive, converting each one for graphlet
+decomposition while other downloads continue (see streamTasks). Downloads share one HTTP
+session and rate limiter.
+
+Each finished pathway is appended to checkpointF, and pathways already in it are skipped.
+Returns the list of pathways that failed to download.
+"""
+def streamPathways(reactomeNames,outDir,baseURL=PC_BASE_URL,session=None,bucket=None,workers=DEFAULT_WORKERS,retries=DEFAULT_RETRIES,convertWorkers=0,checkpointF=None):
+    if session is None:
+        session = makeSession(workers)
+    if bucket is None:
+        bucket = TokenBucket(DEFAULT_RATE)
+
+    done = readCheckpoint(checkpointF)
+    todo = [path for path in dict.fromkeys(reactomeNames) if path not in done]
+    if len(done) > 0:
+        print("Resuming with %d pathways already finished." %(len(done)))
+    checkpoint = None
+    if checkpointF is not None:
+        checkpoint = open(checkpointF,"a")
     delList = [] #List of errors to skip
 
     i=0
     print("Getting files", end="", flush=True)
-    for path in allPaths:
-        i+=1
-        if i%50==0:
-            print(str(i), end="", flush=True)
-        else:
-            print(".", end="", flush=True)
-        reqParams["uri"] = path
+    fetch = functools.partial(savePathwayFile,session,baseURL,bucket,retries,outDir)
+    try:
+        for path, numLines, _ in streamTasks(todo,fetch,convertPathway,workers,convertWorkers):
+            if isinstance(numLines, Exception):
+                print("Got exception ",numLines)
+                print("\n Removing pathway "+path+" from analysis and continuing")
+                delList.append(path)
+                continue
+            if numLines<2:
+                print("Skipping %s as it is 1 edge or less." %(path))
+            i+=1
+            printProgress(i)
+            if checkpoint is not None:
+                checkpoint.write(json.dumps({"uri":path,"time":time.time()})+"\n")
+                checkpoint.flush()
+    finally:
+        if checkpoint is not None:
+            checkpoint.close()
+    print()
+    return delList
 
-        #Pathway commons recommends using post, download can be slow so wait up to 10 minutes
-        try:
-            r = requests.post(reqTxt,params=reqParams,timeout=600.00)
-        except requests.exceptions.RequestException as e:
-            print("Got exception ",e)
-            print("\n Removing pathway "+path+" from analysis and continuing")
-            delList.append(path)
-            time.sleep(0.2)
+"""
+Hashes text or the contents of a file with SHA-256
+"""
+def sha256(text=None, fileName=None):
+    if fileName is not None:
+        inF = open(fileName, "rb")
+        data = inF.read()
+        inF.close()
+    else:
+        data = text.encode()
+    return hashlib.sha256(data).hexdigest()
+
+"""
+Gets the graphlet output file name of a pathway, which also names it in the reference store
+"""
+def graphletOutputName(pathID, outDir):
+    return os.path.join(outDir,"graphlets",pathID+".gOut")
+
+"""
+Downloads one pathway for refreshReactome, sending its ETag from the last refresh so an
+unchanged pathway need not be sent again. The ETag is only sent if the pathway's graphlet
+output file still exists, since a 304 reply has no pathway to rebuild it from. Pathways which
+are new or changed, judged by content hash, are saved in outDir/pathways. Returns a dictionary
+describing the pathway, and the arguments to decompose it if it must be decomposed.
+"""
+def fetchChangedPathway(session, baseURL, bucket, retries, outDir, known, path):
+    pathID = path.split("/")[-1]
+    etag, contentHash = known.get(path, (None, None))
+    unchanged = os.path.isfile(graphletOutputName(pathID, outDir))
+    headers = None
+    if etag is not None and unchanged:
+        headers = {"If-None-Match":etag}
+    reqParams= {"uri":path,"format":"SIF"}
+    r = postWithRetry(session,baseURL+"/get",reqParams,bucket,retries,headers=headers)
+    if r.status_code == 304:
+        if unchanged:
+            return {"status":"unchanged"}, None
+        #The body of a 304 reply is not the pathway, so rebuild from the saved copy
+        if contentHash is None or not os.path.isfile(os.path.join(outDir,"pathways",pathID+".sif")):
+            raise ValueError("Got 304 Not Modified for %s, which has no saved copy to rebuild from." %(path))
+        return {"status":"changed", "pathID":pathID, "sha256":contentHash, "etag":etag}, (pathID, outDir)
+
+    info = {"status":"changed", "pathID":pathID, "sha256":sha256(r.text), "etag":r.headers.get("ETag")}
+    if info["sha256"] == contentHash and unchanged:
+        info["status"] = "unchanged"
+        return info, None
+    if len(r.text.split("\n"))<2:
+        info["status"] = "tooSmall"
+        return info, None
+    writePathwayFile(r.text, pathID, outDir)
+    return info, (pathID, outDir)
+
+"""
+Converts a saved pathway in outDir/pathways and counts its graphlets with graphletCounts,
+writing outDir/graphlets/pathID.gOut. Returns hashes of both derived files and the graphlet
+distribution. Run in worker processes by refreshReactome.
+"""
+def decomposePathway(pathID, outDir):
+    convertPathway(pathID, outDir)
+    graphletF = os.path.join(outDir,"graphlets",pathID+".sif")
+    gOutF = graphletOutputName(pathID, outDir)
+    edges, nodes = readEdgeList(graphletF)
+    writeGraphletCounts(countGraphlets(edges, len(nodes)), len(nodes), gOutF)
+    return sha256(fileName=graphletF), sha256(fileName=gOutF), loadSingleGFD(gOutF,0,False)
+
+"""
+Removes the saved and derived files of a pathway
+"""
+def removePathwayFiles(pathID, outDir):
+    for pathF in [os.path.join(outDir,"pathways",pathID+".sif"), os.path.join(outDir,"graphlets",pathID+".sif"), graphletOutputName(pathID, outDir)]:
+        if os.path.isfile(pathF):
+            os.remove(pathF)
+    return
+
+"""
+Reads the manifest of a previous refresh, or returns an empty manifest
+"""
+def readManifest(manifestF, source):
+    if not os.path.isfile(manifestF):
+        return {"source":source, "pathways":dict()}
+    inF = open(manifestF)
+    manifest = json.load(inF)
+    inF.close()
+    return manifest
+
+"""
+Writes a manifest through a temporary file
+"""
+def writeManifest(manifest, manifestF):
+    out = open(manifestF+".tmp","w")
+    json.dump(manifest, out, indent=1, sort_keys=True)
+    out.close()
+    os.replace(manifestF+".tmp", manifestF)
+    return
+
+"""
+Refreshes the pathways from source in outDir using the manifest from the last refresh, which
+records the URI, content hash, ETag and fetch time of each pathway, and hashes of its derived
+files. Only new or changed pathways are saved, converted and decomposed with graphletCounts,
+pathways which are no longer in source are removed, and the reference store in storeDir is
+updated with graphletUtils.updateReferenceStore. The first refresh of outDir builds the store
+from all pathways. If any pathway changed, the index of the store is rebuilt if it has one, or
+built if buildIndex is set. If none changed, the store is left as it is.
+
+The manifest, reference store and list of graphlet files are only written once every pathway
+is finished, so an interrupted refresh can simply be run again.
+"""
+def refreshReactome(outDir,source="reactome",baseURL=PC_BASE_URL,workers=DEFAULT_WORKERS,rate=DEFAULT_RATE,retries=DEFAULT_RETRIES,convertWorkers=0,storeDir="",buildIndex=False):
+    makeOutputDirectories(outDir)
+    if storeDir == "":
+        storeDir = os.path.join(outDir,REFERENCE_STORE)
+    manifestF = os.path.join(outDir,MANIFEST_FILE)
+    manifest = readManifest(manifestF, source)
+    if manifest["source"] != source:
+        print("Error: %s holds pathways from %s, not %s. Use a separate directory for each source." %(outDir,manifest["source"],source))
+        return
+    entries = manifest["pathways"]
+    firstRefresh = len(entries)==0
+
+    session = makeSession(workers)
+    bucket = TokenBucket(rate)
+    names = list(dict.fromkeys(getAllPathwayNames(source,baseURL,session,bucket,retries)))
+    print("Found %d pathways from %s in Pathway Commons." %(len(names),source))
+
+    #Pathways which are no longer in source
+    removed = []
+    nameSet = set(names)
+    for path in [path for path in entries if path not in nameSet]:
+        removed.append(entries.pop(path)["pathID"])
+
+    known = {path:(entries[path].get("etag"), entries[path]["sha256"]) for path in entries}
+    fetch = functools.partial(fetchChangedPathway,session,baseURL,bucket,retries,outDir,known)
+    changed = dict()
+    numUnchanged = 0
+    numFailed = 0
+    i=0
+    print("Getting files", end="", flush=True)
+    for path, info, result in streamTasks(names,fetch,decomposePathway,workers,convertWorkers):
+        i+=1
+        printProgress(i)
+        if isinstance(info, Exception):
+            print("Got exception ",info)
+            print("\n Keeping the previous version of pathway "+path+" and continuing")
+            numFailed += 1
+            continue
+        if info["status"] == "unchanged":
+            numUnchanged += 1
+            entries[path]["fetched"] = time.time()
+            if info.get("etag") is not None:
+                entries[path]["etag"] = info["etag"]
             continue
+        if info["status"] == "tooSmall":
+            print("Skipping %s as it is 1 edge or less." %(path))
+            if path in entries:
+                removed.append(entries.pop(path)["pathID"])
+            continue
+        graphletsHash, gOutHash, gfd = result
+        entries[path] = {"pathID":info["pathID"], "sha256":info["sha256"], "etag":info["etag"], "fetched":time.time(),
+                         "graphletsSha256":graphletsHash, "gOutSha256":gOutHash}
+        changed[graphletOutputName(info["pathID"], outDir)] = gfd
+    print()
 
-        allPaths[path] = r.text
-        #Pathway commons warns not to do multiple per second.
-        #Annoying, but needed to prevent a IP address ban.
-        time.sleep(0.2)
-    return allPaths, delList
+    for pathID in removed:
+        removePathwayFiles(pathID, outDir)
+    gOutFs = sorted(graphletOutputName(entries[path]["pathID"], outDir) for path in entries)
+    listF = os.path.join(outDir,GRAPHLETS_LIST)
+    out = open(listF+".tmp","w")
+    for gOutF in gOutFs:
+        out.write(gOutF+"\n")
+    out.close()
+    os.replace(listF+".tmp", listF)
+    storeChanged = len(changed)>0 or len(removed)>0
+    if firstRefresh or not isReferenceStore(storeDir):
+        convertToReferenceStore(listF, storeDir, False)
+        storeChanged = True
+    elif storeChanged:
+        updateReferenceStore(storeDir, changed, [graphletOutputName(pathID, outDir) for pathID in removed])
+    hasIndex = hasReferenceIndex(storeDir)
+    if (storeChanged and (buildIndex or hasIndex)) or (buildIndex and not hasIndex):
+        buildReferenceIndex(storeDir)
+    manifest["updated"] = time.time()
+    writeManifest(manifest, manifestF)
+    print("%d pathways new or changed, %d removed, %d unchanged and %d failed." %(len(changed),len(removed),numUnchanged,numFailed))
+    return
 
-if __name__ == "__main__":
+"""
+Downloads reference pathways with the command line arguments in argv, by default sys.argv[1:].
+If incremental is set, pathways are refreshed as if --incremental was given.
+"""
+def main(argv=None, incremental=False):
     parser = argparse.ArgumentParser(description="As a script, this file downloads the latest version of all human Reactome pathways from Pathway Commons and prepares them for graphlet decomposition using the PGD library. Version %s, released under the MIT license."%(ppa.__version__))
     parser.add_argument("--outputDirectory", default="referencePathways", help="Directory where reactome pathways will be stored. Two subdirectories will be created, to hold raw pathways and pathways ready for graphlet decomposition.")
     parser.add_argument("--source", default="reactome", help="Source database in Pathway Commons to get pathways from. See https://www.pathwaycommons.org/pc2/datasources for a list of possible data sources.")
-    args = parser.parse_args()
+    parser.add_argument("--baseURL", default=PC_BASE_URL, help="Base URL of the Pathway Commons web API.")
+    parser.add_argument("--workers", default=DEFAULT_WORKERS, type=int, help="Number of pathways downloaded at once.")
+    parser.add_argument("--rate", default=DEFAULT_RATE, type=float, help="Maximum number of requests per second.")
+    parser.add_argument("--retries", default=DEFAULT_RETRIES, type=int, help="Number of times a failed request is retried, with exponential backoff.")
+    parser.add_argument("--convertWorkers", default=0, type=int, help="Number of processes converting pathways for graphlet decomposition. Default is one per core.")
+    parser.add_argument("--incremental", action="store_true", help="If set, only new or changed pathways are downloaded and decomposed, using a manifest kept in the output directory, and the reference store is updated. Adding or removing pathways rewrites the whole store.")
+    parser.add_argument("--referenceStore", default="", help="Reference store updated by --incremental. Default is reactomeStore in the output directory.")
+    parser.add_argument("--referenceIndex", action="store_true", help="If set, the index of the reference store is built by --incremental. An existing index is always rebuilt.")
+    args = parser.parse_args(argv)
     outDir = args.outputDirectory
     source = args.source
-    updateReactome(outDir,source)
+    if args.incremental or incremental:
+        refreshReactome(outDir,source,args.baseURL,args.workers,args.rate,args.retries,args.convertWorkers,args.referenceStore,args.referenceIndex)
+    else:
+        updateReactome(outDir,source,args.baseURL,args.workers,args.rate,args.retries,args.convertWorkers)
+
+"""
+Refreshes reference pathways incrementally with the command line arguments in argv, by default
+sys.argv[1:], for the ppa-update command.
+"""
+def updateMain(argv=None):
+    main(argv, True)
+
+if __name__ == "__main__":
+    main()
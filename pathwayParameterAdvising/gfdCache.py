@@ -0,0 +1,160 @@
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import argparse
+from pathwayParameterAdvising.graphletUtils import loadSingleGFD
+import pathwayParameterAdvising as ppa
+
+"""
+Created: 10/18/2026
+
+Description: This file contains a persistent cache of parsed and normalized graphlet
+distributions, so unchanged graphlet output files are not parsed again on every run.
+
+Distributions are stored in an SQLite database keyed by the SHA-256 hash of the file contents.
+A second table maps each file path to its size, modification time and content hash, so files
+whose metadata is unchanged are found without reading them. The total size of stored
+distributions is bounded, and the least recently used ones are evicted first.
+
+When run as a script this file prints statistics for a cache, or clears it.
+"""
+
+#Default bound on the size of stored distributions, in bytes
+DEFAULT_CACHE_SIZE = 256*2**20
+
+class GFDCache:
+    """
+    Opens or creates the cache in cacheDir. maxBytes bounds the total size of the
+    serialized distributions kept in the cache.
+    """
+    def __init__(self, cacheDir, maxBytes=DEFAULT_CACHE_SIZE):
+        os.makedirs(cacheDir, 0o755, exist_ok=True)
+        self.maxBytes = maxBytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.db = sqlite3.connect(os.path.join(cacheDir, "gfdCache.sqlite"), timeout=60)
+        self.db.execute("CREATE TABLE IF NOT EXISTS gfds (hash TEXT PRIMARY KEY, gfd TEXT, nbytes INTEGER, lastUsed REAL)")
+        self.db.execute("CREATE TABLE IF NOT EXISTS files (path TEXT PRIMARY KEY, size INTEGER, mtime INTEGER, hash TEXT)")
+        self.db.commit()
+        self.totalBytes = self.db.execute("SELECT COALESCE(SUM(nbytes),0) FROM gfds").fetchone()[0]
+        self.evict()
+
+    """
+    Gets the graphlet distribution of a graphlet output file like graphletUtils.loadSingleGFD,
+    returning an empty dictionary if its size is below minSize. Distributions are parsed
+    and added to the cache if the file contents are not already cached.
+    """
+    def loadSingleGFD(self, name, minSize, verbose):
+        path = os.path.abspath(name)
+        stat = os.stat(path)
+        contentHash = None
+        row = self.db.execute("SELECT size, mtime, hash FROM files WHERE path=?", (path,)).fetchone()
+        if row is not None and row[0] == stat.st_size and row[1] == stat.st_mtime_ns:
+            contentHash = row[2]
+        gfd = None
+        if contentHash is not None:
+            gfd = self.get(contentHash)
+        if gfd is None:
+            inF = open(path, "rb")
+            contentHash = hashlib.sha256(inF.read()).hexdigest()
+            inF.close()
+            gfd = self.get(contentHash)
+            self.db.execute("INSERT OR REPLACE INTO files VALUES (?,?,?,?)", (path, stat.st_size, stat.st_mtime_ns, contentHash))
+
+        if gfd is None:
+            self.misses += 1
+            gfd = loadSingleGFD(name, 0, False)
+            self.put(contentHash, gfd)
+        else:
+            self.hits += 1
+
+        if "size" in gfd and gfd["size"]<minSize:
+            if verbose:
+                print("Skipping "+name+" with size",gfd["size"])
+            return dict()
+        return gfd
+
+    """
+    Gets a cached distribution by content hash, or None if it is not cached
+    """
+    def get(self, contentHash):
+        row = self.db.execute("SELECT gfd FROM gfds WHERE hash=?", (contentHash,)).fetchone()
+        if row is None:
+            return None
+        self.db.execute("UPDATE gfds SET lastUsed=? WHERE hash=?", (time.time(), contentHash))
+        return json.loads(row[0])
+
+    """
+    Adds a distribution to the cache, then evicts distributions if needed
+    """
+    def put(self, contentHash, gfd):
+        gfdText = json.dumps(gfd)
+        self.db.execute("INSERT OR REPLACE INTO gfds VALUES (?,?,?,?)", (contentHash, gfdText, len(gfdText), time.time()))
+        self.totalBytes += len(gfdText)
+        self.evict()
+        return
+
+    """
+    Evicts least recently used distributions until the cache is within its size bound
+    """
+    def evict(self):
+        while self.totalBytes > self.maxBytes:
+            row = self.db.execute("SELECT hash, nbytes FROM gfds ORDER BY lastUsed LIMIT 1").fetchone()
+            self.db.execute("DELETE FROM gfds WHERE hash=?", (row[0],))
+            self.db.execute("DELETE FROM files WHERE hash=?", (row[0],))
+            self.totalBytes -= row[1]
+            self.evictions += 1
+        return
+
+    """
+    Gets hit, miss and eviction counts since the cache was opened, along with the number
+    and total size of cached distributions.
+    """
+    def stats(self):
+        entries = self.db.execute("SELECT COUNT(*) FROM gfds").fetchone()[0]
+        return {"hits":self.hits, "misses":self.misses, "evictions":self.evictions, "entries":entries, "bytes":self.totalBytes}
+
+    """
+    Removes all cached distributions
+    """
+    def clear(self):
+        self.db.execute("DELETE FROM gfds")
+        self.db.execute("DELETE FROM files")
+        self.db.commit()
+        self.totalBytes = 0
+        return
+
+    """
+    Saves changes to the cache. Changes are also saved when the cache is closed.
+    """
+    def flush(self):
+        self.db.commit()
+        return
+
+    def close(self):
+        self.db.commit()
+        self.db.close()
+        return
+
+
+"""
+Prints statistics for or clears the graphlet cache given by the command line arguments in argv,
+by default sys.argv[1:].
+"""
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Prints statistics for a cache of parsed graphlet distributions, or clears it. Version %s, released under the MIT license."%(ppa.__version__))
+    parser.add_argument("cacheDirectory", help="Directory of the graphlet distribution cache.")
+    parser.add_argument("--clear", action="store_true", help="If set, will remove all cached distributions.")
+    args = parser.parse_args(argv)
+    cache = GFDCache(args.cacheDirectory)
+    if args.clear:
+        cache.clear()
+    stats = cache.stats()
+    print("%d cached graphlet distributions using %d bytes." %(stats["entries"], stats["bytes"]))
+    cache.close()
+
+if __name__ == "__main__":
+    main()
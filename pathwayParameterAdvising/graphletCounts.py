@@ -0,0 +1,305 @@
+import os
+import argparse
+import numpy as np
+import pathwayParameterAdvising as ppa
+
+"""
+Created: 10/18/2026
+
+Description: This file counts the 2-, 3- and 4-node graphlets of a network, giving the same
+totals as the graphlet counts block of PGD output files. Graphlets are counted with vectorized
+combinatorial formulas on the sparse neighbor lists of the network (triangles per edge, wedges,
+4-cycles from wedges between node pairs), so networks can be ranked without running PGD or
+parsing its output.
+
+When run as a script this file writes the counts for a network file in the format of a PGD
+output file, which can be read by graphletUtils.loadSingleGFD.
+"""
+
+#Graphlet count names in the order they are written by PGD
+GRAPHLET_NAMES = ["total_2_1edge", "total_2_indep",
+                  "total_3_tris", "total_2_star", "total_3_1edge", "total_3_indep",
+                  "total_4_clique", "total_4_chordcycle", "total_4_tailed_tris", "total_4_cycle", "total_3_star", "total_4_path",
+                  "total_4_1edge", "total_4_2edge", "total_4_2star", "total_4_tri", "total_4_indep"]
+
+#Number of neighbor list entries gathered at once when counting triangles, 4-cycles and 4-cliques
+COUNT_BLOCK_ELEMENTS = 2**22
+
+"""
+Number of ways to choose k items from n
+"""
+def choose(n, k):
+    out = 1
+    for i in range(k):
+        out = out*(n-i)//(i+1)
+    return out
+
+"""
+Gets an undirected edge array and node count from a network, which can be a networkx graph,
+a CSR adjacency (an object with indptr and indices attributes such as a scipy.sparse matrix,
+or an (indptr, indices) tuple), or an integer array of edges with one edge per row.
+
+Edge arrays are relabeled to 0..n-1 unless numNodes is given, in which case node ids must
+already be in that range. Self loops and duplicate edges are removed.
+"""
+def edgeArray(net, numNodes=None):
+    if hasattr(net, "adj"):
+        nodeIDs = {node:i for i,node in enumerate(net)}
+        edges = np.array([[nodeIDs[u],nodeIDs[v]] for u,v in net.edges()], dtype=np.int64).reshape(-1,2)
+        numNodes = len(nodeIDs)
+    elif hasattr(net, "indptr") or isinstance(net, tuple):
+        if isinstance(net, tuple):
+            indptr, indices = net
+        else:
+            indptr, indices = net.indptr, net.indices
+        numNodes = len(indptr)-1
+        rows = np.repeat(np.arange(numNodes), np.diff(indptr))
+        edges = np.column_stack([rows, indices]).astype(np.int64)
+    else:
+        edges = np.asarray(net, dtype=np.int64).reshape(-1,2)
+        if numNodes is None:
+            nodes, edges = np.unique(edges, return_inverse=True)
+            edges = edges.reshape(-1,2)
+            numNodes = len(nodes)
+
+    edges = edges[edges[:,0] != edges[:,1]]
+    edges = np.unique(np.sort(edges, axis=1), axis=0)
+    return edges, numNodes
+
+"""
+Counts all 2-, 3- and 4-node graphlets in a network (see edgeArray for accepted formats).
+Returns a dictionary from the names in GRAPHLET_NAMES to the number of induced subgraphs of
+each type, matching the totals computed by PGD.
+"""
+def countGraphlets(net, numNodes=None):
+    n, totals = countSubgraphs(net, numNodes)
+    return inducedCounts(n, **totals)
+
+"""
+Gets the CSR adjacency (indptr, indices) of an undirected edge array with numNodes nodes
+"""
+def csrAdjacency(edges, numNodes):
+    rows = np.concatenate([edges[:,0], edges[:,1]])
+    cols = np.concatenate([edges[:,1], edges[:,0]])
+    indptr = np.zeros(numNodes+1, dtype=np.int64)
+    np.cumsum(np.bincount(rows, minlength=numNodes), out=indptr[1:])
+    return indptr, cols[np.argsort(rows, kind="stable")]
+
+"""
+Gets the positions in the indices of a CSR adjacency of the neighbors of each node in nodes,
+concatenated
+"""
+def neighborOffsets(indptr, nodes):
+    starts = indptr[nodes]
+    lengths = indptr[nodes+1]-starts
+    return np.repeat(starts-np.cumsum(lengths)+lengths, lengths) + np.arange(lengths.sum())
+
+"""
+Gets the neighbors of each node in nodes, concatenated, from a CSR adjacency
+"""
+def gatherNeighbors(indptr, indices, nodes):
+    return indices[neighborOffsets(indptr, nodes)]
+
+"""
+Splits items with the given sizes into consecutive blocks holding at most COUNT_BLOCK_ELEMENTS
+in total and at most maxItems items, or a single item if it is larger, yielding the start and
+end of each block
+"""
+def sizeBlocks(sizes, maxItems=None):
+    ends = np.cumsum(sizes)
+    start = 0
+    while start < len(ends):
+        done = ends[start-1] if start > 0 else 0
+        end = max(start+1, int(np.searchsorted(ends, done+COUNT_BLOCK_ELEMENTS, side="right")))
+        if maxItems is not None:
+            end = min(end, start+maxItems)
+        yield start, end
+        start = end
+
+"""
+Finds the positions of edges, given as keys u*n+v, in the sorted keys of a network's edges.
+Returns the positions and whether each edge was found.
+"""
+def findEdges(keys, queries):
+    pos = np.searchsorted(keys, queries)
+    found = keys[np.minimum(pos, len(keys)-1)] == queries if len(keys) > 0 else np.zeros(len(queries), dtype=bool)
+    return pos, found
+
+"""
+Counts the non-induced connected subgraphs of a network (see edgeArray for accepted formats)
+which inducedCounts needs. Returns the number of nodes and a dictionary from the arguments of
+inducedCounts to their counts.
+
+Nodes are numbered by degree and each edge is directed from its lower to its higher numbered
+node, so high degree nodes have few out-neighbors. Triangles and 4-cliques are then listed once
+each by intersecting out-neighbor lists, and 4-cycles are counted from the wedges between each
+node and the lower numbered nodes, so the work grows with the number of edges and not nodes.
+"""
+def countSubgraphs(net, numNodes=None):
+    edges, n = edgeArray(net, numNodes)
+    m = len(edges)
+
+    #Renumber nodes by degree and sort the edges, each from its lower to its higher node
+    deg = np.bincount(edges.ravel(), minlength=n).astype(np.int64)
+    byDegree = np.lexsort((np.arange(n), deg))
+    rank = np.empty(n, dtype=np.int64)
+    rank[byDegree] = np.arange(n)
+    deg = deg[byDegree]
+    edges = np.sort(rank[edges], axis=1)
+    edges = edges[np.lexsort((edges[:,1], edges[:,0]))]
+    keys = edges[:,0]*n+edges[:,1]
+    outPtr = np.zeros(n+1, dtype=np.int64)
+    np.cumsum(np.bincount(edges[:,0], minlength=n), out=outPtr[1:])
+    outDeg = np.diff(outPtr)
+
+    #Triangles u < v < w on each edge and node, from the out-neighbors w of v which are also
+    #out-neighbors of u, and 4-cliques from the out-neighbors of w adjacent to both u and v
+    edgeTris = np.zeros(m, dtype=np.int64)
+    nodeTris = np.zeros(n, dtype=np.int64)
+    cliques = 0
+    for start, end in sizeBlocks(outDeg[edges[:,1]]):
+        uvEdges = np.repeat(np.arange(start, end), outDeg[edges[start:end,1]])
+        vwEdges = neighborOffsets(outPtr, edges[start:end,1])
+        u = edges[uvEdges,0]
+        w = edges[vwEdges,1]
+        uwEdges, found = findEdges(keys, u*n+w)
+        uvEdges, vwEdges, uwEdges = uvEdges[found], vwEdges[found], uwEdges[found]
+        triEdges = np.concatenate([uvEdges, vwEdges, uwEdges])
+        edgeTris += np.bincount(triEdges, minlength=m)
+        nodeTris += np.bincount(np.concatenate([edges[uvEdges].ravel(), edges[vwEdges,1]]), minlength=n)
+        u, v, w = edges[uvEdges,0], edges[uvEdges,1], edges[vwEdges,1]
+        for triStart, triEnd in sizeBlocks(outDeg[w]):
+            x = gatherNeighbors(outPtr, edges[:,1], w[triStart:triEnd])
+            lengths = outDeg[w[triStart:triEnd]]
+            found = findEdges(keys, np.repeat(u[triStart:triEnd], lengths)*n+x)[1]
+            found &= findEdges(keys, np.repeat(v[triStart:triEnd], lengths)*n+x)[1]
+            cliques += int(found.sum())
+
+    #4-cycles, from the number of wedges a-c-b from each node a to each lower numbered node b
+    #through a lower numbered node c. Each 4-cycle is counted once, from its highest node.
+    indptr, indices = csrAdjacency(edges, n)
+    byHigh = np.lexsort((edges[:,0], edges[:,1]))
+    centers, highs = edges[byHigh,0], edges[byHigh,1]
+    inPtr = np.zeros(n+1, dtype=np.int64)
+    np.cumsum(np.bincount(highs, minlength=n), out=inPtr[1:])
+    wedgeSizes = np.bincount(highs, weights=deg[centers], minlength=n).astype(np.int64)
+    cycles = 0
+    for start, end in sizeBlocks(wedgeSizes):
+        blockCenters = centers[inPtr[start]:inPtr[end]]
+        a = np.repeat(highs[inPtr[start]:inPtr[end]], deg[blockCenters])
+        b = gatherNeighbors(indptr, indices, blockCenters)
+        lower = b < a
+        pairWedges = np.unique(a[lower]*n+b[lower], return_counts=True)[1]
+        cycles += int((pairWedges*(pairWedges-1)//2).sum())
+
+    #Non-induced subgraph counts
+    tris = int(edgeTris.sum())//3
+    wedges = int((deg*(deg-1)//2).sum())
+    stars = int((deg*(deg-1)*(deg-2)//6).sum())
+    paths = int(((deg[edges[:,0]]-1)*(deg[edges[:,1]]-1)).sum()) - 3*tris
+    tailedTris = int((nodeTris*(deg-2)).sum())
+    chordCycles = int((edgeTris*(edgeTris-1)//2).sum())
+
+    return n, {"m":m, "tris":tris, "wedges":wedges, "stars":stars, "paths":paths, "tailedTris":tailedTris,
+               "chordCycles":chordCycles, "cycles":cycles, "cliques":cliques}
+
+"""
+Converts counts of non-induced subgraphs of a network with n nodes and m edges into the number
+of induced subgraphs of each type in GRAPHLET_NAMES, returned as a dictionary. The non-induced
+counts are of triangles, wedges, 3-stars, 3-edge paths, tailed triangles, chorded 4-cycles,
+4-cycles and 4-cliques. Counts may also be arrays of estimates, giving arrays of estimates.
+"""
+def inducedCounts(n, m, tris, wedges, stars, paths, tailedTris, chordCycles, cycles, cliques):
+    counts = dict()
+    counts["total_2_1edge"] = m
+    counts["total_2_indep"] = choose(n,2) - m
+    counts["total_3_tris"] = tris
+    counts["total_2_star"] = wedges - 3*tris
+    counts["total_3_1edge"] = m*(n-2) - 2*counts["total_2_star"] - 3*tris
+    counts["total_3_indep"] = choose(n,3) - tris - counts["total_2_star"] - counts["total_3_1edge"]
+    counts["total_4_clique"] = cliques
+    counts["total_4_chordcycle"] = chordCycles - 6*cliques
+    counts["total_4_tailed_tris"] = tailedTris - 4*counts["total_4_chordcycle"] - 12*cliques
+    counts["total_4_cycle"] = cycles - counts["total_4_chordcycle"] - 3*cliques
+    counts["total_3_star"] = stars - counts["total_4_tailed_tris"] - 2*counts["total_4_chordcycle"] - 4*cliques
+    counts["total_4_path"] = (paths - 2*counts["total_4_tailed_tris"] - 4*counts["total_4_cycle"]
+                              - 6*counts["total_4_chordcycle"] - 12*cliques)
+    connected4 = [counts[g] for g in GRAPHLET_NAMES[6:12]]
+    counts["total_4_tri"] = (tris*(n-3) - counts["total_4_tailed_tris"] - 2*counts["total_4_chordcycle"] - 4*cliques)
+    counts["total_4_2star"] = (counts["total_2_star"]*(n-3) - 3*counts["total_3_star"] - 2*counts["total_4_path"]
+                               - 2*counts["total_4_tailed_tris"] - 4*counts["total_4_cycle"] - 2*counts["total_4_chordcycle"])
+    counts["total_4_2edge"] = ((choose(m,2) - wedges) - counts["total_4_path"] - 2*counts["total_4_cycle"]
+                               - counts["total_4_tailed_tris"] - 2*counts["total_4_chordcycle"] - 3*cliques)
+    #Each 4 node set is counted once per edge it contains
+    counts["total_4_1edge"] = (m*choose(n-2,2) - 2*(counts["total_4_2edge"]+counts["total_4_2star"])
+                               - 3*(counts["total_4_tri"]+counts["total_3_star"]+counts["total_4_path"])
+                               - 4*(counts["total_4_cycle"]+counts["total_4_tailed_tris"])
+                               - 5*counts["total_4_chordcycle"] - 6*cliques)
+    counts["total_4_indep"] = (choose(n,4) - sum(connected4) - counts["total_4_tri"] - counts["total_4_2star"]
+                               - counts["total_4_2edge"] - counts["total_4_1edge"])
+    return {g:counts[g] for g in GRAPHLET_NAMES}
+
+"""
+Reads a sif or edgelist network file as an edge array and list of node names. Node names
+are the first two fields of each line, split on delim or whitespace if delim is empty.
+Text after a # is ignored.
+"""
+def readEdgeList(networkFile, delim=""):
+    inF = open(networkFile)
+    text = inF.read()
+    inF.close()
+    lines = text.split("\n")
+    if "#" in text:
+        lines = [line.split("#")[0] for line in lines]
+    if delim == "":
+        lineLists = map(str.split, lines)
+    else:
+        lineLists = (line.strip().split(delim) for line in lines)
+    #Nodes are numbered in the order they first appear
+    nodeIDs = dict()
+    edges = [(nodeIDs.setdefault(lineList[0], len(nodeIDs)), nodeIDs.setdefault(lineList[1], len(nodeIDs)))
+             for lineList in lineLists if len(lineList) >= 2]
+    return np.array(edges, dtype=np.int64).reshape(-1,2), list(nodeIDs)
+
+"""
+Writes graphlet counts in the format of a PGD output file, which can be loaded with
+graphletUtils.loadSingleGFD. Lines in notes, such as the confidence intervals of estimated
+counts, are written after the graphlet counts block, where they are not read as counts.
+"""
+def writeGraphletCounts(counts, numNodes, outF, notes=()):
+    tmpF = outF+".tmp"
+    out = open(tmpF, "w")
+    out.write("|V|: %d\n" %(numNodes))
+    out.write("|E|: %d\n" %(counts["total_2_1edge"]))
+    out.write("*"*60+"\n")
+    for g in GRAPHLET_NAMES:
+        out.write("%s = %d\n" %(g, counts[g]))
+    out.write("*"*60+"\n")
+    for line in notes:
+        out.write(line+"\n")
+    out.close()
+    os.replace(tmpF, outF)
+    return
+
+
+"""
+Counts the graphlets of the network file given by the command line arguments in argv, by default
+sys.argv[1:].
+"""
+def main(argv=None):
+    #Parse Arguments
+    parser = argparse.ArgumentParser(description="This script counts the graphlets of a sif or edgelist network file and saves them in the format of a PGD output file. Version %s, released under the MIT license" %(ppa.__version__))
+    parser.add_argument("networkFile", help="Network sif or edgelist network file to count graphlets in. The network is treated as undirected.")
+    parser.add_argument("--delim", help="Node delimiter in network file. Default is none, which splits lines on whitespace.", default="")
+    parser.add_argument("--outFile", help="File to store graphlet counts in. Default is NETWORKFILE with the extension changed to .gOut.", default="")
+    args = parser.parse_args(argv)
+    networkFile = args.networkFile
+    outF = args.outFile
+    if outF == "":
+        outF = os.path.splitext(networkFile)[0]+".gOut"
+    edges, nodes = readEdgeList(networkFile, args.delim)
+    writeGraphletCounts(countGraphlets(edges, len(nodes)), len(nodes), outF)
+    print("Counted graphlets of "+networkFile+" into "+outF)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,302 @@
+import os
+import time
+import argparse
+import numpy as np
+from collections import namedtuple
+from pathwayParameterAdvising.graphletCounts import GRAPHLET_NAMES, edgeArray, inducedCounts, readEdgeList, writeGraphletCounts, csrAdjacency, gatherNeighbors, sizeBlocks, COUNT_BLOCK_ELEMENTS
+from pathwayParameterAdvising.graphletUtils import graphletDistribution
+from pathwayParameterAdvising.convertNetworks import iterNetworks
+from pathwayParameterAdvising import profiling
+import pathwayParameterAdvising as ppa
+
+"""
+Created: 10/18/2026
+
+Description: This file estimates the 2-, 3- and 4-node graphlet counts of large networks from a
+sample of their edges, with bootstrap confidence intervals, instead of counting them exactly
+with PGD or graphletCounts.countGraphlets.
+
+Counts of edges, wedges, 3-stars and 3-edge paths follow from node degrees and are exact. The
+other connected graphlets (triangles, tailed triangles, chorded 4-cycles, 4-cycles and
+4-cliques) are counted around each sampled edge, and their totals estimated from the mean over
+sampled edges. Induced and disconnected counts then follow from graphletCounts.inducedCounts.
+Edges are sampled in rounds which double the sample until the estimated graphlet distribution
+is within an error budget, a time budget runs out, or every edge is sampled, in which case the
+counts are exact.
+
+Errors are L1 distances between graphlet distributions, the distance used to score generated
+pathways, so the score of a generated pathway is within the error of its score with exact
+counts. When run as a script this file writes estimated counts for a network file in the format
+of a PGD output file, followed by their confidence intervals.
+"""
+
+#Edges sampled in the first round of estimation. Each later round doubles the sample.
+SAMPLE_START_EDGES = 1024
+
+#Default largest L1 error of an estimated graphlet distribution
+DEFAULT_MAX_ERROR = 0.01
+
+#Default confidence of errors and intervals
+DEFAULT_CONFIDENCE = 0.95
+
+#Number of bootstrap replicates of the sampled edges
+NUM_BOOTSTRAP = 200
+
+#Number of bootstrap weights drawn at once
+BOOTSTRAP_BLOCK_ELEMENTS = 2**22
+
+#Each triangle, tailed triangle, 4-cycle and 4-clique is counted around each of its 3, 3, 4
+#and 6 edges. Chorded 4-cycles are only counted around their chord.
+EDGE_COUNT_DIVISORS = np.array([3, 3, 1, 4, 6])
+
+#Estimated graphlet counts of a network. counts and intervals are dictionaries from the names in
+#GRAPHLET_NAMES to counts and to (lower, upper) bounds, and error bounds the L1 distance from the
+#estimated to the exact graphlet distribution, both at the confidence the estimate was made with.
+GraphletEstimate = namedtuple("GraphletEstimate", ["counts", "intervals", "error", "numSampled", "numEdges", "numNodes", "seconds"])
+
+"""
+Sums the consecutive groups of values with the given lengths
+"""
+def groupSums(values, lengths):
+    sums = np.zeros(len(values)+1, dtype=np.int64)
+    np.cumsum(values, out=sums[1:])
+    ends = np.cumsum(lengths)
+    return sums[ends]-sums[ends-lengths]
+
+"""
+Counts the connected graphlets around each edge (u, v) in edges, from the CSR adjacency of the
+network. Returns an array with a row per edge of the number of triangles containing the edge,
+the sum over those triangles of the degrees of their nodes minus 2 (the tailed triangles with
+that triangle), the chorded 4-cycles with the edge as chord, and the 4-cycles and 4-cliques
+containing the edge. Blocks of edges are counted at once, looking up the neighbors gathered for
+every edge of a block in boolean masks with a row per edge.
+"""
+def edgeLocalCounts(indptr, indices, edges):
+    n = len(indptr)-1
+    deg = np.diff(indptr)
+    nbrDegrees = np.bincount(np.repeat(np.arange(n), deg), weights=deg[indices], minlength=n).astype(np.int64)
+    #Counts are the same from either end of an edge, so gather from the end with fewer neighbors of neighbors
+    swap = nbrDegrees[edges[:,0]] > nbrDegrees[edges[:,1]]
+    edges = np.where(swap[:,None], edges[:,::-1], edges)
+    local = np.zeros((len(edges), len(EDGE_COUNT_DIVISORS)), dtype=np.int64)
+    #Row i of each mask marks the neighbors of v, or the common neighbors of u and v, for edge i of a block
+    maxEdges = max(1, COUNT_BLOCK_ELEMENTS//max(n,1))
+    inV = np.zeros(min(maxEdges, len(edges))*n, dtype=bool)
+    inCommon = np.zeros(len(inV), dtype=bool)
+    for start, end in sizeBlocks(deg[edges[:,0]]+nbrDegrees[edges[:,0]], maxEdges):
+        u, v = edges[start:end,0], edges[start:end,1]
+        numEdges = end-start
+        vNbrs = np.repeat(np.arange(numEdges)*n, deg[v]) + gatherNeighbors(indptr, indices, v)
+        inV[vNbrs] = True
+        #Neighbors w of u, and the common neighbors of u and v among them
+        wEdges = np.repeat(np.arange(numEdges), deg[u])
+        w = gatherNeighbors(indptr, indices, u)
+        common = inV[wEdges*n+w]
+        numTris = np.bincount(wEdges[common], minlength=numEdges)
+        local[start:end,0] = numTris
+        local[start:end,1] = np.bincount(wEdges[common], weights=deg[w[common]], minlength=numEdges).astype(np.int64) + numTris*(deg[u]+deg[v]-6)
+        local[start:end,2] = numTris*(numTris-1)//2
+        #Each 4-cycle u, v, x, w has w a neighbor of u and x a neighbor of both w and v, other than u
+        notV = w != v[wEdges]
+        found = inV[np.repeat(wEdges[notV]*n, deg[w[notV]]) + gatherNeighbors(indptr, indices, w[notV])]
+        local[start:end,3] = groupSums(found, nbrDegrees[u]-deg[v]) - (deg[u]-1)
+        #Each 4-clique has two adjacent common neighbors of u and v
+        commonNbrs = wEdges[common]*n+w[common]
+        inCommon[commonNbrs] = True
+        found = inCommon[np.repeat(wEdges[common]*n, deg[w[common]]) + gatherNeighbors(indptr, indices, w[common])]
+        local[start:end,4] = np.bincount(np.repeat(wEdges[common], deg[w[common]])[found], minlength=numEdges)//2
+        inCommon[commonNbrs] = False
+        inV[vNbrs] = False
+    return local
+
+"""
+Converts totals of triangles, tailed triangles, chorded 4-cycles, 4-cycles and 4-cliques (the
+last axis of totals) into an array of induced graphlet counts in the order of GRAPHLET_NAMES.
+Counts are rounded and estimates below 0 are set to 0.
+"""
+def countsFromTotals(n, m, wedges, stars, pathEnds, totals):
+    tris, tailedTris, chordCycles, cycles, cliques = np.moveaxis(totals, -1, 0)
+    counts = inducedCounts(n, m, tris, wedges, stars, pathEnds-3*tris, tailedTris, chordCycles, cycles, cliques)
+    counts = np.stack([np.broadcast_to(np.asarray(counts[g], dtype=float), np.shape(tris)) for g in GRAPHLET_NAMES], axis=-1)
+    return np.rint(np.maximum(counts, 0))
+
+"""
+Converts arrays of graphlet counts (the last axis) into graphlet distributions the same way
+graphletUtils.graphletDistribution does
+"""
+def countDistributions(counts):
+    freqs = np.where(np.isfinite(counts) & (counts!=0), counts, 1.0)
+    return freqs/freqs.sum(axis=-1, keepdims=True)
+
+"""
+Gets bootstrap replicates of the totals estimated from the per edge counts local of sampled
+edges, out of numEdges, as a numBootstrap x 5 array. Replicates weight the sampled edges with
+Poisson weights, and their deviations from the estimate are scaled by the finite population
+correction for sampling without replacement.
+"""
+def bootstrapTotals(local, numEdges, numBootstrap, rng):
+    numSampled = len(local)
+    mean = local.mean(axis=0)
+    means = np.zeros((numBootstrap, local.shape[1]))
+    blockSize = max(1, BOOTSTRAP_BLOCK_ELEMENTS//numSampled)
+    for start in range(0, numBootstrap, blockSize):
+        weights = rng.poisson(1.0, (min(blockSize, numBootstrap-start), numSampled)).astype(float)
+        means[start:start+len(weights)] = (weights @ local)/np.maximum(weights.sum(axis=1), 1)[:,None]
+    scale = np.sqrt(1-numSampled/numEdges)
+    return numEdges*(mean+(means-mean)*scale)/EDGE_COUNT_DIVISORS
+
+"""
+Estimates the graphlet counts of a network (see graphletCounts.edgeArray for accepted formats)
+from sampled edges, returning a GraphletEstimate. Edges are sampled in random order, starting
+with SAMPLE_START_EDGES and doubling, until the error at the given confidence is at most
+maxError, maxSeconds have passed, or all edges are sampled, giving the exact counts.
+"""
+def estimateGraphlets(net, numNodes=None, maxError=DEFAULT_MAX_ERROR, maxSeconds=np.inf, confidence=DEFAULT_CONFIDENCE, numBootstrap=NUM_BOOTSTRAP, seed=0):
+    start = time.time()
+    edges, n = edgeArray(net, numNodes)
+    m = len(edges)
+    indptr, indices = csrAdjacency(edges, n)
+    deg = np.diff(indptr)
+    wedges = int((deg*(deg-1)//2).sum())
+    stars = int((deg*(deg-1)*(deg-2)//6).sum())
+    pathEnds = int(((deg[edges[:,0]]-1)*(deg[edges[:,1]]-1)).sum())
+
+    rng = np.random.RandomState(seed)
+    order = rng.permutation(m)
+    local = np.zeros((0, len(EDGE_COUNT_DIVISORS)), dtype=np.int64)
+    numSampled = min(SAMPLE_START_EDGES, m)
+    while True:
+        local = np.vstack([local, edgeLocalCounts(indptr, indices, edges[order[len(local):numSampled]])])
+        if numSampled == m:
+            #Every edge is counted, so the totals are exact
+            totals = [int(total) for total in local.sum(axis=0)//EDGE_COUNT_DIVISORS]
+            counts = inducedCounts(n, m, totals[0], wedges, stars, pathEnds-3*totals[0], *totals[1:])
+            intervals = {g:(counts[g], counts[g]) for g in GRAPHLET_NAMES}
+            error = 0.0
+            break
+        totals = m*local.mean(axis=0)/EDGE_COUNT_DIVISORS
+        pointCounts = countsFromTotals(n, m, wedges, stars, pathEnds, totals)
+        replicates = countsFromTotals(n, m, wedges, stars, pathEnds, bootstrapTotals(local, m, numBootstrap, rng))
+        errors = np.abs(countDistributions(replicates)-countDistributions(pointCounts)).sum(axis=1)
+        error = float(np.quantile(errors, confidence))
+        if error <= maxError or time.time()-start >= maxSeconds:
+            counts = {g:int(count) for g,count in zip(GRAPHLET_NAMES, pointCounts)}
+            lower, upper = np.quantile(replicates, [(1-confidence)/2, (1+confidence)/2], axis=0)
+            intervals = {g:(int(low), int(high)) for g,low,high in zip(GRAPHLET_NAMES, lower, upper)}
+            break
+        numSampled = min(2*numSampled, m)
+    profiling.count("edgesSampled", numSampled)
+    return GraphletEstimate(counts, intervals, error, numSampled, m, n, time.time()-start)
+
+"""
+Gets lines describing a GraphletEstimate and the confidence intervals of its counts, written
+after the counts by writeGraphletCounts
+"""
+def estimateNotes(estimate, confidence=DEFAULT_CONFIDENCE):
+    notes = ["Estimated from %d of %d edges in %0.2f seconds, with an L1 error of at most %g at %g confidence." %(estimate.numSampled, estimate.numEdges, estimate.seconds, estimate.error, confidence),
+             "Confidence intervals:"]
+    for g in GRAPHLET_NAMES:
+        notes.append("%s = %d %d" %(g, estimate.intervals[g][0], estimate.intervals[g][1]))
+    return notes
+
+"""
+Estimates the graphlet distributions of the networks listed in allNetsF, or stored in an edge
+archive, like graphletUtils.loadNetworkGraphlets. Returns the distributions and a dictionary from
+each network to the error of its distribution, which also bounds the error of its score.
+"""
+def loadApproximateGraphlets(allNetsF,delim,verbose,maxError=DEFAULT_MAX_ERROR,maxSeconds=np.inf,confidence=DEFAULT_CONFIDENCE):
+    allGDists = dict()
+    errors = dict()
+    for netF, edges, nodes in iterNetworks(allNetsF, delim):
+        estimate = estimateGraphlets(edges, len(nodes), maxError, maxSeconds, confidence)
+        allGDists[netF] = graphletDistribution(estimate.counts, len(nodes))
+        errors[netF] = estimate.error
+        profiling.count("networksCounted")
+        if verbose:
+            print("Estimated graphlets of %s from %d of %d edges, error %g" %(netF, estimate.numSampled, estimate.numEdges, estimate.error))
+    return allGDists, errors
+
+"""
+Gets the ranks (1 based) of the runs whose score intervals overlap the interval of each run,
+given scores sorted in increasing order and the errors of those scores. Runs i and j overlap if
+their scores differ by at most the sum of their errors.
+"""
+def overlappingRanks(scores, errors):
+    scores = np.asarray(scores, dtype=float)
+    errors = np.asarray(errors, dtype=float)
+    maxError = errors.max() if len(errors) > 0 else 0.0
+    first = np.searchsorted(scores, scores-errors-maxError, side="left")
+    last = np.searchsorted(scores, scores+errors+maxError, side="right")
+    overlaps = []
+    for i in range(len(scores)):
+        candidates = np.arange(first[i], last[i])
+        overlaps.append(candidates[np.abs(scores[candidates]-scores[i]) <= errors[candidates]+errors[i]]+1)
+    return overlaps
+
+"""
+Formats sorted ranks as comma separated ranges, such as 1-3,5
+"""
+def rankRanges(ranks):
+    ranges = []
+    for rank in ranks:
+        if len(ranges) > 0 and ranges[-1][1] == rank-1:
+            ranges[-1][1] = rank
+        else:
+            ranges.append([rank, rank])
+    return ",".join(str(low) if low==high else "%d-%d" %(low, high) for low,high in ranges)
+
+"""
+Saves a report of the score intervals of a ranking from approximate graphlet counts. distances
+and errors are dictionaries from runs to scores and to the errors of those scores. Each line
+has the rank, run, score, lower and upper bound of the score, and the ranks of runs whose
+intervals overlap, which cannot be told apart from it without counting more exactly.
+"""
+def saveIntervalReport(distances,errors,outFN,verbose):
+    runs = sorted(distances, key = lambda x:(distances[x], x))
+    scores = [distances[run] for run in runs]
+    overlaps = overlappingRanks(scores, [errors[run] for run in runs])
+    if verbose:
+        print("Saving score intervals to "+outFN)
+    outF = open(outFN,"w")
+    outF.write("Rank\tRun\tScore\tLower\tUpper\tIndistinguishable\n")
+    for i,run in enumerate(runs):
+        outF.write("%d\t%s\t%0.4f\t%0.4f\t%0.4f\t%s\n" %(i+1, run, scores[i], scores[i]-errors[run], scores[i]+errors[run], rankRanges(overlaps[i])))
+    outF.close()
+    if len(runs) > 0:
+        print("%d runs cannot be told apart from the top run with approximate graphlet counts." %(len(overlaps[0])))
+    return
+
+"""
+Gets the file name of the interval report saved with the ranking output file outF
+"""
+def intervalReportFileName(outF):
+    base, ext = os.path.splitext(outF)
+    return "%s_intervals%s" %(base, ext)
+
+
+"""
+Estimates the graphlets of the network file given by the command line arguments in argv, by
+default sys.argv[1:].
+"""
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="This script estimates the graphlet counts of a sif or edgelist network file from sampled edges and saves them in the format of a PGD output file, followed by their confidence intervals. Version %s, released under the MIT license" %(ppa.__version__))
+    parser.add_argument("networkFile", help="Network sif or edgelist network file to estimate graphlets in. The network is treated as undirected.")
+    parser.add_argument("--delim", help="Node delimiter in network file. Default is none, which splits lines on whitespace.", default="")
+    parser.add_argument("--outFile", help="File to store graphlet counts in. Default is NETWORKFILE with the extension changed to .gOut.", default="")
+    parser.add_argument("--maxError", default=DEFAULT_MAX_ERROR, type=float, help="Largest L1 error of the estimated graphlet distribution. Edges are sampled until the error is below it.")
+    parser.add_argument("--maxSeconds", default=0, type=float, help="If set, edges are no longer sampled after this many seconds, even if the error is above --maxError.")
+    parser.add_argument("--confidence", default=DEFAULT_CONFIDENCE, type=float, help="Confidence of the error and of the intervals of graphlet counts.")
+    parser.add_argument("--seed", default=0, type=int, help="Random seed for sampling edges.")
+    args = parser.parse_args(argv)
+    networkFile = args.networkFile
+    outF = args.outFile
+    if outF == "":
+        outF = os.path.splitext(networkFile)[0]+".gOut"
+    edges, nodes = readEdgeList(networkFile, args.delim)
+    maxSeconds = args.maxSeconds if args.maxSeconds > 0 else np.inf
+    estimate = estimateGraphlets(edges, len(nodes), args.maxError, maxSeconds, args.confidence, seed=args.seed)
+    writeGraphletCounts(estimate.counts, len(nodes), outF, estimateNotes(estimate, args.confidence))
+    print("Estimated graphlets of %s from %d of %d edges into %s, with an L1 error of at most %g." %(networkFile, estimate.numSampled, estimate.numEdges, outF, estimate.error))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,221 @@
+import os
+import argparse
+from pathwayParameterAdvising.graphletCounts import choose, countSubgraphs, inducedCounts, writeGraphletCounts
+from pathwayParameterAdvising.convertNetworks import iterNetworks
+from pathwayParameterAdvising.graphletUtils import graphletDistribution
+from pathwayParameterAdvising import profiling
+import pathwayParameterAdvising as ppa
+
+"""
+Created: 10/18/2026
+
+Description: This file counts the graphlets of the networks of a parameter sweep incrementally.
+Networks generated by one algorithm across a sweep are often nested or nearly identical, so
+instead of counting each one from scratch, the counts of the previous network are updated for
+the edges which differ between them.
+
+Adding or removing an edge only changes the subgraphs which contain it, which are counted from
+the neighborhoods of its two nodes. Nodes without edges only change the number of nodes, which
+graphletCounts.inducedCounts takes directly, so adding or removing nodes needs no recounting.
+Networks are processed from fewest to most edges, so nested networks follow each other, and
+networks which differ from the previous one in too many edges are counted from scratch.
+"""
+
+#Networks differing from the previous network in more than this fraction of their edges are
+#counted from scratch
+MAX_CHANGED_FRACTION = 0.5
+
+"""
+Keeps the non-induced subgraph counts of a network, as given by graphletCounts.countSubgraphs,
+up to date as its edges change. Nodes are any hashable names.
+"""
+class IncrementalGraphletCounter:
+    """
+    Starts with a network without edges
+    """
+    def __init__(self):
+        self.adj = dict()
+        self.edges = set()
+        self.totals = {"m":0, "tris":0, "wedges":0, "stars":0, "paths":0, "tailedTris":0, "chordCycles":0, "cycles":0, "cliques":0}
+        self.nodeTris = dict()
+        self.numToggled = 0
+        self.numRecounted = 0
+
+    """
+    Gets the key of the undirected edge (u, v) in edges
+    """
+    def edgeKey(self, u, v):
+        return (u, v) if u <= v else (v, u)
+
+    """
+    Counts the non-induced subgraphs containing the edge (u, v), which must be in the network,
+    as a dictionary like totals. common is the set of common neighbors of u and v. Degrees,
+    neighborhoods and the triangles at each node include the edge itself.
+    """
+    def edgeSubgraphs(self, u, v, common):
+        adj = self.adj
+        uNbrs, vNbrs = adj[u], adj[v]
+        uDeg, vDeg = len(uNbrs), len(vNbrs)
+        numTris = len(common)
+        uTris, vTris = self.nodeTris[u], self.nodeTris[v]
+        counts = dict()
+        counts["m"] = 1
+        counts["tris"] = numTris
+        counts["wedges"] = uDeg+vDeg-2
+        counts["stars"] = choose(uDeg-1,2) + choose(vDeg-1,2)
+        #The edge is the middle of a path, or the end of one continuing from v through u or u through v
+        counts["paths"] = ((uDeg-1)*(vDeg-1) + sum(len(adj[w])-1 for w in uNbrs if w != v)
+                           + sum(len(adj[w])-1 for w in vNbrs if w != u) - 3*numTris)
+        #The edge is in the triangle, or is the tail of a triangle containing u or v
+        counts["tailedTris"] = sum(uDeg+vDeg+len(adj[w])-6 for w in common) + uTris + vTris - 2*numTris
+        #The edge is the chord, or a side of a chorded cycle whose chord is (u, w) or (v, w)
+        counts["chordCycles"] = numTris*(numTris-1)//2 + sum(len(adj[w] & uNbrs)+len(adj[w] & vNbrs)-2 for w in common)
+        #Each 4-cycle u, v, x, w has w a neighbor of u and x a neighbor of both w and v, other than u
+        counts["cycles"] = sum(len(adj[w] & vNbrs)-1 for w in uNbrs if w != v)
+        counts["cliques"] = sum(len(adj[w] & common) for w in common)//2
+        return counts
+
+    """
+    Adds the edge (u, v) if add is set, otherwise removes it, and updates the subgraph counts
+    """
+    def toggleEdge(self, u, v, add):
+        adj = self.adj
+        if add:
+            adj.setdefault(u, set()).add(v)
+            adj.setdefault(v, set()).add(u)
+            self.edges.add(self.edgeKey(u, v))
+        common = adj[u] & adj[v]
+        sign = 1 if add else -1
+        if add:
+            self.updateNodeTris(u, v, common, sign)
+        for name, count in self.edgeSubgraphs(u, v, common).items():
+            self.totals[name] += sign*count
+        if not add:
+            self.updateNodeTris(u, v, common, sign)
+            adj[u].discard(v)
+            adj[v].discard(u)
+            self.edges.discard(self.edgeKey(u, v))
+        self.numToggled += 1
+        return
+
+    """
+    Adds sign times the triangles containing the edge (u, v) to the triangles at each node
+    """
+    def updateNodeTris(self, u, v, common, sign):
+        nodeTris = self.nodeTris
+        nodeTris[u] = nodeTris.get(u, 0) + sign*len(common)
+        nodeTris[v] = nodeTris.get(v, 0) + sign*len(common)
+        for w in common:
+            nodeTris[w] += sign
+        return
+
+    """
+    Replaces the network with one whose edges are a set of edge keys (see edgeKey), toggling
+    the edges which differ, or counting the network from scratch if more than maxChanged differ.
+    """
+    def setEdges(self, edges, maxChanged):
+        changed = self.edges ^ edges
+        if len(changed) > maxChanged:
+            self.recount(edges)
+            return
+        #Removing edges first keeps the neighborhoods small
+        for u,v in sorted(changed-edges):
+            self.toggleEdge(u, v, False)
+        for u,v in sorted(changed & edges):
+            self.toggleEdge(u, v, True)
+        return
+
+    """
+    Replaces the network with one whose edges are a set of edge keys, counted from scratch
+    """
+    def recount(self, edges):
+        nodes = sorted(set(node for edge in edges for node in edge))
+        nodeIDs = {node:i for i,node in enumerate(nodes)}
+        n, self.totals = countSubgraphs([(nodeIDs[u], nodeIDs[v]) for u,v in edges], len(nodes))
+        self.adj = {node:set() for node in nodes}
+        for u,v in edges:
+            self.adj[u].add(v)
+            self.adj[v].add(u)
+        self.edges = set(edges)
+        self.nodeTris = {node:sum(len(self.adj[w] & self.adj[node]) for w in self.adj[node])//2 for node in nodes}
+        self.numRecounted += 1
+        return
+
+    """
+    Gets the graphlet counts of the network with numNodes nodes, which may include nodes without
+    edges, as a dictionary from the names in graphletCounts.GRAPHLET_NAMES to counts
+    """
+    def counts(self, numNodes):
+        return inducedCounts(numNodes, **self.totals)
+
+"""
+Reads the networks listed in allNetsF, or stored in an edge archive, returning a dictionary from
+each network file to its set of edge keys (pairs of node names or archive node ids, smallest
+first) and its number of nodes, in the order networks are listed. Networks with fewer than 4
+nodes are skipped, like graphletUtils.loadNetworkGraphlets.
+"""
+def readSweepNetworks(allNetsF,delim):
+    networks = dict()
+    for netF, edges, nodes in iterNetworks(allNetsF, delim):
+        edgeKeys = set()
+        for u,v in edges:
+            if u != v:
+                edgeKeys.add((nodes[u], nodes[v]) if nodes[u] <= nodes[v] else (nodes[v], nodes[u]))
+        networks[netF] = (edgeKeys, len(nodes))
+    return networks
+
+"""
+Counts the graphlets of each network in a dictionary from readSweepNetworks incrementally,
+yielding (network file, graphlet counts, number of nodes) in order of increasing edges.
+"""
+def iterSweepCounts(networks,verbose,maxChangedFraction=MAX_CHANGED_FRACTION):
+    counter = IncrementalGraphletCounter()
+    for netF in sorted(networks, key=lambda netF: len(networks[netF][0])):
+        edges, numNodes = networks[netF]
+        numToggled = counter.numToggled
+        counter.setEdges(edges, maxChangedFraction*len(edges))
+        profiling.count("networksCounted")
+        if verbose:
+            if counter.numToggled > numToggled:
+                print("Counted graphlets of %s by changing %d edges" %(netF, counter.numToggled-numToggled))
+            else:
+                print("Counted graphlets of %s from scratch" %(netF))
+        yield netF, counter.counts(numNodes), numNodes
+    profiling.count("edgesToggled", counter.numToggled)
+    return
+
+"""
+Counts the graphlets of the networks listed in allNetsF incrementally across the sweep, and
+loads them as graphlet distributions with the same results as graphletUtils.loadNetworkGraphlets
+"""
+def loadSweepGraphlets(allNetsF,delim,verbose):
+    allGDists = dict()
+    networks = readSweepNetworks(allNetsF, delim)
+    for netF, counts, numNodes in iterSweepCounts(networks, verbose):
+        allGDists[netF] = graphletDistribution(counts, numNodes)
+    #Keep the order networks were listed in
+    return {netF:allGDists[netF] for netF in networks}
+
+
+"""
+Counts the graphlets of the networks listed by the command line arguments in argv, by default
+sys.argv[1:].
+"""
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="This script counts the graphlets of the networks of a parameter sweep, updating the counts of each network from the previous one, and saves them in the format of PGD output files. Version %s, released under the MIT license" %(ppa.__version__))
+    parser.add_argument("networkList", help="File where each line is a sif or edgelist network file of the sweep, or an edge archive saved by convertNetworks.py. Networks are treated as undirected.")
+    parser.add_argument("--delim", help="Node delimiter in network files. Default is none, which splits lines on whitespace.", default="")
+    parser.add_argument("--outputDirectory", help="Directory to store graphlet counts in, named after each network file with the extension .gOut. Default is the directory of each network file.", default="")
+    parser.add_argument("--verbose", action="store_true", help="If set, will print intermediate status updates.")
+    args = parser.parse_args(argv)
+    if args.outputDirectory:
+        os.makedirs(args.outputDirectory, exist_ok=True)
+    for netF, counts, numNodes in iterSweepCounts(readSweepNetworks(args.networkList, args.delim), args.verbose):
+        outF = os.path.splitext(netF)[0]+".gOut"
+        if args.outputDirectory:
+            outF = os.path.join(args.outputDirectory, os.path.basename(outF))
+        writeGraphletCounts(counts, numNodes, outF)
+    print("Counted graphlets of the networks in "+args.networkList)
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,14 @@
 import os
+import re
 import argparse
 import numpy as np
 import sys
 import pickle as pkl
+import concurrent.futures
+from collections import namedtuple
+from pathwayParameterAdvising.graphletCounts import countGraphlets
+from pathwayParameterAdvising.convertNetworks import iterNetworks
+from pathwayParameterAdvising import profiling
 import pathwayParameterAdvising as ppa
 
 """
@@ -13,47 +19,70 @@ Description: This file contains utilities related to file input and output, and
 of graphlet output files.
 
 When run as a script this file will create a pickled dictionary of graphlet distributions
-from a list of graphlet output files.
+from a list of graphlet output files, or a reference store from either of them.
 """
 
+"""
+Dense form of a set of graphlet distributions. names holds the pathway names, graphlets the
+graphlet vocabulary (column order), freqs a pathways x graphlets matrix of frequencies, and
+sizes the "size" entry of each distribution (nan when missing).
+"""
+GraphletMatrix = namedtuple("GraphletMatrix", ["names", "graphlets", "freqs", "sizes"])
+
 """
 Changes distances dictionary to use desired names
 """
 def changeNames(distances,nameMap):
     if nameMap == "fileName":
         return distances
+    mapName = nameMapper(nameMap)
+    newDistances = dict()
+    for name in distances:
+        newDistances[mapName(name)] = distances[name]
+    return newDistances
+
+"""
+Gets a function which changes a generated pathway file name to its desired name
+"""
+def nameMapper(nameMap):
+    if nameMap == "fileName":
+        return lambda name: name
     if nameMap == "stripped":
-        newDistances = dict()
-        for name in distances:
-            nameList = os.path.split(name)
-            sName = nameList[-1]
-            sName = os.path.splitext(sName)[0]
-            newDistances[sName] = distances[name]
-        return newDistances
-    else:
-        #Assume file format is fileName sep name
-        nameDict = dict()
-        for line in open(nameMap):
-            lineList = line.strip().split()
-            #Not great practice but flexible
-            if len(lineList)<2:
-                lineList = line.strip().split(",")
-            if len(lineList)<2:
-                continue
-            nameDict[lineList[0]] = lineList[1]
-        newDistances = dict()
-        for name in distances:
-            if name not in nameDict:
-                print("Error: %s not in provided name mapping file. Using file name instead")
-                newDistances[name]=distances[name]
-            newDistances[nameDict[name]] = distances[name]
-        return newDistances
+        return lambda name: os.path.splitext(os.path.split(name)[-1])[0]
+
+    #Assume file format is fileName sep name
+    nameDict = dict()
+    for line in open(nameMap):
+        lineList = line.strip().split()
+        #Not great practice but flexible
+        if len(lineList)<2:
+            lineList = line.strip().split(",")
+        if len(lineList)<2:
+            continue
+        nameDict[lineList[0]] = lineList[1]
+    def mapName(name):
+        if name not in nameDict:
+            print("Error: %s not in provided name mapping file. Using file name instead" %(name))
+            return name
+        return nameDict[name]
+    return mapName
 
 
 """
 Saves ranking output according to command line settings
 """
-def saveRankingOutput(distances,outFN,outMax,outScore,verbose):
+def saveRankingOutput(distances,outFN,outMax,outScore,verbose,outTop=0):
+    runs = ((distances[run], run) for run in sorted(distances, key = lambda x:(distances[x], x)))
+    saveSortedRanking(runs,outFN,outMax,outScore,verbose,outTop)
+    return
+
+"""
+Saves ranking output from (score, run) pairs which are already sorted. If outMax is set only
+the top run is saved, otherwise if outTop is positive only the top outTop runs are saved.
+"""
+def saveSortedRanking(runs,outFN,outMax,outScore,verbose,outTop=0):
+    if outMax:
+        outTop = 1
     if verbose:
         print("Saving scores to "+outFN)
     outF = open(outFN,"w")
@@ -61,21 +90,23 @@ def saveRankingOutput(distances,outFN,outMax,outScore,verbose):
         outF.write("Run\tScore\n")
     else:
         outF.write("Run\n")
-    for run in sorted(distances, key = lambda x:(distances[x], x)):
+    numSaved = 0
+    for score,run in runs:
         if outScore:
-            score = distances[run]
             outF.write("%s\t%0.4f\n" %(run, score))
         else:
             outF.write(run+"\n")
-        if outMax:
+        numSaved += 1
+        if numSaved == outTop:
             break
     outF.close()
     return
 
 """
-Loads all graphlet freqs and stores as ready to go distributions
+Loads all graphlet freqs and stores as ready to go distributions.
+If cache is a gfdCache.GFDCache, graphlet files are loaded through it.
 """
-def loadGraphlets(allGraphsF,minSize,saveGraphlets,verbose):
+def loadGraphlets(allGraphsF,minSize,saveGraphlets,verbose,cache=None):
     allGDists = dict()
 
     #Check if allGraphsF is a pickled dictionary
@@ -85,20 +116,35 @@ def loadGraphlets(allGraphsF,minSize,saveGraphlets,verbose):
         allGraphsPickle.close()
         if verbose:
             print("Successfully loaded graphlet distributions from pickle file %s." %(allGraphsF))
+        if minSize>0:
+            numLoaded = len(allGDists)
+            allGDists = {name:gDist for name,gDist in allGDists.items() if not gDist.get("size",minSize)<minSize}
+            profiling.count("pathwaysSkippedMinSize", numLoaded-len(allGDists))
+            if verbose:
+                print("Skipped %d reference pathways for being too small." %(numLoaded-len(allGDists)))
         return allGDists
     except pkl.UnpicklingError:
         allGraphsPickle.close()
 
     skipCount = 0
     for line in open(allGraphsF):
-        graphlets = loadSingleGFD(line.strip(),minSize,verbose)
+        if cache is None:
+            graphlets = loadSingleGFD(line.strip(),minSize,verbose)
+        else:
+            graphlets = cache.loadSingleGFD(line.strip(),minSize,verbose)
         if len(graphlets)>0:
             allGDists[line.strip()]=graphlets
         else:
             skipCount += 1
+    profiling.count("filesParsed", len(allGDists)+skipCount)
+    profiling.count("pathwaysSkippedMinSize", skipCount)
 
     if verbose and minSize>0:
         print("Skipped %d reference pathways for being too small." %(skipCount))
+    if cache is not None:
+        cache.flush()
+        if verbose:
+            print("Graphlet cache: %(hits)d hits, %(misses)d misses, %(evictions)d evictions, %(entries)d cached distributions." %(cache.stats()))
 
     if saveGraphlets:
         if verbose:
@@ -110,6 +156,22 @@ def loadGraphlets(allGraphsF,minSize,saveGraphlets,verbose):
 
     return allGDists
 
+"""
+Lazily loads graphlet distributions from a file where each line is a graphlet output file,
+yielding (fileName, distribution) pairs for pathways which are not smaller than minSize.
+"""
+def iterGraphlets(allGraphsF,minSize,verbose,cache=None):
+    for line in open(allGraphsF):
+        if cache is None:
+            graphlets = loadSingleGFD(line.strip(),minSize,verbose)
+        else:
+            graphlets = cache.loadSingleGFD(line.strip(),minSize,verbose)
+        profiling.count("filesParsed")
+        if len(graphlets)>0:
+            yield line.strip(), graphlets
+        else:
+            profiling.count("pathwaysSkippedMinSize")
+
 """
 Loads a graphlet freq dist from output file
 """
@@ -155,16 +217,324 @@ def loadSingleGFD(name,minSize,verbose):
         outDict[mName] = outDict[mName]/allG
     return outDict
 
+"""
+Converts graphlet counts into a graphlet distribution the same way loadSingleGFD does:
+non-finite or zero counts become 1.0, counts are normalized to sum to 1, and size
+is stored under "size".
+"""
+def graphletDistribution(counts, size):
+    outDict = dict()
+    outDict["size"] = float(size)
+    allG = 0
+    for mName in counts:
+        freq = float(counts[mName])
+        if not np.isfinite(freq) or freq==0:
+            freq = 1.0
+        outDict[mName] = freq
+        allG += freq
+    for mName in counts:
+        outDict[mName] = outDict[mName]/allG
+    return outDict
 
-if __name__ == "__main__":
+"""
+Loads graphlet distributions by counting graphlets directly in network files, where each line
+of allNetsF is a sif or edgelist network file, or in an edge archive from convertNetworks.
+Networks with fewer than 4 nodes are skipped, as they are by makePGDNet.
+"""
+def loadNetworkGraphlets(allNetsF,delim,verbose):
+    allGDists = dict()
+    for netF, edges, nodes in iterNetworks(allNetsF, delim):
+        allGDists[netF] = graphletDistribution(countGraphlets(edges, len(nodes)), len(nodes))
+        profiling.count("networksCounted")
+        if verbose:
+            print("Counted graphlets of "+netF)
+    return allGDists
+
+"""
+Gets the graphlet vocabulary of one or more dictionaries of graphlet distributions,
+in the order graphlets are first seen. The "size" key is not a graphlet and is excluded.
+"""
+def graphletVocabulary(*allGDists):
+    vocab = dict()
+    for gDists in allGDists:
+        for gDist in gDists.values():
+            for g in gDist:
+                if g != "size" and g not in vocab:
+                    vocab[g] = len(vocab)
+    return list(vocab)
+
+"""
+Converts a dictionary of graphlet distributions into a GraphletMatrix over the given
+graphlet vocabulary. Graphlets missing from a distribution count as zero.
+"""
+def graphletMatrix(gDists, graphlets):
+    cols = {g:i for i,g in enumerate(graphlets)}
+    names = list(gDists)
+    freqs = np.zeros((len(names), len(cols)))
+    sizes = np.full(len(names), np.nan)
+    for i,name in enumerate(names):
+        for g,freq in gDists[name].items():
+            if g == "size":
+                sizes[i] = freq
+            elif g in cols:
+                freqs[i,cols[g]] = freq
+    return GraphletMatrix(names, list(graphlets), freqs, sizes)
+
+"""
+Loads graphlet distributions as a GraphletMatrix from a reference store directory,
+a pickled dictionary, or a file where each line is a graphlet output file.
+"""
+def loadGraphletMatrix(allGraphsF,minSize,saveGraphlets,verbose,cache=None,workers=1,threads=False):
+    if isReferenceStore(allGraphsF):
+        return loadReferenceStore(allGraphsF,minSize,verbose)
+    if cache is None and not saveGraphlets and not isPickleFile(allGraphsF):
+        names = [line.strip() for line in open(allGraphsF)]
+        return loadGFDMatrix(names,minSize,verbose,workers,threads)
+    allGDists = loadGraphlets(allGraphsF,minSize,saveGraphlets,verbose,cache)
+    return graphletMatrix(allGDists, graphletVocabulary(allGDists))
+
+"""
+Checks if a file starts like a pickle (protocol 2 or later)
+"""
+def isPickleFile(name):
+    inF = open(name, "rb")
+    start = inF.read(1)
+    inF.close()
+    return start == b"\x80"
+
+#Patterns for the graphlet counts block of a graphlet output file and its |V| lines,
+#following the parsing rules of loadSingleGFD
+GFD_START = re.compile(r"^[^\S\n]*\*", re.M)
+GFD_END = re.compile(r"^\*", re.M)
+GFD_LINE = re.compile(r"^[^\S\n]*(\S+)[^\S\n]+\S+[^\S\n]+(\S+)", re.M)
+SIZE_LINE = re.compile(r"^\|V\|[^\n]*", re.M)
+
+"""
+Parses a graphlet output file with the same results as loadSingleGFD, but reads the file at
+once and parses the graphlet counts block in bulk. Returns the size (nan if missing), a tuple
+of graphlet names and an array of normalized frequencies, or None if the pathway is skipped.
+"""
+def parseGFDFile(name, minSize):
+    inF = open(name)
+    text = inF.read()
+    inF.close()
+
+    #Jump to the block between the first 2 lines of ***
+    start = GFD_START.search(text)
+    if start is None:
+        blockStart = blockEnd = len(text)
+    else:
+        blockStart = text.find("\n", start.end())
+        if blockStart == -1:
+            blockStart = len(text)
+        end = GFD_END.search(text, blockStart)
+        blockEnd = len(text) if end is None else end.start()
+
+    size = np.nan
+    for sizeLine in SIZE_LINE.findall(text, 0, blockEnd):
+        size = float(sizeLine.split()[-1])
+        if size<minSize:
+            return None
+
+    fields = GFD_LINE.findall(text, blockStart, blockEnd)
+    if len(fields)==0 and np.isnan(size):
+        return None
+    gNames = tuple(field[0] for field in fields)
+    freqs = np.array([field[1] for field in fields], dtype=float)
+    freqs[~np.isfinite(freqs) | (freqs==0)] = 1.0
+    if len(freqs)>0:
+        #cumsum adds in order, like loadSingleGFD
+        freqs /= np.cumsum(freqs)[-1]
+    return size, gNames, freqs
+
+"""
+Loads graphlet output files into a GraphletMatrix with the same results as loading them with
+loadGraphlets. Files are parsed with parseGFDFile by a pool of worker processes, or threads
+if threads is set, and each result is copied into a preallocated row of the frequency matrix.
+"""
+def loadGFDMatrix(names,minSize,verbose,workers=1,threads=False):
+    #Repeated file names are only loaded once, like in the loadGraphlets dictionary
+    names = list(dict.fromkeys(names))
+    sizes = np.full(len(names), np.nan)
+    freqs = np.zeros((len(names), 0))
+    cols = dict()
+    colIndex = dict()
+    kept = []
+
+    if workers > 1:
+        if threads:
+            pool = concurrent.futures.ThreadPoolExecutor(workers)
+        else:
+            pool = concurrent.futures.ProcessPoolExecutor(workers)
+        results = pool.map(parseGFDFile, names, [minSize]*len(names), chunksize=max(1, len(names)//(workers*16)))
+    else:
+        pool = None
+        results = map(parseGFDFile, names, [minSize]*len(names))
+
+    for name,result in zip(names, results):
+        if result is None:
+            continue
+        size, gNames, gFreqs = result
+        if gNames not in colIndex:
+            for g in gNames:
+                if g not in cols:
+                    cols[g] = len(cols)
+            colIndex[gNames] = np.array([cols[g] for g in gNames], dtype=int)
+            if len(cols) > freqs.shape[1]:
+                freqs = np.hstack([freqs, np.zeros((len(names), len(cols)-freqs.shape[1]))])
+        row = len(kept)
+        freqs[row, colIndex[gNames]] = gFreqs
+        sizes[row] = size
+        kept.append(name)
+    if pool is not None:
+        pool.shutdown()
+    profiling.count("filesParsed", len(names))
+    profiling.count("pathwaysSkippedMinSize", len(names)-len(kept))
+
+    if verbose and minSize>0:
+        print("Skipped %d reference pathways for being too small." %(len(names)-len(kept)))
+    return GraphletMatrix(kept, list(cols), freqs[:len(kept)], sizes[:len(kept)])
+
+"""
+Reorders the columns of a GraphletMatrix to match a graphlet vocabulary.
+Graphlets not in the matrix become columns of zeros.
+"""
+def alignGraphletMatrix(gMatrix, graphlets):
+    if list(gMatrix.graphlets) == list(graphlets):
+        return gMatrix
+    cols = {g:i for i,g in enumerate(gMatrix.graphlets)}
+    freqs = np.zeros((len(gMatrix.names), len(graphlets)))
+    for i,g in enumerate(graphlets):
+        if g in cols:
+            freqs[:,i] = gMatrix.freqs[:,cols[g]]
+    return GraphletMatrix(gMatrix.names, list(graphlets), freqs, gMatrix.sizes)
+
+"""
+Reference stores are directories of .npy arrays holding a GraphletMatrix, which are memory
+mapped when loaded so no per-pathway Python objects are created.
+"""
+STORE_FILES = {"names":"pathways.npy", "graphlets":"graphlets.npy", "freqs":"frequencies.npy", "sizes":"sizes.npy"}
+
+"""
+Checks if path is a reference store directory
+"""
+def isReferenceStore(path):
+    return os.path.isfile(os.path.join(path, STORE_FILES["freqs"]))
+
+"""
+Saves a GraphletMatrix as a reference store in storeDir, creating the directory if needed.
+Each array is written to a temporary file first and then moved into place.
+"""
+def saveReferenceStore(gMatrix, storeDir):
+    os.makedirs(storeDir, 0o755, exist_ok=True)
+    arrays = {"names":np.array(gMatrix.names, dtype=str).reshape(-1),
+              "graphlets":np.array(gMatrix.graphlets, dtype=str).reshape(-1),
+              "freqs":np.asarray(gMatrix.freqs, dtype=float).reshape(len(gMatrix.names), len(gMatrix.graphlets)),
+              "sizes":np.asarray(gMatrix.sizes, dtype=float)}
+    for field in STORE_FILES:
+        storeF = os.path.join(storeDir, STORE_FILES[field])
+        tmpF = storeF+".tmp"
+        with open(tmpF, "wb") as outF:
+            np.save(outF, arrays[field])
+        os.replace(tmpF, storeF)
+    return
+
+"""
+Loads a reference store as a GraphletMatrix of memory mapped arrays.
+Pathways smaller than minSize are removed with a vectorized mask on the size column.
+"""
+def loadReferenceStore(storeDir,minSize,verbose):
+    arrays = dict()
+    for field in STORE_FILES:
+        arrays[field] = np.load(os.path.join(storeDir, STORE_FILES[field]), mmap_mode="r")
+    if verbose:
+        print("Loaded %d graphlet distributions from reference store %s." %(len(arrays["names"]),storeDir))
+
+    #Missing sizes are nan and are never skipped, like distributions without a size
+    tooSmall = arrays["sizes"] < minSize
+    profiling.count("pathwaysSkippedMinSize", int(np.count_nonzero(tooSmall)))
+    if tooSmall.any():
+        keep = ~tooSmall
+        for field in ["names","freqs","sizes"]:
+            arrays[field] = arrays[field][keep]
+    if verbose and minSize>0:
+        print("Skipped %d reference pathways for being too small." %(np.count_nonzero(tooSmall)))
+    return GraphletMatrix(arrays["names"], list(arrays["graphlets"]), arrays["freqs"], arrays["sizes"])
+
+"""
+Updates a reference store with the distributions in gDists, replacing pathways with the same
+name and adding new ones, and removes the pathways named in removed. Stored pathways are never
+parsed again.
+
+The store is only updated in place when every pathway in gDists is already stored, none are
+removed and no graphlets are new, in which case their rows are overwritten in the memory mapped
+arrays. Adding or removing any pathway, or adding a graphlet, rewrites every file of the store,
+as the arrays change shape.
+"""
+def updateReferenceStore(storeDir, gDists, removed=(), verbose=False):
+    if not isReferenceStore(storeDir):
+        saveReferenceStore(graphletMatrix(gDists, graphletVocabulary(gDists)), storeDir)
+        return
+    stored = loadReferenceStore(storeDir,0,False)
+    rows = {name:i for i,name in enumerate(stored.names)}
+    removed = set(removed) & set(rows)
+    newNames = [name for name in gDists if name not in rows]
+    graphlets = graphletVocabulary({"":dict.fromkeys(stored.graphlets)}, gDists)
+
+    if len(removed)==0 and len(newNames)==0 and len(graphlets)==len(stored.graphlets):
+        update = graphletMatrix(gDists, graphlets)
+        idx = [rows[name] for name in update.names]
+        for field, values in [("freqs", update.freqs), ("sizes", update.sizes)]:
+            arr = np.load(os.path.join(storeDir, STORE_FILES[field]), mmap_mode="r+")
+            arr[idx] = values
+            arr.flush()
+            del arr
+    else:
+        keep = np.array([name not in removed and name not in gDists for name in stored.names], dtype=bool)
+        stored = alignGraphletMatrix(stored, graphlets)
+        update = graphletMatrix(gDists, graphlets)
+        merged = GraphletMatrix(list(np.asarray(stored.names)[keep])+update.names, graphlets,
+                                np.vstack([stored.freqs[keep], update.freqs]),
+                                np.concatenate([stored.sizes[keep], update.sizes]))
+        saveReferenceStore(merged, storeDir)
+    if verbose:
+        print("Updated %d and removed %d graphlet distributions in reference store %s." %(len(gDists),len(removed),storeDir))
+    return
+
+"""
+Converts a pickled dictionary of graphlet distributions, or a file where each line is a
+graphlet output file, into a reference store. All pathways are stored, as minSize is
+applied when the store is loaded.
+"""
+def convertToReferenceStore(allGraphsF,storeDir,verbose):
+    allGDists = loadGraphlets(allGraphsF,0,False,verbose)
+    gMatrix = graphletMatrix(allGDists, graphletVocabulary(allGDists))
+    saveReferenceStore(gMatrix, storeDir)
+    if verbose:
+        print("Saved %d graphlet distributions to reference store %s." %(len(gMatrix.names),storeDir))
+    return
+
+
+"""
+Converts graphlet files from the command line arguments in argv, by default sys.argv[1:].
+"""
+def main(argv=None):
     #Handle command line arguments
     parser = argparse.ArgumentParser(description="The pathway parameter advisor creates a ranking of pathways based on their topological distance to a set of reference pathways. Version %s, released under the MIT license."%(ppa.__version__))
     parser.add_argument("--graphletsFile", help="File where each line is a graphlets file of a reference pathway, or a pickled dictionary of precomputed reference graphlet distributions.",required=True)
     parser.add_argument("--minSize", default=15, help="Minimum size a reference pathway must be to be included. Must be integer.")
+    parser.add_argument("--referenceStore", default="", help="If set, will save all graphlet distributions as a memory mapped reference store in this directory instead of a pickled dictionary. minSize is then applied when the store is loaded.")
     parser.add_argument("--verbose", action="store_true",help="If set, will print intermediate status updates.")
 
-    args = parser.parse_args()
+    args = parser.parse_args(argv)
     refPathsF = args.graphletsFile
     minSize = int(args.minSize)
     verbose = args.verbose
-    loadGraphlets(refPathsF, minSize, True, verbose)
+    storeDir = args.referenceStore
+    if storeDir:
+        convertToReferenceStore(refPathsF, storeDir, verbose)
+    else:
+        loadGraphlets(refPathsF, minSize, True, verbose)
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,8 @@
-import networkx as nx
 import sys
 import argparse
 import os
+from pathwayParameterAdvising.graphletCounts import readEdgeList
+from pathwayParameterAdvising.convertNetworks import pgdEdges, writePGDNetwork
 import pathwayParameterAdvising as ppa
 
 """
@@ -9,6 +10,7 @@ Author: Chris Magnano
 11/06/19
 
 Description: This short script converts networks into a numbered edgelist for use with PGD.
+Many networks are converted faster at once by convertNetworks.py.
 """
 def makePGDNet(networkFile,delim,outF):
     if outF == "":
@@ -20,30 +22,30 @@ def makePGDNet(networkFile,delim,outF):
         outF = os.path.join(outDir,netName)
 
     #Load Network
-    if delim == "":
-        pathway = nx.read_edgelist(networkFile.strip())
-    else:
-        pathway = nx.read_edgelist(networkFile.strip(), delimiter=delim)
-    pathway = pathway.to_undirected()
-    if len(pathway) < 4:
-        print(networkFile, "too short at ",len(pathway),". Network must contain at least 4 nodes.")
+    edges, nodes = readEdgeList(networkFile.strip(), delim)
+    if len(nodes) < 4:
+        print(networkFile, "too short at ",len(nodes),". Network must contain at least 4 nodes.")
         return
 
     #Write Output
-    nx.write_edgelist(nx.convert_node_labels_to_integers(pathway, first_label=1), outF, delimiter="\t", data=False)
+    writePGDNetwork(pgdEdges(edges, len(nodes)), outF)
     print("Converted "+networkFile+" to "+outF)
     return
 
-if __name__ == "__main__":
+"""
+Converts the network file given by the command line arguments in argv, by default sys.argv[1:].
+"""
+def main(argv=None):
     #Parse Arguments
     parser = argparse.ArgumentParser(description="This script converts a sif or edgelist network file into a format interpretable by the pgd library. The network will be converted to be undirected and have sequential integer node names. Version %s, released under the MIT license" %(ppa.__version__))
-    parser.add_argument("networkFile", help="Network sif or edgelist network file to be converted to a format interpretable by pgd. Must be in format readable by networkx.read_edgelist and have at least 4 nodes.")
-    parser.add_argument("--delim", help="Node delimiter in network file to be passed to the \"delimiter\" argument in networkx.read_edgelist. Default is none, which will use the default whitespace delimeter in networkx.read_edgelist.", default="")
+    parser.add_argument("networkFile", help="Network sif or edgelist network file to be converted to a format interpretable by pgd. Node names are the first two fields of each line, and the network must have at least 4 nodes.")
+    parser.add_argument("--delim", help="Node delimiter in network file. Default is none, which splits lines on whitespace.", default="")
     parser.add_argument("--outFile", help="File to store formatted network in. Default is to store the network as NETWORKFILE in a new directory named graphlets.", default="")
-    args = parser.parse_args()
+    args = parser.parse_args(argv)
     networkFile = args.networkFile
     delim = args.delim
     outF = args.outFile
     makePGDNet(networkFile,delim,outF)
 
-
+if __name__ == "__main__":
+    main()
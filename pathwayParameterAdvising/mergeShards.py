@@ -0,0 +1,35 @@
+import sys
+import argparse
+from pathwayParameterAdvising.ppa import mergeShards
+import pathwayParameterAdvising as ppa
+
+"""
+Created: 10/18/2026
+
+Description: This file merges the shard files saved by running ppa.py with --shard i/n for each
+shard i of n into the ranking a single ppa.py run would save. Scores are read back exactly, so
+the merged ranking is identical to one ranked in a single process.
+
+Usage: python mergeShards.py parameterRanking_shard*of4.scores --outFile=parameterRanking.txt --outputScore
+"""
+
+"""
+Merges the shard files given by the command line arguments in argv, by default sys.argv[1:].
+"""
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Merges shard files saved by ppa.py with --shard into one ranking. Version %s, released under the MIT license."%(ppa.__version__))
+    parser.add_argument("shardFiles", nargs="+", help="Shard files of every shard of the ranking.")
+    parser.add_argument("--outFile", default="parameterRanking.txt", help="File to store output in.")
+    parser.add_argument("--outputMax", action="store_true",help="If set, will return only the top pathway instead of a full ranking.")
+    parser.add_argument("--outputScore", action="store_true",help="If set, will return scores in addition to pathway rankings.")
+    parser.add_argument("--nameMap", default="stripped",help="Either a file mapping generated pathway fileNames to parameter values, \"stripped\" to exclude the directory and extension from the filename, or \"fileName\" to use raw file names.")
+    parser.add_argument("--outputTop", default=0, type=int, help="If set, will return only the top OUTPUTTOP pathways instead of a full ranking.")
+    parser.add_argument("--verbose", action="store_true",help="If set, will print intermediate status updates.")
+    args = parser.parse_args(argv)
+
+    outF = args.outFile if len(args.outFile)>0 else "parameterRanking.txt"
+    if not mergeShards(args.shardFiles,outF,args.outputMax,args.outputScore,args.verbose,args.nameMap,args.outputTop):
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,200 @@
+import os
+import shutil
+import hashlib
+import argparse
+import subprocess
+import multiprocessing
+from pathwayParameterAdvising.makePGDNet import makePGDNet
+from pathwayParameterAdvising import graphletCounts
+from pathwayParameterAdvising.graphletCounts import countGraphlets, readEdgeList, writeGraphletCounts
+from pathwayParameterAdvising.graphletUtils import loadSingleGFD, loadGraphletMatrix
+from pathwayParameterAdvising.ppa import rankGraphlets
+import pathwayParameterAdvising as ppa
+
+"""
+Created: 10/18/2026
+
+Description: This file runs the full pathway parameter advising pipeline on a data directory,
+replacing the loops in runPPA.sh. Networks in dataDirectory/pathways are converted for graphlet
+decomposition, decomposed into dataDirectory/graphlets, parsed, and ranked.
+
+The convert, decompose and parse stages run in a pool of worker processes. Files whose output
+is newer than their input are skipped, and all outputs are written to a temporary file and then
+moved into place, so interrupted or repeated runs never leave partial or appended output. The
+program that made each graphlet file is recorded in a .tool file next to it, and graphlet files
+made by a different program, or by an executable that was since rebuilt, are decomposed again.
+"""
+
+"""
+Checks if outF exists and is at least as new as inF
+"""
+def upToDate(inF, outF):
+    return os.path.isfile(outF) and os.path.getmtime(outF) >= os.path.getmtime(inF)
+
+"""
+Gets a description of the program that decomposes networks, pgdExecutable or the built-in
+graphlet counts if it is empty. Executables are described by their path and modification time,
+so rebuilding one also counts as a different program. The built-in graphlet counts are described
+by a hash of graphletCounts.py, so any change to the counting code counts as a different program.
+"""
+def decompositionTool(pgdExecutable):
+    if pgdExecutable == "":
+        sourceF = open(graphletCounts.__file__, "rb")
+        sourceHash = hashlib.sha256(sourceF.read()).hexdigest()
+        sourceF.close()
+        return "graphletCounts %s" %(sourceHash)
+    path = shutil.which(pgdExecutable) or pgdExecutable
+    if not os.path.isfile(path):
+        return path
+    return "%s %d" %(os.path.abspath(path), os.stat(path).st_mtime_ns)
+
+"""
+Gets the name of the file recording the program that made the graphlet file gOutF
+"""
+def toolFileName(gOutF):
+    return gOutF+".tool"
+
+"""
+Checks if gOutF is at least as new as pgdNetF and was made by tool
+"""
+def graphletsUpToDate(pgdNetF, gOutF, tool):
+    if not upToDate(pgdNetF, gOutF) or not os.path.isfile(toolFileName(gOutF)):
+        return False
+    toolF = open(toolFileName(gOutF))
+    recorded = toolF.read().strip()
+    toolF.close()
+    return recorded == tool
+
+"""
+Gets the number of cores available to this process
+"""
+def availableCores():
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return multiprocessing.cpu_count()
+
+"""
+Converts one network into dataDirectory/graphlets, returning the converted file name or
+None if the network was too small to convert.
+"""
+def convertNetwork(task):
+    netF, pgdNetF, delim = task
+    if upToDate(netF, pgdNetF):
+        return pgdNetF
+    tmpF = pgdNetF+".tmp"
+    makePGDNet(netF, delim, tmpF)
+    if not os.path.isfile(tmpF):
+        return None
+    os.replace(tmpF, pgdNetF)
+    return pgdNetF
+
+"""
+Decomposes one converted network into a .gOut file using pgdExecutable, or the built-in
+graphlet counts in graphletCounts if pgdExecutable is empty, and records tool, the description
+of the program from decompositionTool, next to it.
+"""
+def decomposeNetwork(task):
+    pgdNetF, gOutF, pgdExecutable, tool = task
+    if graphletsUpToDate(pgdNetF, gOutF, tool):
+        return gOutF
+    #Forget the old program first, so an interrupted run cannot pair new output with it
+    if os.path.isfile(toolFileName(gOutF)):
+        os.remove(toolFileName(gOutF))
+    if pgdExecutable == "":
+        edges, nodes = readEdgeList(pgdNetF)
+        writeGraphletCounts(countGraphlets(edges, len(nodes)), len(nodes), gOutF)
+        writeLines([tool], toolFileName(gOutF))
+        return gOutF
+
+    tmpF = gOutF+".tmp"
+    tmpOut = open(tmpF, "w")
+    result = subprocess.call([pgdExecutable, "-f", pgdNetF], stdout=tmpOut)
+    tmpOut.close()
+    if result != 0:
+        os.remove(tmpF)
+        print("Error: %s exited with status %d on %s" %(pgdExecutable, result, pgdNetF))
+        return None
+    os.replace(tmpF, gOutF)
+    writeLines([tool], toolFileName(gOutF))
+    return gOutF
+
+"""
+Parses one .gOut file into a graphlet distribution
+"""
+def parseGraphlets(gOutF):
+    return gOutF, loadSingleGFD(gOutF, 0, False)
+
+"""
+Writes lines to outF through a temporary file
+"""
+def writeLines(lines, outF):
+    tmpF = outF+".tmp"
+    out = open(tmpF, "w")
+    for line in lines:
+        out.write(line+"\n")
+    out.close()
+    os.replace(tmpF, outF)
+    return
+
+"""
+Runs the convert, decompose, parse and rank stages on dataDir, saving the ranking to outF.
+Stages run in a pool of worker processes, by default one per available core.
+"""
+def runPipeline(dataDir,outF,refPathsF,minSize,outMax,outScore,verbose,nameMap,pgdExecutable="",delim="",workers=0,percTopCompute=0.2):
+    if workers <= 0:
+        workers = availableCores()
+    graphletDir = os.path.join(dataDir, "graphlets")
+    os.makedirs(graphletDir, 0o755, exist_ok=True)
+    netFs = sorted(os.path.join(dataDir, "pathways", netF) for netF in os.listdir(os.path.join(dataDir, "pathways")))
+
+    pool = multiprocessing.Pool(workers)
+    try:
+        #Convert networks for graphlet decomposition
+        tasks = [(netF, os.path.join(graphletDir, os.path.basename(netF)), delim) for netF in netFs]
+        pgdNetFs = [pgdNetF for pgdNetF in pool.map(convertNetwork, tasks) if pgdNetF is not None]
+        if verbose:
+            print("Converted %d of %d networks using %d workers." %(len(pgdNetFs), len(netFs), workers))
+
+        #Graphlet decomposition
+        tool = decompositionTool(pgdExecutable)
+        tasks = [(pgdNetF, os.path.splitext(pgdNetF)[0]+".gOut", pgdExecutable, tool) for pgdNetF in pgdNetFs]
+        gOutFs = [gOutF for gOutF in pool.map(decomposeNetwork, tasks) if gOutF is not None]
+        if verbose:
+            print("Decomposed %d networks." %(len(gOutFs)))
+
+        #Parse graphlet files
+        genPathsG = dict(pool.map(parseGraphlets, gOutFs))
+    finally:
+        pool.close()
+        pool.join()
+
+    #Collect graphletNames into a text file, then rank
+    writeLines(gOutFs, os.path.join(dataDir, "graphletNames.txt"))
+    refMatrix = loadGraphletMatrix(refPathsF,minSize,False,verbose)
+    rankGraphlets(genPathsG,refMatrix,outF,outMax,outScore,verbose,nameMap,percTopCompute)
+    return
+
+
+"""
+Runs the pipeline with the command line arguments in argv, by default sys.argv[1:].
+"""
+def main(argv=None):
+    #Handle command line arguments
+    parser = argparse.ArgumentParser(description="Runs pathway parameter advising on a directory of networks: converts them for graphlet decomposition, decomposes them, and ranks them against reference pathways. Version %s, released under the MIT license."%(ppa.__version__))
+    parser.add_argument("dataDirectory", help="The directory where the networks are stored as sif or edgelist files in a subdirectory named 'pathways'. Converted networks and graphlet files are stored in a subdirectory named 'graphlets'.")
+    parser.add_argument("--outFile", default="parameterRanking.txt", help="File to store output in.")
+    parser.add_argument("--refPathwayGraphlets", help="File where each line is a graphlets file of a reference pathway, a pickled dictionary of reference graphlet distributions, or a reference store directory.",required=True)
+    parser.add_argument("--pgdExecutable", default="", help="Graphlet decomposition executable, run as EXECUTABLE -f NETWORKFILE, such as lib/pgd/pgd. Default is none, which counts graphlets without an external program.")
+    parser.add_argument("--delim", default="", help="Node delimiter in network files. Default is none, which uses whitespace.")
+    parser.add_argument("--workers", default=0, type=int, help="Number of worker processes. Default is the number of available cores.")
+    parser.add_argument("--minSize", default=15, help="Minimum size a reference pathway must be to be included. Must be integer.")
+    parser.add_argument("--outputMax", action="store_true",help="If set, will return only the top pathway instead of a full ranking.")
+    parser.add_argument("--outputScore", action="store_true",help="If set, will return scores in addition to pathway rankings.")
+    parser.add_argument("--nameMap", default="stripped",help="Either a file mapping generated pathway fileNames to parameter values, \"stripped\" to exclude the directory and extension from the filename, or \"fileName\" to use raw file names.")
+    parser.add_argument("--verbose", action="store_true",help="If set, will print intermediate status updates.")
+
+    args = parser.parse_args(argv)
+    runPipeline(args.dataDirectory,args.outFile,args.refPathwayGraphlets,int(args.minSize),args.outputMax,args.outputScore,args.verbose,args.nameMap,args.pgdExecutable,args.delim,args.workers)
+
+if __name__ == "__main__":
+    main()
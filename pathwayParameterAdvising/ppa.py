@@ -1,9 +1,19 @@
 import os
+import json
 import argparse
 import numpy as np
 import sys
+import heapq
+import tempfile
+import itertools
 import pickle as pkl
+from collections import namedtuple
 from pathwayParameterAdvising.graphletUtils import *
+from pathwayParameterAdvising.gfdCache import GFDCache, DEFAULT_CACHE_SIZE
+from pathwayParameterAdvising.referenceIndex import loadReferenceIndex
+from pathwayParameterAdvising.graphletSweep import loadSweepGraphlets
+from pathwayParameterAdvising.graphletSampling import loadApproximateGraphlets, saveIntervalReport, intervalReportFileName, DEFAULT_MAX_ERROR
+from pathwayParameterAdvising import profiling
 import pathwayParameterAdvising as ppa
 
 """
@@ -16,48 +26,726 @@ It then ranks the generated pathways by their similarity to the reference pathwa
 """
 
 
+#Number of distances calculated at once by calcDistanceMatrix
+DISTANCE_BLOCK_ELEMENTS = 2**20
+
+#Number of generated pathways scored at once when streaming
+STREAM_BATCH_SIZE = 1024
+
+#Number of scores sorted in memory at once by the external merge sort used when streaming
+SORT_CHUNK_SIZE = 2**20
+
+#Number of reference pathways used as pivots for the lower bounds used by searchTopRuns
+NUM_PIVOTS = 8
+
+#Relative slack on lower bounds, which are summed in a different order than exact distances
+BOUND_TOLERANCE = 1e-9
+
+"""
+Distance stores are directories of .npy arrays holding the distances between every generated
+pathway (rows) and every reference pathway (columns), with their names and the reference sizes.
+Distances are memory mapped when loaded, so pathways can be ranked again with other settings.
+"""
+DISTANCE_FILES = {"generated":"generated.npy", "references":"references.npy", "sizes":"sizes.npy", "distances":"distances.npy"}
+
+"""
+Memory mapped arrays of a distance store
+"""
+DistanceStore = namedtuple("DistanceStore", ["generated", "references", "sizes", "distances"])
+
 """
 Main method which uses pathway parameter advising to rank parameters.
 
 See argument definitions in README or by running "python pathwayParameterAdvising.py --help".
+If genNetworks is set, each line of genPathsF is a network file whose graphlets are counted
+directly instead of a graphlets file, counted incrementally across the networks if sweep is set,
+or estimated from sampled edges if approximate is set (see graphletSampling.estimateGraphlets
+for approxError and approxSeconds). If cache is a
+GFDCache, graphlet files are loaded through it. Otherwise graphlet files are parsed by a pool of
+size workers, using threads if threads is set. If saveDistances is set, the distances to all
+reference pathways, whatever their size, are saved to a distance store in that directory, and
+the ranking is made from the store by rankDistanceStore.
 """
-def rankParameters(genPathsF,refPathsF,outF,minSize,outMax,outScore,verbose,nameMap,saveGraphlets,percTopCompute=0.2):
+def rankParameters(genPathsF,refPathsF,outF,minSize,outMax,outScore,verbose,nameMap,saveGraphlets,percTopCompute=0.2,genNetworks=False,delim="",cache=None,outTop=0,workers=1,threads=False,approximate=False,approxError=DEFAULT_MAX_ERROR,approxSeconds=np.inf,sweep=False,saveDistances=""):
     #Load Graphlets
     if verbose:
         print("Command line arguments parsed, loading graphlets...")
-    refPathsG = loadGraphlets(refPathsF,minSize,saveGraphlets,verbose)
-    genPathsG = loadGraphlets(genPathsF,0,saveGraphlets,verbose)
+    with profiling.stage("loadReferences"):
+        if saveDistances != "":
+            refMatrix = loadGraphletMatrix(refPathsF,0,saveGraphlets,verbose,cache,workers,threads)
+            index = None
+        else:
+            refMatrix = loadGraphletMatrix(refPathsF,minSize,saveGraphlets,verbose,cache,workers,threads)
+            index = loadReferenceIndex(refPathsF,minSize,verbose)
+    scoreErrors = None
+    with profiling.stage("loadGenerated"):
+        if genNetworks and approximate:
+            genPathsG, scoreErrors = loadApproximateGraphlets(genPathsF,delim,verbose,approxError,approxSeconds)
+        elif genNetworks and sweep:
+            genPathsG = loadSweepGraphlets(genPathsF,delim,verbose)
+        elif genNetworks:
+            genPathsG = loadNetworkGraphlets(genPathsF,delim,verbose)
+        else:
+            genPathsG = loadGraphletMatrix(genPathsF,0,saveGraphlets,verbose,cache,workers,threads)
+    if saveDistances != "":
+        if saveDistanceStore(genPathsG,refMatrix,saveDistances,verbose):
+            rankDistanceStore(saveDistances,outF,[minSize],percTopCompute,["all"],outMax,outScore,verbose,nameMap,outTop)
+        return
+    rankGraphlets(genPathsG,refMatrix,outF,outMax,outScore,verbose,nameMap,percTopCompute,outTop,index,scoreErrors)
+    return
 
+"""
+Ranks already loaded generated pathway graphlet distributions, either a dictionary or a
+GraphletMatrix, against a GraphletMatrix of reference pathways, and saves the ranking like
+rankParameters. If index is the ReferenceIndex of the reference store, it is used to find the
+closest reference pathways. If scoreErrors is a dictionary from generated pathways to the errors
+of their scores, such as from approximate graphlet counts, a report of score intervals is also
+saved for every scored pathway by graphletSampling.saveIntervalReport.
+"""
+def rankGraphlets(genPathsG,refMatrix,outF,outMax,outScore,verbose,nameMap,percTopCompute=0.2,outTop=0,index=None,scoreErrors=None):
     #Check loaded graphlets
-    if len(refPathsG)==0:
+    if len(refMatrix.names)==0:
         print("Must include at least 1 reference pathway to perform ranking.")
         return
 
-    if len(genPathsG)==0:
+    numGen = len(genPathsG.names) if isinstance(genPathsG, GraphletMatrix) else len(genPathsG)
+    if numGen==0:
         print("Must include at least 1 generated pathway to perform ranking.")
         return
 
     if verbose:
-        print("Loaded %d generated pathways." %(len(genPathsG)))
-        print("Loaded %d reference pathways." %(len(refPathsG)))
+        print("Loaded %d generated pathways." %(numGen))
+        print("Loaded %d reference pathways." %(len(refMatrix.names)))
+
+    #Calculate Distances, only for runs which can be in the top runs if just those are saved
+    percTops = list(np.atleast_1d(percTopCompute))
+    numTop = 1 if outMax else outTop
+    if verbose:
+        print("Calculating graphlet distances",end='',flush=True)
+    with profiling.stage("distances", hot=True):
+        if numTop > 0 and len(percTops) == 1 and index is None and scoreErrors is None:
+            genNames, scores = searchTopRuns(genPathsG, refMatrix, percTops[0], numTop, verbose=verbose)
+            allScores = [scores]
+        else:
+            genNames, allScores = scoreGraphlets(genPathsG, refMatrix, percTops, verbose, index)
+    if verbose:
+        print()
+
+    #Save Output, one file per top fraction if more than one was given
+    with profiling.stage("output"):
+        for percTop,scores in zip(percTops,allScores):
+            distances = dict(zip(genNames, scores))
+            distances = changeNames(distances,nameMap)
+            percTopF = topFractionFileName(outF,percTop) if len(percTops) > 1 else outF
+            saveRankingOutput(distances,percTopF,outMax,outScore,verbose,outTop)
+            if scoreErrors is not None:
+                saveIntervalReport(distances,changeNames(scoreErrors,nameMap),intervalReportFileName(percTopF),verbose)
+    return
+
+"""
+Scores generated pathway graphlet distributions, either a dictionary or a GraphletMatrix,
+against a GraphletMatrix of reference pathways. Returns the generated pathway names and
+their scores from calcTopFractionScores. If index is the ReferenceIndex of the reference
+store, the closest reference pathways are found with it instead, giving the same scores.
+"""
+def scoreGraphlets(genPathsG, refMatrix, percTopCompute, verbose=False, index=None):
+    genMatrix, refMatrix = alignForScoring(genPathsG, refMatrix)
+    if index is not None:
+        return genMatrix.names, index.scoreFrequencies(genMatrix.freqs, percTopCompute, verbose=verbose)
+    allDists = calcDistanceMatrix(genMatrix.freqs, refMatrix.freqs, verbose=verbose)
+    profiling.count("generatedPathways", len(genMatrix.names))
+    profiling.count("distanceEvaluations", allDists.size)
+    return genMatrix.names, calcTopFractionScores(allDists, percTopCompute)
+
+"""
+Converts generated pathway graphlet distributions to a GraphletMatrix if needed, and aligns it
+and the reference GraphletMatrix to the reference graphlets followed by any graphlets only
+found in generated pathways.
+"""
+def alignForScoring(genPathsG, refMatrix):
+    if isinstance(genPathsG, GraphletMatrix):
+        genMatrix = genPathsG
+    else:
+        genMatrix = graphletMatrix(genPathsG, graphletVocabulary(genPathsG))
+    refGraphlets = set(refMatrix.graphlets)
+    graphlets = list(refMatrix.graphlets) + [g for g in genMatrix.graphlets if g not in refGraphlets]
+    return alignGraphletMatrix(genMatrix, graphlets), alignGraphletMatrix(refMatrix, graphlets)
+
+"""
+Finds the numTop best scoring generated pathways without scoring all of them exactly.
+A lower bound on the score of every generated pathway is computed with scoreLowerBounds, and
+pathways are then scored exactly in order of increasing bound, in blocks which start at numTop
+rows and double up to blockSize. The numTop-th best exact score found so far is a threshold
+no pathway with a larger bound can beat, and the search stops once the next bound is above it.
+threshold can give an initial value, such as the worst score of numTop runs already found.
+
+Returns the names and exact scores, identical to scoreGraphlets, of a subset of generated
+pathways which includes every pathway whose score is within the numTop best.
+"""
+def searchTopRuns(genPathsG, refMatrix, percTopCompute, numTop, threshold=np.inf, blockSize=None, verbose=False):
+    genMatrix, refMatrix = alignForScoring(genPathsG, refMatrix)
+    genFreqs = np.asarray(genMatrix.freqs, dtype=float)
+    refFreqs = np.asarray(refMatrix.freqs, dtype=float)
+    nGen, nRef = len(genFreqs), len(refFreqs)
+    nTop = min(int(nRef*percTopCompute), nRef)
+    if nTop == 0 or nGen <= numTop:
+        return genMatrix.names, calcTopFractionScores(calcDistanceMatrix(genFreqs, refFreqs), percTopCompute)
+    if blockSize is None:
+        blockSize = max(numTop, DISTANCE_BLOCK_ELEMENTS//max(nRef,1))
+
+    bounds = scoreLowerBounds(genFreqs, refFreqs, nTop)
+    order = np.argsort(bounds, kind="stable")
+    keptRows = []
+    keptScores = []
+    pos = 0
+    size = numTop
+    while pos < nGen and bounds[order[pos]] <= threshold + BOUND_TOLERANCE*(1+abs(threshold)):
+        block = order[pos:pos+size]
+        block = block[bounds[block] <= threshold + BOUND_TOLERANCE*(1+abs(threshold))]
+        keptRows.append(block)
+        keptScores.append(calcTopFractionScores(calcDistanceMatrix(genFreqs[block], refFreqs), percTopCompute))
+        allScores = np.concatenate(keptScores)
+        if len(allScores) >= numTop:
+            threshold = min(threshold, np.partition(allScores, numTop-1)[numTop-1])
+        pos += size
+        size = min(2*size, blockSize)
+        if verbose:
+            print(".",end='',flush=True)
 
-    #Calculate Distances
-    distances = dict()
+    rows = np.concatenate(keptRows) if len(keptRows)>0 else np.zeros(0, dtype=int)
+    scores = np.concatenate(keptScores) if len(keptScores)>0 else np.zeros(0)
+    profiling.count("generatedPathways", nGen)
+    profiling.count("distanceEvaluations", len(rows)*nRef)
+    profiling.count("pathwaysPruned", nGen-len(rows))
+    return [genMatrix.names[i] for i in rows], scores
+
+"""
+Gets a lower bound on the score of each generated pathway (row of genFreqs), the mean of its
+nTop smallest distances to the references, without calculating those distances.
+
+Each bound comes from a one dimensional projection f with |f(g)-f(r)| <= d(g,r). The mean of the
+nTop smallest |f(g)-f(r)| is then at most the score, and is found from the sorted projections of
+the references by windowMeans. Two kinds of projections are used:
+ - Each graphlet frequency, doubled. Distributions sum to 1, so the rest of the distance is at
+   least the same difference again. Totals differ slightly through rounding, which is subtracted.
+ - The distance to one of NUM_PIVOTS reference pathways, by the triangle inequality.
+The largest bound of all projections is returned.
+"""
+def scoreLowerBounds(genFreqs, refFreqs, nTop):
+    genTotals = genFreqs.sum(axis=1)
+    refTotals = refFreqs.sum(axis=1)
+    slack = max(genTotals.max()-refTotals.min(), refTotals.max()-genTotals.min(), 0.0)
+    bounds = np.zeros(len(genFreqs))
+    for g in range(genFreqs.shape[1]):
+        bounds = np.maximum(bounds, windowMeans(2*refFreqs[:,g], 2*genFreqs[:,g], nTop)-slack)
+
+    #Pivots are chosen farthest first, starting with the reference closest to the mean
+    pivots = [int(np.argmin(calcDistanceMatrix(refFreqs.mean(axis=0)[None,:], refFreqs)[0]))]
+    refPivotDists = [calcDistanceMatrix(refFreqs[pivots[-1:]], refFreqs)[0]]
+    while len(pivots) < min(NUM_PIVOTS, len(refFreqs)):
+        pivots.append(int(np.argmax(np.min(refPivotDists, axis=0))))
+        refPivotDists.append(calcDistanceMatrix(refFreqs[pivots[-1:]], refFreqs)[0])
+    genPivotDists = calcDistanceMatrix(genFreqs, refFreqs[pivots])
+    for i in range(len(pivots)):
+        bounds = np.maximum(bounds, windowMeans(refPivotDists[i], genPivotDists[:,i], nTop))
+    profiling.count("boundEvaluations", len(genFreqs)*(genFreqs.shape[1]+len(pivots)))
+    return bounds
+
+"""
+Gets the mean of the k smallest values of |q-v| over values v, for each query q.
+The k values closest to q are a contiguous window of the sorted values, whose start is found by
+binary search for all queries at once, and whose sum comes from prefix sums.
+"""
+def windowMeans(values, queries, k):
+    values = np.sort(values)
+    prefix = np.concatenate([[0.0], np.cumsum(values)])
+    lo = np.zeros(len(queries), dtype=int)
+    hi = np.full(len(queries), len(values)-k)
+    while np.any(lo < hi):
+        mid = (lo+hi)//2
+        #Move the window right if its first value is farther from q than the value after it
+        right = queries-values[mid] > values[np.minimum(mid+k, len(values)-1)]-queries
+        active = lo < hi
+        lo = np.where(active & right, mid+1, lo)
+        hi = np.where(active & ~right, mid, hi)
+    end = lo+k
+    split = np.clip(np.searchsorted(values, queries), lo, end)
+    sums = queries*(split-lo) - (prefix[split]-prefix[lo]) + (prefix[end]-prefix[split]) - queries*(end-split)
+    return sums/k
+
+"""
+Ranks generated pathways with bounded memory. Generated graphlet files are read lazily and
+scored in batches of batchSize against the reference pathways as they are parsed.
+
+If outMax or outTop is set, only a heap of the best runs is kept. Otherwise scores are written
+unsorted to a temporary file in tmpDir, which is then sorted with an external merge sort.
+Output is the same as rankParameters. As in changeNames, of the generated pathways whose names
+map to the same run only the last is kept, so the others are not scored.
+"""
+def rankParametersStreaming(genPathsF,refPathsF,outF,minSize,outMax,outScore,verbose,nameMap,percTopCompute=0.2,cache=None,outTop=0,batchSize=STREAM_BATCH_SIZE,tmpDir=None):
+    with profiling.stage("loadReferences"):
+        refMatrix = loadGraphletMatrix(refPathsF,minSize,False,verbose,cache)
+        index = loadReferenceIndex(refPathsF,minSize,verbose)
+    if len(refMatrix.names)==0:
+        print("Must include at least 1 reference pathway to perform ranking.")
+        return
     if verbose:
+        print("Loaded %d reference pathways." %(len(refMatrix.names)))
         print("Calculating graphlet distances",end='',flush=True)
-    for run in genPathsG:
-        distances[run] = calcGraphletDistance(genPathsG[run], refPathsG.values())
-        distances[run] = np.mean(distances[run][:int(len(distances[run])*percTopCompute)])
+
+    if outMax:
+        outTop = 1
+    #Find the last generated pathway of each run before scoring any
+    mapName = nameMapper(nameMap)
+    lastPaths = dict()
+    for line in open(genPathsF):
+        lastPaths[mapName(line.strip())] = line.strip()
+    runNames = {name:run for run,name in lastPaths.items()}
+    del lastPaths
+    topRuns = []
+    if outTop == 0:
+        scoreF = tempfile.NamedTemporaryFile("w", suffix=".scores", dir=tmpDir, delete=False)
+    numRuns = 0
+    genIter = iterGraphlets(genPathsF,0,False,cache)
+    while True:
+        with profiling.stage("loadGenerated"):
+            batch = dict(itertools.islice(genIter, batchSize))
+        if len(batch) == 0:
+            break
+        batchRuns = {name:runNames.pop(name) for name in batch if name in runNames}
+        batch = {name:batch[name] for name in batchRuns}
+        if len(batch) == 0:
+            continue
+        with profiling.stage("distances", hot=True):
+            if outTop > 0 and index is None:
+                threshold = topRuns[-1][0] if len(topRuns) == outTop else np.inf
+                genNames, scores = searchTopRuns(batch, refMatrix, percTopCompute, outTop, threshold)
+            else:
+                genNames, scores = scoreGraphlets(batch, refMatrix, percTopCompute, index=index)
+        runs = [(float(score), batchRuns[name]) for name,score in zip(genNames,scores)]
+        numRuns += len(batch)
+        if outTop > 0:
+            topRuns = heapq.nsmallest(outTop, itertools.chain(topRuns, runs))
+        else:
+            for score,run in runs:
+                scoreF.write("%r\t%s\n" %(score, run))
         if verbose:
             print(".",end='',flush=True)
+    if verbose:
+        print()
+        print("Scored %d generated pathways." %(numRuns))
+    if cache is not None:
+        cache.flush()
+
+    with profiling.stage("output"):
+        if outTop > 0:
+            if numRuns > 0:
+                saveSortedRanking(topRuns,outF,False,outScore,verbose,outTop)
+        else:
+            scoreF.close()
+            if numRuns > 0:
+                saveSortedRanking(externalSortScores(scoreF.name,SORT_CHUNK_SIZE,tmpDir),outF,False,outScore,verbose)
+            os.remove(scoreF.name)
+    if numRuns == 0:
+        print("Must include at least 1 generated pathway to perform ranking.")
+    return
+
+"""
+Sorts a file of tab separated scores and runs with an external merge sort, yielding
+(score, run) pairs in the ranking order used by saveRankingOutput. Chunks of chunkSize
+lines are sorted in memory and written to temporary files in tmpDir, which are then merged.
+"""
+def externalSortScores(scoreFN, chunkSize, tmpDir=None):
+    chunkFNs = []
+    scoreF = open(scoreFN)
+    while True:
+        chunk = [parseScoreLine(line) for line in itertools.islice(scoreF, chunkSize)]
+        if len(chunk) == 0:
+            break
+        chunk.sort()
+        chunkF = tempfile.NamedTemporaryFile("w", suffix=".scores", dir=tmpDir, delete=False)
+        for score,run in chunk:
+            chunkF.write("%r\t%s\n" %(score, run))
+        chunkF.close()
+        chunkFNs.append(chunkF.name)
+    scoreF.close()
+
+    chunkFs = [open(chunkFN) for chunkFN in chunkFNs]
+    try:
+        for scoreRun in heapq.merge(*[map(parseScoreLine, chunkF) for chunkF in chunkFs]):
+            yield scoreRun
+    finally:
+        for chunkF in chunkFs:
+            chunkF.close()
+        for chunkFN in chunkFNs:
+            os.remove(chunkFN)
+
+"""
+Parses a line of a score file written while streaming
+"""
+def parseScoreLine(line):
+    score, run = line.rstrip("\n").split("\t", 1)
+    return float(score), run
+
+"""
+Scores one shard of the generated pathways in genPathsF, a file where each line is a graphlets
+file or a pickled dictionary, and saves the scores to a shard file named by shardFileName(outF).
+Generated pathway names are split into numShards contiguous slices of nearly equal size, in the
+order they are first listed, and shard (from 1 to numShards) scores one of them.
+
+Shard files start with a line of # followed by JSON describing the shard, and then have a line
+per generated pathway with its position in the full list, the repr of its score for each top
+fraction, and its name, separated by tabs. mergeShards combines them into the ranking
+rankParameters would save.
+"""
+def rankShard(genPathsF,refPathsF,outF,minSize,verbose,percTopCompute,shard,numShards,cache=None,workers=1,threads=False):
+    percTops = list(np.atleast_1d(percTopCompute))
+    with profiling.stage("loadReferences"):
+        refMatrix = loadGraphletMatrix(refPathsF,minSize,False,verbose,cache,workers,threads)
+        index = loadReferenceIndex(refPathsF,minSize,verbose)
+    if len(refMatrix.names)==0:
+        print("Must include at least 1 reference pathway to perform ranking.")
+        return
+
+    with profiling.stage("loadGenerated"):
+        if isPickleFile(genPathsF):
+            allGDists = loadGraphlets(genPathsF,0,False,verbose)
+            names = list(allGDists)
+        else:
+            names = list(dict.fromkeys(line.strip() for line in open(genPathsF)))
+        start, end = shardSlice(len(names), shard, numShards)
+        if isPickleFile(genPathsF):
+            genPathsG = {name:allGDists[name] for name in names[start:end]}
+        elif cache is not None:
+            genPathsG = {name:cache.loadSingleGFD(name,0,verbose) for name in names[start:end]}
+            genPathsG = {name:gDist for name,gDist in genPathsG.items() if len(gDist)>0}
+            cache.flush()
+        else:
+            genPathsG = loadGFDMatrix(names[start:end],0,verbose,workers,threads)
+    if verbose:
+        print("Scoring generated pathways %d to %d of %d in shard %d of %d" %(start+1,end,len(names),shard,numShards),end='',flush=True)
+
+    with profiling.stage("distances", hot=True):
+        genNames, allScores = scoreGraphlets(genPathsG, refMatrix, percTops, verbose, index)
     if verbose:
         print()
 
-    #Save Output
-    distances = changeNames(distances,nameMap)
-    saveRankingOutput(distances,outF,outMax,outScore,verbose)
+    with profiling.stage("output"):
+        positions = {name:i for i,name in enumerate(names)}
+        shardF = shardFileName(outF, shard, numShards)
+        out = open(shardF+".tmp", "w")
+        header = {"shard":shard, "numShards":numShards, "numGenerated":len(names), "percTopCompute":[float(percTop) for percTop in percTops]}
+        out.write("#%s\n" %(json.dumps(header)))
+        for i in sorted(range(len(genNames)), key=lambda i: positions[genNames[i]]):
+            scores = "\t".join("%r" %(float(scores[i])) for scores in allScores)
+            out.write("%d\t%s\t%s\n" %(positions[genNames[i]], scores, genNames[i]))
+        out.close()
+        os.replace(shardF+".tmp", shardF)
+    if verbose:
+        print("Saved scores of %d generated pathways to %s" %(len(genNames),shardF))
     return
 
+"""
+Gets the start and end of the slice of numNames generated pathways scored by a shard
+"""
+def shardSlice(numNames, shard, numShards):
+    return (shard-1)*numNames//numShards, shard*numNames//numShards
+
+"""
+Gets the name of the file a shard's scores are saved to, for the ranking output file outF
+"""
+def shardFileName(outF, shard, numShards):
+    return "%s_shard%dof%d.scores" %(os.path.splitext(outF)[0], shard, numShards)
+
+"""
+Parses a shard given as i/n, returning (i, n), or raises a ValueError
+"""
+def parseShard(shard):
+    parts = shard.split("/")
+    if len(parts) != 2 or not parts[0].strip().isdigit() or not parts[1].strip().isdigit():
+        raise ValueError("Shards must be given as i/n, such as 1/4.")
+    shard, numShards = int(parts[0]), int(parts[1])
+    if not 1 <= shard <= numShards:
+        raise ValueError("Shard %d/%d must be between 1 and %d." %(shard, numShards, numShards))
+    return shard, numShards
+
+"""
+Merges the shard files saved by rankShard for every shard of a ranking, and saves the ranking
+like rankParameters. Generated pathways are put back in the order of the full list before
+changeNames is applied, so names mapped to the same value resolve as they would in one run,
+and scores are read back exactly from their repr. Returns False if the shards do not make up
+one complete ranking.
+"""
+def mergeShards(shardFs,outF,outMax,outScore,verbose,nameMap,outTop=0):
+    headers = []
+    rows = []
+    for shardF in shardFs:
+        inF = open(shardF)
+        firstLine = inF.readline()
+        if not firstLine.startswith("#"):
+            print("Error: %s is not a shard file." %(shardF))
+            inF.close()
+            return False
+        headers.append(json.loads(firstLine[1:]))
+        numScores = len(headers[-1]["percTopCompute"])
+        for line in inF:
+            fields = line.rstrip("\n").split("\t", numScores+1)
+            rows.append((int(fields[0]), [float(score) for score in fields[1:numScores+1]], fields[-1]))
+        inF.close()
+
+    if len(headers) == 0:
+        print("Error: no shard files given.")
+        return False
+    for field in ["numShards", "numGenerated", "percTopCompute"]:
+        if any(header[field] != headers[0][field] for header in headers):
+            print("Error: shard files disagree on %s, so they are not from the same ranking." %(field))
+            return False
+    shards = sorted(header["shard"] for header in headers)
+    if shards != list(range(1, headers[0]["numShards"]+1)):
+        missing = sorted(set(range(1, headers[0]["numShards"]+1))-set(shards))
+        print("Error: expected each of %d shards once, missing %s and found %s." %(headers[0]["numShards"], missing, shards))
+        return False
+    if verbose:
+        print("Merging scores of %d generated pathways from %d shards." %(len(rows), len(headers)))
+    if len(rows)==0:
+        print("Must include at least 1 generated pathway to perform ranking.")
+        return True
+
+    rows.sort(key=lambda row: row[0])
+    percTops = headers[0]["percTopCompute"]
+    for i,percTop in enumerate(percTops):
+        distances = changeNames({name:scores[i] for position,scores,name in rows}, nameMap)
+        if len(percTops) > 1:
+            saveRankingOutput(distances,topFractionFileName(outF,percTop),outMax,outScore,verbose,outTop)
+        else:
+            saveRankingOutput(distances,outF,outMax,outScore,verbose,outTop)
+    return True
+
+"""
+Scores each generated pathway as the mean of its smallest int(nRef*percTopCompute) reference
+distances, given the generated x reference distance matrix from calcDistanceMatrix.
+
+percTopCompute may be a single fraction, giving one score per generated pathway, or a list of
+fractions, giving one row of scores per fraction. The smallest distances needed by the largest
+fraction are selected with a partition along the reference axis, and only those are sorted, so
+scores are identical to averaging the start of a fully sorted distance list.
+"""
+def calcTopFractionScores(allDists, percTopCompute):
+    allDists = np.asarray(allDists, dtype=float)
+    percTops = np.atleast_1d(percTopCompute)
+    nRef = allDists.shape[1]
+    nTops = [min(int(nRef*percTop), nRef) for percTop in percTops]
+    maxTop = max(nTops)
+
+    if 0 < maxTop < nRef:
+        topDists = np.partition(allDists, maxTop-1, axis=1)[:,:maxTop]
+    else:
+        topDists = allDists[:,:maxTop]
+    topDists = np.sort(topDists, axis=1)
+
+    allScores = np.empty((len(nTops), len(allDists)))
+    for i,nTop in enumerate(nTops):
+        allScores[i] = np.mean(topDists[:,:nTop], axis=1)
+    if np.ndim(percTopCompute) == 0:
+        return allScores[0]
+    return allScores
+
+"""
+Gets the output file name used for one top fraction when ranking with several at once
+"""
+def topFractionFileName(outF, percTopCompute):
+    base, ext = os.path.splitext(outF)
+    return "%s_top%g%s" %(base, percTopCompute, ext)
+
+"""
+Calculates the distances between generated pathway graphlet distributions, either a dictionary
+or a GraphletMatrix, and every reference pathway in a GraphletMatrix, and saves them with their
+names and the reference sizes as a distance store in storeDir. Distances are written in blocks
+to a memory mapped file, and every array is written to a temporary file first. Returns False
+if there are no generated or reference pathways.
+"""
+def saveDistanceStore(genPathsG, refMatrix, storeDir, verbose=False):
+    numGen = len(genPathsG.names) if isinstance(genPathsG, GraphletMatrix) else len(genPathsG)
+    if len(refMatrix.names)==0 or numGen==0:
+        print("Must include at least 1 %s pathway to perform ranking." %("reference" if len(refMatrix.names)==0 else "generated"))
+        return False
+    genMatrix, refMatrix = alignForScoring(genPathsG, refMatrix)
+    refFreqs = np.asarray(refMatrix.freqs, dtype=float)
+    nGen, nRef = len(genMatrix.names), len(refMatrix.names)
+    if verbose:
+        print("Calculating graphlet distances to %d reference pathways" %(nRef),end='',flush=True)
+
+    os.makedirs(storeDir, 0o755, exist_ok=True)
+    arrays = {"generated":np.array(genMatrix.names, dtype=str).reshape(-1),
+              "references":np.array(refMatrix.names, dtype=str).reshape(-1),
+              "sizes":np.asarray(refMatrix.sizes, dtype=float)}
+    for field in arrays:
+        storeF = os.path.join(storeDir, DISTANCE_FILES[field])
+        with open(storeF+".tmp", "wb") as out:
+            np.save(out, arrays[field])
+        os.replace(storeF+".tmp", storeF)
+
+    #Distances are written last, so a store with a distance file is complete
+    storeF = os.path.join(storeDir, DISTANCE_FILES["distances"])
+    distances = np.lib.format.open_memmap(storeF+".tmp", mode="w+", dtype=float, shape=(nGen, nRef))
+    blockSize = max(1, DISTANCE_BLOCK_ELEMENTS//nRef)
+    with profiling.stage("distances", hot=True):
+        for start in range(0, nGen, blockSize):
+            distances[start:start+blockSize] = calcDistanceMatrix(genMatrix.freqs[start:start+blockSize], refFreqs)
+            if verbose:
+                print(".",end='',flush=True)
+    distances.flush()
+    del distances
+    os.replace(storeF+".tmp", storeF)
+    profiling.count("generatedPathways", nGen)
+    profiling.count("distanceEvaluations", nGen*nRef)
+    if verbose:
+        print()
+        print("Saved distances of %d generated pathways to %d reference pathways to %s" %(nGen, nRef, storeDir))
+    return True
+
+"""
+Loads a distance store as a DistanceStore of memory mapped arrays
+"""
+def loadDistanceStore(storeDir):
+    arrays = dict()
+    for field in DISTANCE_FILES:
+        arrays[field] = np.load(os.path.join(storeDir, DISTANCE_FILES[field]), mmap_mode="r")
+    return DistanceStore(**arrays)
+
+"""
+Gets a mask of the reference pathways of a DistanceStore which are at least minSize and are in
+subset, a file where each line names a reference pathway, either as stored or by its file name
+without directory and extension, or "all" for every reference pathway. Missing sizes are never
+too small, like loadReferenceStore.
+"""
+def referenceMask(store, minSize, subset):
+    mask = ~(np.asarray(store.sizes) < minSize)
+    if subset == "all":
+        return mask
+    names = set(line.strip() for line in open(subset) if len(line.strip()) > 0)
+    stripName = nameMapper("stripped")
+    inSubset = [name in names or stripName(name) in names for name in store.references.tolist()]
+    found = set(store.references.tolist()) | set(stripName(name) for name in store.references.tolist())
+    missing = names - found
+    if len(missing) > 0:
+        print("Error: %d reference pathways in %s are not in the distance store, such as %s." %(len(missing), subset, sorted(missing)[0]))
+    return mask & np.array(inSubset, dtype=bool)
+
+"""
+Scores each generated pathway against several sets of reference pathways, given as masks over
+the columns of the generated x reference distance matrix, and for several top fractions.
+Returns an array of scores indexed by mask, top fraction and generated pathway.
+
+Distances are read once, in blocks of rows, and each block is scored for every mask. The
+columns of a mask are scored by calcTopFractionScores, so scores are identical to ranking
+against only those references, and masks which select the same references are scored once.
+"""
+def scoreReferenceSets(allDists, masks, percTopCompute, verbose=False):
+    percTops = list(np.atleast_1d(percTopCompute))
+    nGen, nRef = allDists.shape
+    allScores = np.empty((len(masks), len(percTops), nGen))
+    uniqueMasks = dict()
+    for mask in masks:
+        uniqueMasks.setdefault(mask.tobytes(), mask)
+    blockSize = max(1, DISTANCE_BLOCK_ELEMENTS//max(nRef,1))
+    for start in range(0, nGen, blockSize):
+        block = np.asarray(allDists[start:start+blockSize], dtype=float)
+        blockScores = {key:calcTopFractionScores(np.ascontiguousarray(block[:,mask]), percTops) for key,mask in uniqueMasks.items()}
+        for i,mask in enumerate(masks):
+            allScores[i,:,start:start+len(block)] = blockScores[mask.tobytes()]
+        if verbose:
+            print(".",end='',flush=True)
+    profiling.count("rankingsScored", len(masks)*len(percTops))
+    return allScores
+
+"""
+Ranks the generated pathways of a distance store for every combination of a minimum reference
+size in minSizes, a top fraction in percTopCompute and a reference subset in subsets (see
+referenceMask), which are all scored in one pass over the distances. Rankings are saved like
+rankParameters, with the setting of each dimension given more than one value added to the
+output file name by settingFileName. Returns False if the store has no generated pathways.
+"""
+def rankDistanceStore(storeDir,outF,minSizes,percTopCompute,subsets,outMax,outScore,verbose,nameMap,outTop=0):
+    store = loadDistanceStore(storeDir)
+    percTops = list(np.atleast_1d(percTopCompute))
+    if verbose:
+        print("Loaded distances of %d generated pathways to %d reference pathways from %s." %(len(store.generated), len(store.references), storeDir))
+    if len(store.generated)==0:
+        print("Must include at least 1 generated pathway to perform ranking.")
+        return False
+
+    settings = []
+    masks = []
+    for minSize in minSizes:
+        for subset in subsets:
+            mask = referenceMask(store, minSize, subset)
+            if not mask.any():
+                print("Must include at least 1 reference pathway to perform ranking, but none are in %s with minimum size %d." %(subset, minSize))
+                continue
+            settings.append((minSize, subset))
+            masks.append(mask)
+    if verbose:
+        print("Scoring %d rankings" %(len(masks)*len(percTops)),end='',flush=True)
+    with profiling.stage("distances", hot=True):
+        allScores = scoreReferenceSets(store.distances, masks, percTops, verbose)
+    if verbose:
+        print()
+
+    with profiling.stage("output"):
+        genNames = store.generated.tolist()
+        varied = (len(minSizes) > 1, len(percTops) > 1, len(subsets) > 1)
+        for (minSize, subset), scores in zip(settings, allScores):
+            for percTop, percTopScores in zip(percTops, scores):
+                distances = changeNames(dict(zip(genNames, percTopScores)), nameMap)
+                saveRankingOutput(distances,settingFileName(outF,minSize,percTop,subset,varied),outMax,outScore,verbose,outTop)
+    return True
+
+"""
+Gets the output file name of the ranking for one setting of rankDistanceStore. varied tells
+whether more than one minimum size, top fraction and subset were ranked, and only those
+settings are added to the name, so a single top fraction uses the name topFractionFileName does.
+"""
+def settingFileName(outF, minSize, percTop, subset, varied):
+    base, ext = os.path.splitext(outF)
+    if varied[0]:
+        base += "_minSize%d" %(minSize)
+    if varied[1]:
+        base += "_top%g" %(percTop)
+    if varied[2]:
+        base += "_%s" %(os.path.splitext(os.path.basename(subset))[0])
+    return base+ext
+
+"""
+Calculates the full matrix of graphlet distances between generated (rows) and reference (columns)
+graphlet frequency matrices, which must share the same graphlet columns.
+
+Generated rows are processed in blocks of blockSize against all references at once, by default
+sized so a block holds about DISTANCE_BLOCK_ELEMENTS distances. Graphlet columns are accumulated
+one at a time in vocabulary order, so each entry is identical to calcPairwiseGraphletDistance.
+"""
+def calcDistanceMatrix(genFreqs, refFreqs, blockSize=None, verbose=False):
+    genFreqs = np.asarray(genFreqs, dtype=float)
+    refCols = np.ascontiguousarray(np.asarray(refFreqs, dtype=float).T)
+    nRef = refCols.shape[1]
+    if blockSize is None:
+        blockSize = max(1, DISTANCE_BLOCK_ELEMENTS//max(nRef,1))
+
+    allDists = np.empty((len(genFreqs), nRef))
+    diff = np.empty((min(blockSize, len(genFreqs)), nRef))
+    for start in range(0, len(genFreqs), blockSize):
+        block = genFreqs[start:start+blockSize]
+        dists = allDists[start:start+len(block)]
+        blockDiff = diff[:len(block)]
+        dists.fill(0.0)
+        for g in range(refCols.shape[0]):
+            np.subtract(block[:,g,None], refCols[g], out=blockDiff)
+            np.abs(blockDiff, out=blockDiff)
+            dists += blockDiff
+        if verbose:
+            print(".",end='',flush=True)
+    return allDists
+
 """
 Calculates pairwise graphlet distance
 """
@@ -94,21 +782,56 @@ def calcGraphletDistance(testG, refGraphlets):
 
 
 
-if __name__ == "__main__":
+"""
+Ranks parameters with the command line arguments in argv, by default sys.argv[1:].
+"""
+def main(argv=None):
     #Handle command line arguments
     parser = argparse.ArgumentParser(description="The pathway parameter advisor creates a ranking of pathways based on their topological distance to a set of reference pathways. Version %s, released under the MIT license."%(ppa.__version__))
-    parser.add_argument("--genPathwayGraphlets", help="File where each line is a graphlets file of a generated pathway, or a pickled dictionary of precomputed reference graphlet distributions",required=True)
-    parser.add_argument("--refPathwayGraphlets", help="File where each line is a graphlets file of a reference pathway, or a pickled dictionary of precomputed reference graphlet distributions.",required=True)
+    genPaths = parser.add_mutually_exclusive_group(required=True)
+    genPaths.add_argument("--genPathwayGraphlets", help="File where each line is a graphlets file of a generated pathway, or a pickled dictionary of precomputed reference graphlet distributions")
+    genPaths.add_argument("--genPathwayNetworks", help="File where each line is a sif or edgelist network file of a generated pathway, or an edge archive saved by convertNetworks.py. Graphlets are counted directly, without PGD.")
+    parser.add_argument("--refPathwayGraphlets", help="File where each line is a graphlets file of a reference pathway, a pickled dictionary of precomputed reference graphlet distributions, or a reference store directory created by graphletUtils.py.",required=True)
     parser.add_argument("--outFile", default="parameterRanking.txt", help="File to store output in.")
     parser.add_argument("--minSize", default=15, help="Minimum size a reference pathway must be to be included. Must be integer.")
     parser.add_argument("--outputMax", action="store_true",help="If set, will return only the top pathway instead of a full ranking.")
     parser.add_argument("--outputScore", action="store_true",help="If set, will return scores in addition to pathway rankings.")
     parser.add_argument("--nameMap", default="stripped",help="Either a file mapping generated pathway fileNames to parameter values, \"stripped\" to exclude the directory and extension from the filename, or \"fileName\" to use raw file names.")
+    parser.add_argument("--outputTop", default=0, type=int, help="If set, will return only the top OUTPUTTOP pathways instead of a full ranking.")
+    parser.add_argument("--stream", action="store_true", help="If set, generated pathways are read and scored in batches without loading them all into memory. Full rankings are sorted on disk.")
+    parser.add_argument("--tempDir", default=None, help="Directory for temporary files used to sort scores with --stream. Default is the system temporary directory.")
+    parser.add_argument("--parseWorkers", default=1, type=int, help="Number of worker processes used to parse graphlet files.")
+    parser.add_argument("--parseThreads", action="store_true", help="If set, graphlet files are parsed by --parseWorkers threads instead of processes.")
     parser.add_argument("--saveGraphlets", action="store_true",help="If set, will save graphlet distributions as pickled dictionaries.")
+    parser.add_argument("--percTopCompute", default=[0.2], type=float, nargs="+", help="Fraction of closest reference pathways averaged to score a generated pathway. If several are given, one ranking is saved per fraction with \"_topFRACTION\" added to the output file name.")
+    parser.add_argument("--cacheDir", default="", help="If set, parsed graphlet files are cached in this directory and only new or changed files are parsed on later runs.")
+    parser.add_argument("--cacheSize", default=DEFAULT_CACHE_SIZE//2**20, type=int, help="Maximum size of the graphlet cache in MB. Least recently used graphlet distributions are removed first.")
+    parser.add_argument("--delim", default="", help="Node delimiter in the network files given by --genPathwayNetworks. Default is none, which splits lines on whitespace.")
+    parser.add_argument("--sweep", action="store_true", help="If set, graphlets of the networks given by --genPathwayNetworks are counted incrementally, updating the counts of each network from a similar one for the edges which differ.")
+    parser.add_argument("--approximate", action="store_true", help="If set, graphlets of the networks given by --genPathwayNetworks are estimated from sampled edges, and a report of score intervals is saved with \"_intervals\" added to the output file name.")
+    parser.add_argument("--approxError", default=DEFAULT_MAX_ERROR, type=float, help="Largest error of estimated graphlet distributions, as an L1 distance at 95%% confidence, with --approximate. Scores are within this error of scores with exact graphlet counts.")
+    parser.add_argument("--approxSeconds", default=0, type=float, help="If set, edges of each network are sampled for at most this many seconds with --approximate, even if the error is above --approxError.")
+    parser.add_argument("--shard", default="", help="If set to i/n, only the i-th of n slices of the generated pathways is scored, and scores are saved to a shard file named after the output file. Shard files are combined into the ranking by mergeShards.py.")
+    parser.add_argument("--saveDistances", default="", help="If set, the distances between every generated pathway and every reference pathway, whatever its size, are saved to a distance store in this directory. Rankings for other minimum sizes, top fractions and reference subsets can then be made from it by rerank.py without calculating distances again.")
+    parser.add_argument("--profile", default="", help="If set, a JSON report of time and CPU time per stage, counters and peak memory use is saved to this file.")
+    parser.add_argument("--profileHot", default="", choices=["", "cprofile", "sample"], help="Profiles distance calculation with cProfile, saving the full profile next to the --profile report, or with a sampling profiler. The slowest functions or lines are included in the report.")
     parser.add_argument("--verbose", action="store_true",help="If set, will print intermediate status updates.")
 
-    args = parser.parse_args()
-    genPathsF = args.genPathwayGraphlets
+    args = parser.parse_args(argv)
+    if args.profileHot and not args.profile:
+        parser.error("--profileHot requires --profile.")
+    profiler = None
+    if args.profile:
+        profiler = profiling.Profiler(args.profileHot).start()
+    genNetworks = args.genPathwayNetworks is not None
+    if genNetworks:
+        genPathsF = args.genPathwayNetworks
+    else:
+        genPathsF = args.genPathwayGraphlets
+    delim = args.delim
+    cache = None
+    if args.cacheDir:
+        cache = GFDCache(args.cacheDir, args.cacheSize*2**20)
     refPathsF = args.refPathwayGraphlets
     outF = args.outFile
     minSize = int(args.minSize)
@@ -117,6 +840,7 @@ if __name__ == "__main__":
     verbose = args.verbose
     nameMap = args.nameMap
     saveGraphlets = args.saveGraphlets
+    percTopCompute = args.percTopCompute
 
     #Secondary argument checking due to some explicity empty strings passed in by scripts
     if len(outF)==0:
@@ -126,4 +850,33 @@ if __name__ == "__main__":
     if verbose:
         print("Other parameters: \n output file \t\t %s \n min ref pathway size \t %s \n output max only \t %s \n output scores \t\t %s \n name mapping \t\t %s" %(outF,str(minSize),str(outMax),str(outScore),nameMap))
 
-    rankParameters(genPathsF,refPathsF,outF,minSize,outMax,outScore,verbose,nameMap,saveGraphlets)
+    if args.approximate and (not genNetworks or args.stream or args.shard):
+        parser.error("--approximate requires --genPathwayNetworks, and cannot be used with --stream or --shard.")
+    if args.sweep and (not genNetworks or args.stream or args.shard or args.approximate):
+        parser.error("--sweep requires --genPathwayNetworks, and cannot be used with --stream, --shard or --approximate.")
+    if args.saveDistances and (args.stream or args.shard or args.approximate):
+        parser.error("--saveDistances cannot be used with --stream, --shard or --approximate.")
+    approxSeconds = args.approxSeconds if args.approxSeconds > 0 else np.inf
+
+    if args.shard:
+        try:
+            shard, numShards = parseShard(args.shard)
+        except ValueError as e:
+            parser.error(str(e))
+        if genNetworks or args.stream or saveGraphlets:
+            parser.error("--shard requires --genPathwayGraphlets, and cannot be used with --stream or --saveGraphlets.")
+        rankShard(genPathsF,refPathsF,outF,minSize,verbose,percTopCompute,shard,numShards,cache,args.parseWorkers,args.parseThreads)
+    elif args.stream:
+        if genNetworks or len(percTopCompute) > 1:
+            parser.error("--stream requires --genPathwayGraphlets and a single --percTopCompute value.")
+        rankParametersStreaming(genPathsF,refPathsF,outF,minSize,outMax,outScore,verbose,nameMap,percTopCompute[0],cache,args.outputTop,tmpDir=args.tempDir)
+    else:
+        rankParameters(genPathsF,refPathsF,outF,minSize,outMax,outScore,verbose,nameMap,saveGraphlets,percTopCompute,genNetworks,delim,cache,args.outputTop,args.parseWorkers,args.parseThreads,args.approximate,args.approxError,approxSeconds,args.sweep,args.saveDistances)
+    if cache is not None:
+        cache.close()
+    if profiler is not None:
+        profiler.stop()
+        profiler.save(args.profile)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,186 @@
+import os
+import sys
+import json
+import time
+import pstats
+import cProfile
+import threading
+import contextlib
+import collections
+try:
+    import resource
+except ImportError:
+    resource = None
+
+"""
+Created: 10/18/2026
+
+Description: This file contains the stage-level profiling used by the --profile option of ppa.py.
+Ranking code marks its stages with stage() and records counters with count(). These do nothing
+unless a Profiler has been started, in which case wall and CPU time are summed per stage and
+saved with the counters and peak memory use as a JSON report.
+
+Stages marked as hot can also be run under cProfile, or a sampling profiler which records the
+line the main thread is running every SAMPLE_INTERVAL seconds.
+"""
+
+#Seconds between samples taken by the sampling profiler
+SAMPLE_INTERVAL = 0.005
+
+#Number of functions or lines included in the report for hot stages
+HOT_REPORT_SIZE = 25
+
+#Profiler used by stage() and count(), set by Profiler.start()
+activeProfiler = None
+
+"""
+Marks a stage of work, timed by the active profiler if there is one
+"""
+@contextlib.contextmanager
+def stage(name, hot=False):
+    if activeProfiler is None:
+        yield
+    else:
+        with activeProfiler.stage(name, hot):
+            yield
+
+"""
+Adds n to a counter of the active profiler if there is one
+"""
+def count(name, n=1):
+    if activeProfiler is not None:
+        activeProfiler.count(name, n)
+    return
+
+"""
+Gets the peak resident set size of this process and of its finished child processes in bytes,
+or None if it is not available on this system.
+"""
+def peakRSS():
+    if resource is None:
+        return None, None
+    #ru_maxrss is in bytes on macOS and in kilobytes elsewhere
+    scale = 1 if sys.platform == "darwin" else 1024
+    return (resource.getrusage(resource.RUSAGE_SELF).ru_maxrss*scale,
+            resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss*scale)
+
+class Profiler:
+    """
+    hotProfiler is "cprofile" or "sample" to profile stages marked as hot, or "" to only time them.
+    """
+    def __init__(self, hotProfiler=""):
+        if hotProfiler not in ["", "cprofile", "sample"]:
+            raise ValueError("Unknown hot stage profiler %s" %(hotProfiler))
+        self.hotProfiler = hotProfiler
+        self.stages = collections.OrderedDict()
+        self.counters = collections.OrderedDict()
+        self.cProfile = None
+        self.samples = collections.Counter()
+        self.startWall = time.perf_counter()
+        self.startCPU = time.process_time()
+
+    """
+    Makes this the profiler used by stage() and count()
+    """
+    def start(self):
+        global activeProfiler
+        activeProfiler = self
+        return self
+
+    def stop(self):
+        global activeProfiler
+        if activeProfiler is self:
+            activeProfiler = None
+        return
+
+    """
+    Times a stage, adding to its totals if it has run before. Hot stages are also profiled
+    with hotProfiler.
+    """
+    @contextlib.contextmanager
+    def stage(self, name, hot=False):
+        hot = hot and self.hotProfiler != ""
+        if hot:
+            self.startHot()
+        startWall = time.perf_counter()
+        startCPU = time.process_time()
+        try:
+            yield
+        finally:
+            wall = time.perf_counter()-startWall
+            cpu = time.process_time()-startCPU
+            if hot:
+                self.stopHot()
+            totals = self.stages.setdefault(name, {"wallSeconds":0.0, "cpuSeconds":0.0, "calls":0})
+            totals["wallSeconds"] += wall
+            totals["cpuSeconds"] += cpu
+            totals["calls"] += 1
+
+    def count(self, name, n=1):
+        self.counters[name] = self.counters.get(name, 0)+n
+        return
+
+    def startHot(self):
+        if self.hotProfiler == "cprofile":
+            if self.cProfile is None:
+                self.cProfile = cProfile.Profile()
+            self.cProfile.enable()
+        else:
+            self.sampling = True
+            self.sampler = threading.Thread(target=self.sample, args=(threading.get_ident(),), daemon=True)
+            self.sampler.start()
+        return
+
+    def stopHot(self):
+        if self.hotProfiler == "cprofile":
+            self.cProfile.disable()
+        else:
+            self.sampling = False
+            self.sampler.join()
+        return
+
+    """
+    Records the line being run by thread threadID until sampling is stopped
+    """
+    def sample(self, threadID):
+        while self.sampling:
+            frame = sys._current_frames().get(threadID)
+            if frame is not None:
+                code = frame.f_code
+                self.samples["%s:%d(%s)" %(code.co_filename, frame.f_lineno, code.co_name)] += 1
+            time.sleep(SAMPLE_INTERVAL)
+        return
+
+    """
+    Gets the report as a dictionary
+    """
+    def report(self):
+        rss, childRSS = peakRSS()
+        report = {"totalWallSeconds":time.perf_counter()-self.startWall,
+                  "totalCpuSeconds":time.process_time()-self.startCPU,
+                  "peakRSSBytes":rss,
+                  "peakChildRSSBytes":childRSS,
+                  "stages":self.stages,
+                  "counters":self.counters}
+        if self.hotProfiler == "cprofile" and self.cProfile is not None:
+            stats = pstats.Stats(self.cProfile).stats
+            top = sorted(stats.items(), key=lambda item: item[1][3], reverse=True)[:HOT_REPORT_SIZE]
+            report["hot"] = [{"function":"%s:%d(%s)" %func, "calls":callStats[1], "totalSeconds":callStats[2], "cumulativeSeconds":callStats[3]}
+                             for func,callStats in top]
+        elif self.hotProfiler == "sample":
+            total = sum(self.samples.values())
+            report["hot"] = [{"line":line, "samples":samples, "fraction":samples/total}
+                             for line,samples in self.samples.most_common(HOT_REPORT_SIZE)]
+        return report
+
+    """
+    Saves the report to outF as JSON. With cProfile, the full profile is also saved next to
+    outF with the extension .prof, which can be read with pstats or snakeviz.
+    """
+    def save(self, outF):
+        out = open(outF, "w")
+        json.dump(self.report(), out, indent=1)
+        out.close()
+        if self.cProfile is not None:
+            self.cProfile.dump_stats(os.path.splitext(outF)[0]+".prof")
+        return
@@ -0,0 +1,105 @@
+import os
+import sys
+import json
+import socket
+import argparse
+import tempfile
+import pathwayParameterAdvising as ppa
+
+"""
+Created: 10/18/2026
+
+Description: This file is the client of the ranking server in rankingServer.py. It takes the
+same arguments as ppa.py, sends them to a running server over its Unix socket, and the server
+ranks the generated pathways against the reference pathways it has already loaded and saves the
+ranking like ppa.py.
+
+Only the standard library is imported, as the package imports its other modules when they are
+first used, so the client starts quickly.
+
+Usage: python rankingClient.py --genPathwayGraphlets=graphletNames.txt --outFile=ranking.txt --minSize=15 --outputScore
+"""
+
+#Socket the server listens on unless another is given
+DEFAULT_SOCKET = os.path.join(tempfile.gettempdir(), "ppaServer.sock")
+
+"""
+Sends a request, a dictionary, to the server listening on socketPath, and returns its response.
+See rankingServer.py for the fields of requests and responses.
+"""
+def sendRequest(request, socketPath=DEFAULT_SOCKET):
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.connect(socketPath)
+        sock.sendall((json.dumps(request)+"\n").encode())
+        response = sock.makefile("rb").readline()
+    finally:
+        sock.close()
+    if len(response) == 0:
+        return {"error":"The server closed the connection without responding."}
+    return json.loads(response.decode())
+
+"""
+Makes a ranking request from the arguments of ppa.py. Files are sent as absolute paths, and the
+graphlet files listed in genPathwayGraphlets are read relative to the current directory.
+"""
+def rankingRequest(genPathsF, outF, minSize, outMax, outScore, nameMap, outTop, percTopCompute):
+    if nameMap not in ["stripped", "fileName"]:
+        nameMap = os.path.abspath(nameMap)
+    return {"genPathwayGraphlets":os.path.abspath(genPathsF),
+            "directory":os.getcwd(),
+            "outFile":os.path.abspath(outF) if outF else "",
+            "minSize":minSize,
+            "outputMax":outMax,
+            "outputScore":outScore,
+            "nameMap":nameMap,
+            "outputTop":outTop,
+            "percTopCompute":percTopCompute}
+
+
+"""
+Sends the request given by the command line arguments in argv, by default sys.argv[1:].
+"""
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Ranks generated pathways with a running ranking server, which keeps the reference pathways loaded. Takes the same arguments as ppa.py. Version %s, released under the MIT license."%(ppa.__version__))
+    parser.add_argument("--genPathwayGraphlets", help="File where each line is a graphlets file of a generated pathway, or a pickled dictionary of precomputed graphlet distributions.")
+    parser.add_argument("--outFile", default="parameterRanking.txt", help="File to store output in.")
+    parser.add_argument("--minSize", default=15, help="Minimum size a reference pathway must be to be included. Must be integer.")
+    parser.add_argument("--outputMax", action="store_true",help="If set, will return only the top pathway instead of a full ranking.")
+    parser.add_argument("--outputScore", action="store_true",help="If set, will return scores in addition to pathway rankings.")
+    parser.add_argument("--nameMap", default="stripped",help="Either a file mapping generated pathway fileNames to parameter values, \"stripped\" to exclude the directory and extension from the filename, or \"fileName\" to use raw file names.")
+    parser.add_argument("--outputTop", default=0, type=int, help="If set, will return only the top OUTPUTTOP pathways instead of a full ranking.")
+    parser.add_argument("--percTopCompute", default=[0.2], type=float, nargs="+", help="Fraction of closest reference pathways averaged to score a generated pathway. If several are given, one ranking is saved per fraction with \"_topFRACTION\" added to the output file name.")
+    parser.add_argument("--socket", default=DEFAULT_SOCKET, help="Unix socket the server listens on.")
+    parser.add_argument("--stats", action="store_true", help="If set, prints statistics of the server instead of ranking.")
+    parser.add_argument("--shutdown", action="store_true", help="If set, stops the server instead of ranking.")
+    parser.add_argument("--verbose", action="store_true",help="If set, will print intermediate status updates.")
+    args = parser.parse_args(argv)
+
+    if args.stats:
+        request = {"command":"stats"}
+    elif args.shutdown:
+        request = {"command":"shutdown"}
+    elif args.genPathwayGraphlets is None:
+        parser.error("--genPathwayGraphlets is required to rank pathways.")
+    else:
+        outF = args.outFile if len(args.outFile)>0 else "parameterRanking.txt"
+        request = rankingRequest(args.genPathwayGraphlets, outF, int(args.minSize), args.outputMax, args.outputScore,
+                                 args.nameMap, args.outputTop, args.percTopCompute)
+    try:
+        response = sendRequest(request, args.socket)
+    except (FileNotFoundError, ConnectionRefusedError):
+        print("Error: no ranking server is listening on %s. Start one with rankingServer.py." %(args.socket))
+        sys.exit(1)
+    if "error" in response:
+        print("Error: %s" %(response["error"]))
+        sys.exit(1)
+    if args.stats:
+        print(json.dumps(response, indent=1))
+    elif args.verbose and "rankings" in response:
+        for ranking in response["rankings"]:
+            print("Saved ranking of %d generated pathways to %s." %(response["numGenerated"], ranking["outFile"]))
+        print("Ranked in %0.4f seconds." %(response["seconds"]))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,337 @@
+import os
+import sys
+import json
+import time
+import queue
+import signal
+import socket
+import argparse
+import threading
+import socketserver
+import collections
+import numpy as np
+from pathwayParameterAdvising.graphletUtils import *
+from pathwayParameterAdvising.ppa import scoreGraphlets, topFractionFileName
+from pathwayParameterAdvising.referenceIndex import loadReferenceIndex
+from pathwayParameterAdvising.rankingClient import DEFAULT_SOCKET
+import pathwayParameterAdvising as ppa
+
+"""
+Created: 10/18/2026
+
+Description: This file contains a long running ranking server, which loads the reference pathways
+once and ranks generated pathways sent to it over a Unix socket, so each ranking does not start
+Python and load the reference pathways again. rankingClient.py is a client which takes the same
+arguments as ppa.py.
+
+Each line sent to the server is a JSON request, and each is answered with a line of JSON. A
+ranking request has the fields below, named after the arguments of ppa.py. Only one source of
+generated pathways is needed.
+ - genPathwayGraphlets: a file listing graphlet files, or a pickled dictionary of distributions
+ - paths: a list of graphlet files
+ - gfds: a dictionary of graphlet distributions, each a dictionary of frequencies and "size"
+ - directory: directory relative file names are read from. Default is the server's directory
+ - minSize, percTopCompute, nameMap, outputMax, outputTop and outputScore, as in ppa.py
+ - outFile: file to save the ranking in like ppa.py. Default is not to save it
+The response holds the ranking for each value of percTopCompute as a list of [run, score]
+pairs, best first, along with the number of generated pathways and the seconds taken, or an
+"error" message. Requests with a "command" of "stats", "reload" or "shutdown" get statistics
+of the server, drop the loaded reference pathways so they are loaded again, or stop it.
+
+Reference pathways are kept in memory for each minSize requested, along with the index of a
+reference store if it has one. Generated pathways are parsed by the connection which sent them,
+and requests which arrive while others are scored are scored together in one pass.
+
+Usage: python rankingServer.py --refPathwayGraphlets=../referencePathways/reactomeStore
+"""
+
+#Default values of request fields, as in ppa.py
+DEFAULT_REQUEST = {"minSize":15, "percTopCompute":[0.2], "nameMap":"stripped", "outputMax":False,
+                   "outputTop":0, "outputScore":False, "outFile":""}
+
+class PendingRanking:
+    """
+    Generated pathways waiting to be scored, as a GraphletMatrix aligned to the graphlets of the
+    reference pathways followed by any others. Requests with the same key are scored together.
+    """
+    def __init__(self, genMatrix, minSize, percTops, key):
+        self.genMatrix = genMatrix
+        self.minSize = minSize
+        self.percTops = percTops
+        self.key = key
+        self.scores = None
+        self.error = None
+        self.done = threading.Event()
+
+class RankingService:
+    """
+    Ranks generated pathways against the reference pathways in refPathsF, a reference store,
+    pickled dictionary or list of graphlet files like ppa.py. Graphlet files are parsed by
+    workers threads. Scoring waits up to batchWindow seconds for more requests to score at once.
+    """
+    def __init__(self, refPathsF, workers=1, batchWindow=0.0, verbose=False):
+        self.refPathsF = refPathsF
+        self.workers = workers
+        self.batchWindow = batchWindow
+        self.verbose = verbose
+        self.references = dict()
+        self.lock = threading.Lock()
+        self.pending = queue.Queue()
+        self.counters = collections.Counter()
+        self.started = time.time()
+        self.scorer = threading.Thread(target=self.run, daemon=True)
+        self.scorer.start()
+
+    """
+    Gets the reference pathways of at least minSize as a GraphletMatrix held in memory, and
+    the index of the reference store or None, loading them the first time.
+    """
+    def loadReferences(self, minSize):
+        with self.lock:
+            if minSize not in self.references:
+                refMatrix = loadGraphletMatrix(self.refPathsF,minSize,False,self.verbose)
+                refMatrix = GraphletMatrix(list(refMatrix.names), list(refMatrix.graphlets),
+                                           np.array(refMatrix.freqs, dtype=float), np.array(refMatrix.sizes, dtype=float))
+                self.references[minSize] = (refMatrix, loadReferenceIndex(self.refPathsF,minSize,self.verbose))
+                if self.verbose:
+                    print("Loaded %d reference pathways of at least size %d." %(len(refMatrix.names),minSize))
+            return self.references[minSize]
+
+    """
+    Loads the generated pathways of a request as a GraphletMatrix
+    """
+    def loadGenerated(self, request):
+        directory = request.get("directory", os.getcwd())
+        paths = list(request.get("paths", []))
+        matrices = []
+        if request.get("genPathwayGraphlets"):
+            genPathsF = os.path.join(directory, request["genPathwayGraphlets"])
+            if isPickleFile(genPathsF):
+                gDists = loadGraphlets(genPathsF,0,False,False)
+                matrices.append(graphletMatrix(gDists, graphletVocabulary(gDists)))
+            else:
+                paths = [line.strip() for line in open(genPathsF)]+paths
+        if len(paths) > 0:
+            #Files are read relative to directory but keep the names they were given
+            fileNames = [os.path.join(directory, name) for name in paths]
+            names = dict(zip(fileNames, paths))
+            gMatrix = loadGFDMatrix(fileNames,0,False,self.workers,True)
+            matrices.append(gMatrix._replace(names=[names[name] for name in gMatrix.names]))
+        if len(request.get("gfds", dict())) > 0:
+            matrices.append(graphletMatrix(request["gfds"], graphletVocabulary(request["gfds"])))
+        if len(matrices) == 0:
+            return GraphletMatrix([], [], np.zeros((0,0)), np.zeros(0))
+        if len(matrices) == 1:
+            return matrices[0]
+        return stackGraphletMatrices(matrices, list(dict.fromkeys(g for gMatrix in matrices for g in gMatrix.graphlets)))
+
+    """
+    Answers a request, returning the response
+    """
+    def handle(self, request):
+        command = request.get("command", "rank")
+        if command == "stats":
+            return self.stats()
+        if command == "reload":
+            with self.lock:
+                self.references = dict()
+            return {"reloaded":True}
+        if command == "shutdown":
+            return {"shutdown":True}
+        if command != "rank":
+            return {"error":"Unknown command %s" %(command)}
+        try:
+            return self.rank(dict(DEFAULT_REQUEST, **request))
+        except Exception as e:
+            return {"error":"%s: %s" %(type(e).__name__, e)}
+
+    """
+    Ranks the generated pathways of a request, saving the ranking to its outFile if it has one
+    """
+    def rank(self, request):
+        start = time.perf_counter()
+        minSize = int(request["minSize"])
+        percTops = [float(percTop) for percTop in np.atleast_1d(request["percTopCompute"])]
+        refMatrix, index = self.loadReferences(minSize)
+        if len(refMatrix.names)==0:
+            return {"error":"Must include at least 1 reference pathway to perform ranking."}
+        genMatrix = self.loadGenerated(request)
+        if len(genMatrix.names)==0:
+            return {"error":"Must include at least 1 generated pathway to perform ranking."}
+
+        #Aligned like scoreGraphlets does, so scores do not depend on the other requests scored with it
+        refGraphlets = set(refMatrix.graphlets)
+        extra = tuple(g for g in genMatrix.graphlets if g not in refGraphlets)
+        genMatrix = alignGraphletMatrix(genMatrix, list(refMatrix.graphlets)+list(extra))
+        pending = PendingRanking(genMatrix, minSize, percTops, (minSize, tuple(percTops), extra))
+        self.pending.put(pending)
+        pending.done.wait()
+        if pending.error is not None:
+            return {"error":pending.error}
+
+        numTop = 1 if request["outputMax"] else int(request["outputTop"])
+        rankings = []
+        for percTop,scores in zip(percTops, pending.scores):
+            distances = changeNames(dict(zip(genMatrix.names, scores)), request["nameMap"])
+            runs = [(distances[run], run) for run in sorted(distances, key = lambda x:(distances[x], x))]
+            outF = request["outFile"]
+            if outF and len(percTops) > 1:
+                outF = topFractionFileName(outF, percTop)
+            if outF:
+                saveSortedRanking(runs,outF,request["outputMax"],request["outputScore"],False,numTop)
+            if numTop > 0:
+                runs = runs[:numTop]
+            rankings.append({"percTopCompute":percTop, "outFile":outF, "ranking":[[run, float(score)] for score,run in runs]})
+        with self.lock:
+            self.counters["requests"] += 1
+        return {"rankings":rankings, "numGenerated":len(genMatrix.names), "seconds":time.perf_counter()-start}
+
+    """
+    Scores pending rankings as they arrive, in batches of all rankings waiting at once
+    """
+    def run(self):
+        while True:
+            batch = [self.pending.get()]
+            if batch[0] is None:
+                return
+            deadline = time.perf_counter()+self.batchWindow
+            while batch[-1] is not None:
+                remaining = deadline-time.perf_counter()
+                try:
+                    batch.append(self.pending.get(True, remaining) if remaining > 0 else self.pending.get_nowait())
+                except queue.Empty:
+                    break
+            groups = collections.OrderedDict()
+            for pending in batch:
+                if pending is not None:
+                    groups.setdefault(pending.key, []).append(pending)
+            for group in groups.values():
+                self.scoreBatch(group)
+            if batch[-1] is None:
+                return
+
+    """
+    Scores rankings with the same key in one pass
+    """
+    def scoreBatch(self, batch):
+        try:
+            refMatrix, index = self.loadReferences(batch[0].minSize)
+            genMatrix = stackGraphletMatrices([pending.genMatrix for pending in batch], batch[0].genMatrix.graphlets)
+            genNames, allScores = scoreGraphlets(genMatrix, refMatrix, batch[0].percTops, index=index)
+            start = 0
+            for pending in batch:
+                pending.scores = allScores[:,start:start+len(pending.genMatrix.names)]
+                start += len(pending.genMatrix.names)
+        except Exception as e:
+            for pending in batch:
+                pending.error = "%s: %s" %(type(e).__name__, e)
+        finally:
+            with self.lock:
+                self.counters["batches"] += 1
+                self.counters["generatedPathways"] += sum(len(pending.genMatrix.names) for pending in batch)
+                self.counters["largestBatch"] = max(self.counters["largestBatch"], len(batch))
+            for pending in batch:
+                pending.done.set()
+
+    def stats(self):
+        with self.lock:
+            stats = dict(self.counters)
+            stats["uptimeSeconds"] = time.time()-self.started
+            stats["referenceSets"] = {str(minSize):len(refMatrix.names) for minSize,(refMatrix,index) in self.references.items()}
+            stats["indexed"] = {str(minSize):index is not None for minSize,(refMatrix,index) in self.references.items()}
+        return stats
+
+    """
+    Stops scoring once pending rankings are scored
+    """
+    def stop(self):
+        self.pending.put(None)
+        self.scorer.join()
+        return
+
+"""
+Stacks the rows of GraphletMatrices, aligned to the graphlet vocabulary graphlets
+"""
+def stackGraphletMatrices(gMatrices, graphlets):
+    gMatrices = [alignGraphletMatrix(gMatrix, graphlets) for gMatrix in gMatrices]
+    return GraphletMatrix([name for gMatrix in gMatrices for name in gMatrix.names], list(graphlets),
+                          np.vstack([np.asarray(gMatrix.freqs, dtype=float).reshape(-1, len(graphlets)) for gMatrix in gMatrices]),
+                          np.concatenate([np.asarray(gMatrix.sizes, dtype=float) for gMatrix in gMatrices]))
+
+class RankingHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        for line in self.rfile:
+            try:
+                request = json.loads(line.decode())
+                if not isinstance(request, dict):
+                    raise ValueError("Requests must be JSON objects.")
+                response = self.server.service.handle(request)
+            except ValueError as e:
+                request = dict()
+                response = {"error":"Invalid request: %s" %(e)}
+            self.wfile.write((json.dumps(response)+"\n").encode())
+            self.wfile.flush()
+            if request.get("command") == "shutdown":
+                #shutdown waits for serve_forever to return, so it must run in another thread
+                threading.Thread(target=self.server.shutdown).start()
+                return
+
+class RankingServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+"""
+Serves service on a Unix socket at socketPath until it is shut down. Only the user running the
+server can connect. A socket left by a server which is no longer running is replaced.
+"""
+def serve(service, socketPath=DEFAULT_SOCKET):
+    if os.path.exists(socketPath):
+        probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            probe.connect(socketPath)
+            probe.close()
+            print("Error: a server is already listening on %s." %(socketPath))
+            return
+        except (ConnectionRefusedError, FileNotFoundError):
+            probe.close()
+            os.remove(socketPath)
+    oldMask = os.umask(0o177)
+    try:
+        server = RankingServer(socketPath, RankingHandler)
+    finally:
+        os.umask(oldMask)
+    server.service = service
+    #Stops cleanly when terminated
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    print("Serving rankings on %s" %(socketPath), flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.stop()
+        if os.path.exists(socketPath):
+            os.remove(socketPath)
+    return
+
+
+"""
+Runs a ranking server with the command line arguments in argv, by default sys.argv[1:].
+"""
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Runs a ranking server which keeps reference pathways loaded and ranks generated pathways sent by rankingClient.py. Version %s, released under the MIT license."%(ppa.__version__))
+    parser.add_argument("--refPathwayGraphlets", help="File where each line is a graphlets file of a reference pathway, a pickled dictionary of precomputed reference graphlet distributions, or a reference store directory created by graphletUtils.py.",required=True)
+    parser.add_argument("--minSize", default=[15], type=int, nargs="+", help="Minimum sizes of reference pathways loaded when the server starts. Other sizes are loaded when first requested.")
+    parser.add_argument("--socket", default=DEFAULT_SOCKET, help="Unix socket to listen on.")
+    parser.add_argument("--parseWorkers", default=1, type=int, help="Number of threads used to parse the graphlet files of each request.")
+    parser.add_argument("--batchWindow", default=0.0, type=float, help="Seconds to wait for more requests to score together. By default only requests which arrive while others are scored are batched.")
+    parser.add_argument("--verbose", action="store_true",help="If set, will print intermediate status updates.")
+    args = parser.parse_args(argv)
+
+    service = RankingService(args.refPathwayGraphlets, args.parseWorkers, args.batchWindow, args.verbose)
+    for minSize in args.minSize:
+        service.loadReferences(minSize)
+    serve(service, args.socket)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,327 @@
+import os
+import hashlib
+import argparse
+import numpy as np
+from pathwayParameterAdvising.graphletUtils import STORE_FILES, isReferenceStore
+from pathwayParameterAdvising import profiling
+import pathwayParameterAdvising as ppa
+
+"""
+Created: 10/18/2026
+
+Description: This file contains a vantage point tree over the graphlet distributions of a
+reference store, used to find the closest reference pathways to a generated pathway without
+calculating its distance to every reference pathway.
+
+Each internal node of the tree holds a vantage point, a reference pathway, and splits the other
+pathways under it into the half closest to the vantage point and the half farthest from it.
+Leaves hold at most INDEX_LEAF_SIZE pathways. By the triangle inequality, the distance from a
+generated pathway to any pathway under a node is at least its distance to the vantage point
+minus the largest distance of those pathways to it, or the smallest distance minus its own.
+Pathways whose bound is larger than the k-th smallest distance found are skipped, so queries are
+exact. Every query needs at least k distances, so the index only saves time when k is a small
+fraction of the reference pathways, in which case the number of distances grows much more
+slowly than the number of reference pathways.
+
+The tree is saved as .npy arrays next to the reference store arrays, with the SHA-256 hash of the
+frequencies it was built from. An index whose hash does not match the store is not used.
+
+When run as a script this file builds the index of a reference store.
+
+Usage: python referenceIndex.py referencePathways/reactomeStore
+"""
+
+#Maximum number of reference pathways in a leaf of the tree
+INDEX_LEAF_SIZE = 64
+
+#Number of generated pathways whose bounds are calculated at once
+INDEX_BLOCK_SIZE = 1024
+
+#Largest fraction of the searched reference pathways for which the tree is used to find the closest
+INDEX_MAX_TOP_FRACTION = 0.005
+
+#Number of distances calculated at once when all reference pathways are searched
+INDEX_SCAN_ELEMENTS = 2**20
+
+#Relative slack on triangle inequality bounds, which are not summed like exact distances
+INDEX_TOLERANCE = 1e-9
+
+"""
+Arrays of the index in the reference store directory. nodes holds the start and end of each
+node's pathways in order, its vantage point (-1 for leaves) and its inside and outside children.
+ranges holds the smallest and largest distance of a node's pathways to its parent's vantage
+point, and parentDists the distance of each pathway in order to the vantage point above its leaf.
+"""
+INDEX_FILES = {"order":"indexOrder.npy", "nodes":"indexNodes.npy", "ranges":"indexRanges.npy",
+               "parentDists":"indexParentDists.npy", "key":"indexKey.npy"}
+
+"""
+Calculates the distances between the rows of queries, graphlet frequency vectors, and the
+reference pathways at rows of refFreqs. Queries may have more graphlets than refFreqs, which the
+references do not have.
+"""
+def queryDistances(queries, refFreqs, rows):
+    return columnDistances(queries, np.ascontiguousarray(np.asarray(refFreqs[rows], dtype=float).T))
+
+"""
+Calculates the distances between the rows of queries and reference pathways given as a graphlets
+x pathways matrix refCols. Graphlets are accumulated one at a time in order, so distances are
+identical to those of calcDistanceMatrix in ppa.py.
+"""
+def columnDistances(queries, refCols):
+    queries = np.atleast_2d(queries)
+    dists = np.zeros((len(queries), refCols.shape[1]))
+    diff = np.empty_like(dists)
+    for g in range(queries.shape[1]):
+        if g < len(refCols):
+            np.subtract(queries[:,g,None], refCols[g], out=diff)
+        else:
+            np.subtract(queries[:,g,None], 0.0, out=diff)
+        np.abs(diff, out=diff)
+        dists += diff
+    profiling.count("distanceEvaluations", dists.size)
+    return dists
+
+"""
+Gets the hash identifying the frequencies an index is built from
+"""
+def storeKey(freqs):
+    return hashlib.sha256(np.ascontiguousarray(freqs, dtype=float).tobytes()).hexdigest()
+
+"""
+Checks if storeDir has an index
+"""
+def hasReferenceIndex(storeDir):
+    return all(os.path.isfile(os.path.join(storeDir, INDEX_FILES[field])) for field in INDEX_FILES)
+
+"""
+Builds the vantage point tree of the reference store in storeDir and saves it there.
+Vantage points are drawn at random with seed, so the same store always gives the same tree.
+"""
+def buildReferenceIndex(storeDir, leafSize=INDEX_LEAF_SIZE, seed=0, verbose=False):
+    freqs = np.load(os.path.join(storeDir, STORE_FILES["freqs"]), mmap_mode="r")
+    rng = np.random.RandomState(seed)
+    order = np.arange(len(freqs))
+    parentDists = np.zeros(len(freqs))
+    nodes = []
+    ranges = []
+
+    #Each entry is a node to fill in: its slot in nodes, start, end and range
+    toSplit = [(0, len(freqs), 0.0, np.inf)]
+    nodes.append(None)
+    ranges.append(None)
+    slots = [0]
+    while len(toSplit) > 0:
+        start, end, low, high = toSplit.pop()
+        slot = slots.pop()
+        ranges[slot] = (low, high)
+        if end-start <= leafSize:
+            nodes[slot] = (start, end, -1, -1, -1)
+            continue
+        #Moves a random vantage point to the start of the node, and splits the rest at the median distance
+        pick = start+rng.randint(end-start)
+        order[[start, pick]] = order[[pick, start]]
+        vantage = order[start]
+        rest = order[start+1:end]
+        dists = queryDistances(np.asarray(freqs[vantage], dtype=float), freqs, rest)[0]
+        half = len(rest)//2
+        split = np.argpartition(dists, half-1) if half > 0 else np.arange(len(rest))
+        order[start+1:end] = rest[split]
+        dists = dists[split]
+        parentDists[start+1:end] = dists
+        mid = start+1+half
+        children = []
+        for childStart, childEnd, childDists in [(start+1, mid, dists[:half]), (mid, end, dists[half:])]:
+            nodes.append(None)
+            ranges.append(None)
+            children.append(len(nodes)-1)
+            toSplit.append((childStart, childEnd, childDists.min(), childDists.max()))
+            slots.append(len(nodes)-1)
+        nodes[slot] = (start, end, vantage, children[0], children[1])
+
+    arrays = {"order":order, "nodes":np.array(nodes, dtype=np.int64), "ranges":np.array(ranges, dtype=float),
+              "parentDists":parentDists, "key":np.array(storeKey(freqs))}
+    for field in INDEX_FILES:
+        indexF = os.path.join(storeDir, INDEX_FILES[field])
+        with open(indexF+".tmp", "wb") as outF:
+            np.save(outF, arrays[field])
+        os.replace(indexF+".tmp", indexF)
+    if verbose:
+        print("Built index of %d reference pathways with %d nodes in %s." %(len(freqs), len(nodes), storeDir))
+    return
+
+"""
+Loads the index of the reference store in storeDir, only searching pathways of at least minSize
+like loadReferenceStore. Returns None if there is no index or it does not match the store.
+"""
+def loadReferenceIndex(storeDir, minSize, verbose):
+    if not isReferenceStore(storeDir) or not hasReferenceIndex(storeDir):
+        return None
+    index = ReferenceIndex(storeDir, minSize)
+    if str(np.load(os.path.join(storeDir, INDEX_FILES["key"]))) != storeKey(index.freqs):
+        print("Warning: the index of reference store %s is out of date and was not used. Rebuild it with referenceIndex.py." %(storeDir))
+        return None
+    if verbose:
+        print("Loaded index of %d reference pathways from %s." %(len(index.freqs), storeDir))
+    return index
+
+class ReferenceIndex:
+    """
+    Loads the index and the reference pathways of the store in storeDir which are at least
+    minSize, whose frequencies are kept as columns in the order of the leaves of the tree.
+    """
+    def __init__(self, storeDir, minSize=0):
+        self.freqs = np.load(os.path.join(storeDir, STORE_FILES["freqs"]), mmap_mode="r")
+        order = np.load(os.path.join(storeDir, INDEX_FILES["order"]))
+        self.nodes = np.load(os.path.join(storeDir, INDEX_FILES["nodes"]))
+        self.ranges = np.load(os.path.join(storeDir, INDEX_FILES["ranges"]))
+        parentDists = np.load(os.path.join(storeDir, INDEX_FILES["parentDists"]))
+        #Missing sizes are nan and are never skipped, as in loadReferenceStore
+        sizes = np.load(os.path.join(storeDir, STORE_FILES["sizes"]), mmap_mode="r")
+        searched = ~(sizes[order] < minSize)
+        self.numSearched = int(np.count_nonzero(searched))
+
+        #Nodes are numbered after their parents, so bounds can be filled in node order
+        self.parents = np.full(len(self.nodes), -1)
+        for child in [3, 4]:
+            internal = self.nodes[:,child] >= 0
+            self.parents[self.nodes[internal,child]] = np.nonzero(internal)[0]
+        self.internal = np.nonzero(self.nodes[:,2] >= 0)[0]
+        self.vantageColumn = np.full(len(self.nodes), -1)
+        self.vantageColumn[self.internal] = np.arange(len(self.internal))
+        self.vantageCols = np.ascontiguousarray(np.asarray(self.freqs[self.nodes[self.internal,2]], dtype=float).T)
+        self.vantageSearched = searched[self.nodes[self.internal,0]]
+
+        #Searched pathways in leaves, with the positions of each leaf's pathways in them
+        self.leaves = np.nonzero(self.nodes[:,2] < 0)[0]
+        inLeaf = np.zeros(len(order), dtype=bool)
+        for leaf in self.leaves:
+            inLeaf[self.nodes[leaf,0]:self.nodes[leaf,1]] = True
+        positions = np.nonzero(inLeaf & searched)[0]
+        self.leafStart = np.searchsorted(positions, self.nodes[self.leaves,0])
+        self.leafEnd = np.searchsorted(positions, self.nodes[self.leaves,1])
+        self.leafCols = np.ascontiguousarray(np.asarray(self.freqs[order[positions]], dtype=float).T)
+        self.leafParentDists = parentDists[positions]
+        #Vantage point column of the parent of each pathway's leaf, which a tree with one leaf does not have
+        self.allCols = None
+        self.leafParentColumn = np.zeros(len(positions), dtype=int)
+        if len(self.internal) > 0:
+            for i,leaf in enumerate(self.leaves):
+                self.leafParentColumn[self.leafStart[i]:self.leafEnd[i]] = self.vantageColumn[self.parents[leaf]]
+
+    """
+    Gets lower bounds on the distances between queries and the pathways of each leaf, from the
+    distances between queries and all vantage points.
+    """
+    def leafBounds(self, vantageDists):
+        bounds = np.zeros((len(vantageDists), len(self.nodes)))
+        for node in range(1, len(self.nodes)):
+            dist = vantageDists[:,self.vantageColumn[self.parents[node]]]
+            low, high = self.ranges[node]
+            np.maximum(bounds[:,self.parents[node]], np.maximum(low-dist, dist-high), out=bounds[:,node])
+        return bounds[:,self.leaves]
+
+    """
+    Gets the positions of the pathways of the given leaves in leafCols
+    """
+    def leafPositions(self, leaves):
+        lengths = self.leafEnd[leaves]-self.leafStart[leaves]
+        offsets = self.leafStart[leaves]-(np.cumsum(lengths)-lengths)
+        return np.repeat(offsets, lengths)+np.arange(lengths.sum())
+
+    """
+    Gets the k smallest distances, in increasing order, between each row of queries, graphlet
+    frequency vectors over the graphlets of the store optionally followed by others, and the
+    searched reference pathways.
+
+    Distances to all vantage points give a lower bound for each leaf. Leaves are first searched
+    closest bound first until k pathways are found, which bounds the k-th smallest distance.
+    Only pathways in other leaves whose bound, and bound from the vantage point above them, is
+    within that distance are then searched.
+    """
+    def nearestDistances(self, queries, k):
+        queries = np.atleast_2d(np.asarray(queries, dtype=float))
+        vantageDists = columnDistances(queries, self.vantageCols)
+        bounds = self.leafBounds(vantageDists)
+        leafSizes = self.leafEnd-self.leafStart
+        nearest = np.empty((len(queries), k))
+        for q in range(len(queries)):
+            found = vantageDists[q,self.vantageSearched]
+            leafOrder = np.argsort(bounds[q], kind="stable")
+            numLeaves = np.searchsorted(np.cumsum(leafSizes[leafOrder]), k-len(found))+1
+            positions = self.leafPositions(leafOrder[:numLeaves])
+            dists = np.concatenate([found, columnDistances(queries[q], self.leafCols[:,positions])[0]])
+            radius = np.partition(dists, k-1)[k-1]
+            limit = radius+INDEX_TOLERANCE*(1+radius)
+
+            rest = leafOrder[numLeaves:]
+            positions = self.leafPositions(rest[bounds[q,rest] <= limit])
+            if len(self.internal) > 0:
+                parentDists = vantageDists[q,self.leafParentColumn[positions]]
+                positions = positions[np.abs(parentDists-self.leafParentDists[positions]) <= limit]
+            dists = np.concatenate([dists, columnDistances(queries[q], self.leafCols[:,positions])[0]])
+            nearest[q] = np.sort(np.partition(dists, k-1)[:k])
+        return nearest
+
+    """
+    Gets the k smallest distances like nearestDistances, by calculating the distances between
+    queries and all searched reference pathways, in blocks of about INDEX_SCAN_ELEMENTS distances.
+    """
+    def scanDistances(self, queries, k):
+        if self.allCols is None:
+            self.allCols = np.hstack([self.vantageCols[:,self.vantageSearched], self.leafCols])
+        nearest = np.empty((len(queries), k))
+        blockSize = max(1, INDEX_SCAN_ELEMENTS//max(self.numSearched,1))
+        for start in range(0, len(queries), blockSize):
+            dists = columnDistances(queries[start:start+blockSize], self.allCols)
+            if k < self.numSearched:
+                dists = np.partition(dists, k-1, axis=1)[:,:k]
+            nearest[start:start+len(dists)] = np.sort(dists, axis=1)
+        return nearest
+
+    """
+    Scores the rows of genFreqs, aligned to the graphlets of the store followed by any others,
+    like calcTopFractionScores of their distances to all searched reference pathways.
+    Queries are made in blocks of blockSize rows. When more than INDEX_MAX_TOP_FRACTION of the
+    searched pathways are averaged, bounds rarely skip any, and all distances are calculated.
+    """
+    def scoreFrequencies(self, genFreqs, percTopCompute, blockSize=INDEX_BLOCK_SIZE, verbose=False):
+        percTops = np.atleast_1d(percTopCompute)
+        nTops = [min(int(self.numSearched*percTop), self.numSearched) for percTop in percTops]
+        maxTop = max(nTops)
+        allScores = np.empty((len(nTops), len(genFreqs)))
+        for start in range(0, len(genFreqs), blockSize):
+            block = np.asarray(genFreqs[start:start+blockSize], dtype=float)
+            if maxTop == 0:
+                topDists = np.zeros((len(block), 0))
+            elif maxTop <= INDEX_MAX_TOP_FRACTION*self.numSearched:
+                topDists = self.nearestDistances(block, maxTop)
+            else:
+                topDists = self.scanDistances(block, maxTop)
+            for i,nTop in enumerate(nTops):
+                allScores[i,start:start+len(block)] = np.mean(topDists[:,:nTop], axis=1)
+            if verbose:
+                print(".",end='',flush=True)
+        profiling.count("generatedPathways", len(genFreqs))
+        if np.ndim(percTopCompute) == 0:
+            return allScores[0]
+        return allScores
+
+
+"""
+Builds the index of the reference store given by the command line arguments in argv, by default
+sys.argv[1:].
+"""
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Builds the index of a reference store used to find the closest reference pathways to each generated pathway. Version %s, released under the MIT license."%(ppa.__version__))
+    parser.add_argument("referenceStore", help="Reference store directory created by graphletUtils.py.")
+    parser.add_argument("--leafSize", default=INDEX_LEAF_SIZE, type=int, help="Maximum number of reference pathways in a leaf of the tree.")
+    parser.add_argument("--seed", default=0, type=int, help="Random seed for choosing vantage points.")
+    parser.add_argument("--verbose", action="store_true", help="If set, will print intermediate status updates.")
+    args = parser.parse_args(argv)
+    if not isReferenceStore(args.referenceStore):
+        parser.error("%s is not a reference store." %(args.referenceStore))
+    buildReferenceIndex(args.referenceStore, args.leafSize, args.seed, args.verbose)
+
+if __name__ == "__main__":
+    main()
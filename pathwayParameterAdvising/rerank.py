@@ -0,0 +1,44 @@
+import os
+import sys
+import argparse
+from pathwayParameterAdvising.ppa import rankDistanceStore
+import pathwayParameterAdvising as ppa
+
+"""
+Created: 10/18/2026
+
+Description: This file ranks generated pathways again from the distance store saved by running
+ppa.py with --saveDistances, for any combination of minimum reference pathway sizes, top
+fractions and reference pathway subsets. No graphlet files are read and no distances are
+calculated, and every combination is scored in one pass over the stored distances. Rankings are
+identical to running ppa.py with the same settings.
+
+Usage: python rerank.py il2Distances --minSize 15 50 100 --percTopCompute 0.1 0.2 --outputScore
+"""
+
+"""
+Ranks the distance store given by the command line arguments in argv, by default sys.argv[1:].
+"""
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Ranks generated pathways from a distance store saved by ppa.py with --saveDistances, for every combination of the given minimum sizes, top fractions and reference subsets. Version %s, released under the MIT license."%(ppa.__version__))
+    parser.add_argument("distanceStore", help="Directory of the distance store saved by ppa.py with --saveDistances.")
+    parser.add_argument("--outFile", default="parameterRanking.txt", help="File to store output in. If more than one value is given for the minimum size, top fraction or subset, one ranking is saved per combination with \"_minSizeSIZE\", \"_topFRACTION\" and \"_SUBSET\" added to the file name for each of them.")
+    parser.add_argument("--minSize", default=[15], type=int, nargs="+", help="Minimum sizes a reference pathway must be to be included.")
+    parser.add_argument("--percTopCompute", default=[0.2], type=float, nargs="+", help="Fractions of closest reference pathways averaged to score a generated pathway.")
+    parser.add_argument("--subsets", default=["all"], nargs="+", help="Subsets of reference pathways to rank against, each a file where each line is a reference pathway name, or its file name without directory and extension, or \"all\" for every reference pathway.")
+    parser.add_argument("--outputMax", action="store_true",help="If set, will return only the top pathway instead of a full ranking.")
+    parser.add_argument("--outputScore", action="store_true",help="If set, will return scores in addition to pathway rankings.")
+    parser.add_argument("--nameMap", default="stripped",help="Either a file mapping generated pathway fileNames to parameter values, \"stripped\" to exclude the directory and extension from the filename, or \"fileName\" to use raw file names.")
+    parser.add_argument("--outputTop", default=0, type=int, help="If set, will return only the top OUTPUTTOP pathways instead of a full ranking.")
+    parser.add_argument("--verbose", action="store_true",help="If set, will print intermediate status updates.")
+    args = parser.parse_args(argv)
+    for subset in args.subsets:
+        if subset != "all" and not os.path.isfile(subset):
+            parser.error("Subset file %s does not exist." %(subset))
+
+    outF = args.outFile if len(args.outFile)>0 else "parameterRanking.txt"
+    if not rankDistanceStore(args.distanceStore,outF,args.minSize,args.percTopCompute,args.subsets,args.outputMax,args.outputScore,args.verbose,args.nameMap,args.outputTop):
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -52,4 +52,24 @@ setuptools.setup(
     ],
 
     include_package_data=True,
+
+    #Command line entry points
+    entry_points={
+        'console_scripts': [
+            'ppa-rank=pathwayParameterAdvising.ppa:main',
+            'ppa-convert=pathwayParameterAdvising.graphletUtils:main',
+            'ppa-update=pathwayParameterAdvising.getReactomePaths:updateMain',
+            'ppa-build-references=pathwayParameterAdvising.getReactomePaths:main',
+            'ppa-build-index=pathwayParameterAdvising.referenceIndex:main',
+            'ppa-merge-shards=pathwayParameterAdvising.mergeShards:main',
+            'ppa-rerank=pathwayParameterAdvising.rerank:main',
+            'ppa-convert-networks=pathwayParameterAdvising.convertNetworks:main',
+            'ppa-count-graphlets=pathwayParameterAdvising.graphletCounts:main',
+            'ppa-estimate-graphlets=pathwayParameterAdvising.graphletSampling:main',
+            'ppa-count-sweep=pathwayParameterAdvising.graphletSweep:main',
+            'ppa-pipeline=pathwayParameterAdvising.pipeline:main',
+            'ppa-server=pathwayParameterAdvising.rankingServer:main',
+            'ppa-client=pathwayParameterAdvising.rankingClient:main',
+        ],
+    },
 )
@@ -0,0 +1,115 @@
+import sys
+import json
+import time
+import random
+import hashlib
+import argparse
+import threading
+import socketserver
+import http.server
+import urllib.parse
+
+"""
+Created: 10/18/2026
+
+Description: This is a stand-in for the Pathway Commons web API, used to test downloading
+reference pathways without contacting Pathway Commons. It answers search.json and get
+requests with generated pathways, and can add latency and fail some requests with rate
+limiting or server errors to exercise retries. Pathways are sent with an ETag, and unchanged
+pathways are answered with 304 Not Modified when their ETag is sent back in If-None-Match.
+
+Usage: python fakePathwayCommons.py --port=8765
+
+getReactomePaths.py can then be run with --baseURL=http://localhost:8765/pc2
+"""
+
+"""
+Generates the SIF text of a pathway. The same pathway and seed always give the same text.
+"""
+def makePathway(pathNum, seed=0):
+    rng = random.Random("%d-%d" %(pathNum, seed))
+    numNodes = rng.randint(3, 40)
+    lines = []
+    for i in range(rng.randint(2, 3*numNodes)):
+        u = rng.randint(1, numNodes)
+        v = rng.randint(1, numNodes)
+        if u != v:
+            lines.append("P%d\tinteracts-with\tP%d" %(u, v))
+    return "\n".join(lines)
+
+class FakeHandler(http.server.BaseHTTPRequestHandler):
+    def do_POST(self):
+        server = self.server
+        url = urllib.parse.urlparse(self.path)
+        params = dict(urllib.parse.parse_qsl(url.query))
+        time.sleep(server.latency)
+        with server.lock:
+            server.requests += 1
+            fail = server.rng.random() < server.failRate
+        if fail:
+            self.sendText(server.rng.choice([429, 503]), "Try again later")
+            return
+
+        if url.path.endswith("/search.json"):
+            page = int(params.get("page", "0"))
+            hits = [{"uri":"%s/pathway/Pathway%d" %(server.uriBase, i)}
+                    for i in range(page*server.pageSize, min((page+1)*server.pageSize, server.numPathways))]
+            self.sendText(200, json.dumps({"numHits":server.numPathways, "maxHitsPerPage":server.pageSize, "searchHit":hits}))
+        elif url.path.endswith("/get"):
+            pathNum = int(params.get("uri", "").split("Pathway")[-1])
+            seed = 0
+            if server.changeEvery > 0 and pathNum%server.changeEvery == 0:
+                seed = server.seed
+            text = makePathway(pathNum, seed)
+            etag = '"%s"' %(hashlib.sha256(text.encode()).hexdigest())
+            if self.headers.get("If-None-Match") == etag:
+                self.sendText(304, "", etag)
+            else:
+                self.sendText(200, text, etag)
+        else:
+            self.sendText(404, "Not found")
+
+    def sendText(self, status, text, etag=None):
+        body = text.encode()
+        self.send_response(status)
+        if etag is not None:
+            self.send_header("ETag", etag)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        return
+
+class FakeServer(socketserver.ThreadingMixIn, http.server.HTTPServer):
+    daemon_threads = True
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Runs a stand-in for the Pathway Commons web API which serves generated pathways.")
+    parser.add_argument("--port", default=8765, type=int, help="Port to listen on.")
+    parser.add_argument("--numPathways", default=200, type=int, help="Number of pathways to serve.")
+    parser.add_argument("--pageSize", default=100, type=int, help="Number of pathways in each search page.")
+    parser.add_argument("--failRate", default=0.0, type=float, help="Fraction of requests answered with a 429 or 503 status.")
+    parser.add_argument("--latency", default=0.0, type=float, help="Seconds to wait before answering each request.")
+    parser.add_argument("--seed", default=0, type=int, help="Changing the seed changes the content of the pathways selected by --changeEvery.")
+    parser.add_argument("--changeEvery", default=1, type=int, help="The seed is applied to every CHANGEEVERY-th pathway, and the others keep their content. Default is every pathway.")
+    args = parser.parse_args()
+
+    server = FakeServer(("localhost", args.port), FakeHandler)
+    server.numPathways = args.numPathways
+    server.pageSize = args.pageSize
+    server.failRate = args.failRate
+    server.latency = args.latency
+    server.seed = args.seed
+    server.changeEvery = args.changeEvery
+    server.uriBase = "http://localhost:%d" %(args.port)
+    server.rng = random.Random(args.seed)
+    server.lock = threading.Lock()
+    server.requests = 0
+    print("Serving %d pathways on port %d" %(args.numPathways, args.port), flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    print("Answered %d requests" %(server.requests), file=sys.stderr)